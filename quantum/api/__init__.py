@@ -26,14 +26,18 @@ import webob.exc
 
 from quantum import manager
 from quantum.api import attachments
+from quantum.api import jobs
 from quantum.api import networks
 from quantum.api import ports
 from quantum.common import flags
+from quantum.db import context as db_context
 from quantum import wsgi
 
 
 LOG = logging.getLogger('quantum.api')
 FLAGS = flags.FLAGS
+# WSGI environment key holding the controller action serving a request
+ACTION_ENVIRON_KEY = 'quantum.action'
 
 
 class APIRouter(wsgi.Router):
@@ -46,6 +50,50 @@ class APIRouter(wsgi.Router):
         self._setup_routes(mapper, options)
         super(APIRouter, self).__init__(mapper)
 
+    @webob.dec.wsgify
+    def __call__(self, req):
+        # Reads made while serving a GET may go to a database read replica
+        read_only = req.method in ('GET', 'HEAD')
+        with db_context.request_context(read_only=read_only) as context:
+            response = req.get_response(self._router)
+        streamed = not isinstance(response.app_iter, list)
+        if streamed:
+            # Streamed listings fetch their remaining rows while the
+            # server sends the body, which must run in the same context
+            response.app_iter = db_context.ContextIterator(
+                context, response.app_iter)
+        if db_context.instrumentation_enabled():
+            # The headers leave out the statements run by a streamed
+            # body, but the statistics account for them once it is sent
+            if streamed:
+                response.app_iter = wsgi.ClosingIterator(
+                    response.app_iter,
+                    lambda: db_context.record_request(context))
+            else:
+                db_context.record_request(context)
+            response.headers['X-Quantum-DB-Queries'] = str(context.queries)
+            response.headers['X-Quantum-DB-Time'] = "%.6f" % context.db_time
+        return response
+
+    @staticmethod
+    @webob.dec.wsgify
+    def _dispatch(req):
+        """
+        Records the matched controller action, e.g. 'networks.index', in
+        the request context and in the ACTION_ENVIRON_KEY entry of the
+        WSGI environment before dispatching the request.
+        """
+        match = req.environ['wsgiorg.routing_args'][1]
+        if match:
+            controller = match['controller'].controller
+            action = "%s.%s" % (controller.__module__.rsplit('.', 1)[-1],
+                                match['action'])
+            req.environ[ACTION_ENVIRON_KEY] = action
+            context = db_context.get_current()
+            if context is not None:
+                context.action = action
+        return wsgi.Router._dispatch(req)
+
     def _mapper(self):
         return routes.Mapper()
 
@@ -91,6 +139,15 @@ class APIRouter(wsgi.Router):
                        controller=attachments_ctrl,
                        action="detach_resource",
                        conditions=dict(method=['DELETE']))
+        provisioner = manager.QuantumManager.get_provisioner()
+        if provisioner is not None and version != '1.0':
+            jobs_ctrl = jobs.create_resource(provisioner, version)
+            mapper.connect("jobs", uri_prefix + 'jobs{.format}',
+                           controller=jobs_ctrl, action="index",
+                           conditions=dict(method=['GET']))
+            mapper.connect("job", uri_prefix + 'jobs/{id}{.format}',
+                           controller=jobs_ctrl, action="show",
+                           conditions=dict(method=['GET']))
 
 
 class APIRouterV10(APIRouter):
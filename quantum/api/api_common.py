@@ -16,9 +16,12 @@
 #    under the License.
 
 import logging
+import urllib
+import zlib
 
 from webob import exc
 
+from quantum import manager
 from quantum import wsgi
 from quantum.api import faults
 
@@ -35,11 +38,14 @@ class OperationalStatus:
                a failure in the underlying switching fabric.
         PROVISIONING: the plugin is creating or updating the resource
                       in the underlying switching fabric
+        ERROR: the plugin failed to provision the resource in the
+               underlying switching fabric
         UNKNOWN: the plugin does not support the operational status concept.
     """
     UP = "UP"
     DOWN = "DOWN"
     PROVISIONING = "PROVISIONING"
+    ERROR = "ERROR"
     UNKNOWN = "UNKNOWN"
 
 
@@ -167,6 +173,45 @@ class QuantumController(object):
         self._plugin = plugin
         super(QuantumController, self).__init__()
 
+    def get_etag(self, request, accept, tenant_id=None, **kwargs):
+        """ Returns the entity tag of the response to a GET request
+            for a resource of tenant_id, or None if the plugin does
+            not keep a revision of the resources of its tenants.
+        """
+        get_revision = getattr(self._plugin, 'get_revision', None)
+        if get_revision is None or tenant_id is None:
+            return None
+        revision = get_revision(tenant_id)
+        if revision is None:
+            return None
+        # The same URL may be served in either content type, and the
+        # revision is the same for every URL of the tenant: a client
+        # may only hold the tag of a URL it was served at that revision,
+        # so the resource still exists when the tag matches
+        return "%s-%s-%08x" % (revision, accept.rsplit('/', 1)[-1],
+                               zlib.crc32(request.path_qs) & 0xffffffff)
+
+    def _get_async(self, method_name):
+        """ Returns the plugin's asynchronous variant of method_name
+            when resources are provisioned asynchronously, else None.
+            Provisioning is asynchronous from API v1.1.
+        """
+        if (self.version == '1.0' or
+            manager.QuantumManager.get_provisioner() is None):
+            return None
+        return getattr(self._plugin, method_name + '_async', None)
+
+    def _provision(self, tenant_id, resource_id, work):
+        """ Queues the device side work creating the resource """
+        manager.QuantumManager.get_provisioner().submit(
+            tenant_id, self._resource_name, resource_id, work)
+
+    def _wait_provisioned(self, resource_id):
+        """ Waits until the resource, if still being provisioned, is """
+        provisioner = manager.QuantumManager.get_provisioner()
+        if provisioner is not None:
+            provisioner.wait(resource_id)
+
     def _prepare_request_body(self, body, params):
         """ verifies required parameters are in request body.
             sets default value for missing optional parameters.
@@ -194,3 +239,48 @@ class QuantumController(object):
                 raise exc.HTTPBadRequest(msg)
             data[param_name] = param_value or param.get('default-value')
         return body
+
+    def _get_page_opts(self, filter_opts):
+        """ Moves the limit and marker pagination parameters out of
+            the filter options. Pagination is available from API v1.1.
+        """
+        page_opts = {}
+        if self.version == '1.0':
+            return page_opts
+        if 'limit' in filter_opts:
+            limit = filter_opts.pop('limit')
+            if not limit.isdigit() or int(limit) == 0:
+                raise exc.HTTPBadRequest("limit must be a positive integer")
+            page_opts['limit'] = int(limit)
+        if 'marker' in filter_opts:
+            page_opts['marker'] = filter_opts.pop('marker')
+        return page_opts
+
+    def _paginate(self, items, page_opts, id_key):
+        """ Applies the pagination options the plugin did not consume.
+            Like the plugins do, items are sorted by id and the page
+            starts right after the marker.
+        """
+        if not page_opts:
+            return items
+        items = sorted(items, key=lambda item: item[id_key])
+        marker = page_opts.pop('marker', None)
+        if marker is not None:
+            items = [item for item in items if item[id_key] > marker]
+        limit = page_opts.pop('limit', None)
+        if limit is not None:
+            items = items[:limit]
+        return items
+
+    def _page_links(self, request, items, limit, id_key):
+        """ Returns the link to the next page when the current one
+            is full, there might be more items after it.
+        """
+        if not limit or len(items) < limit:
+            return []
+        params = [(key, value.encode('utf-8'))
+                  for key, value in request.GET.items() if key != 'marker']
+        params.append(('marker', items[-1][id_key]))
+        return [{'rel': 'next',
+                 'href': "%s?%s" % (request.path_url,
+                                    urllib.urlencode(params))}]
@@ -0,0 +1,144 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Coalescing of identical concurrent reads.
+
+While a GET or HEAD request is being served, CoalescingMiddleware makes
+the identical requests (same tenant, method, path, query string, Accept
+and If-None-Match headers, and credentials) arriving in the meantime wait
+for its response, then answers them with a copy of it instead of serving
+them again.
+
+A request only waits for one which started after the last write request
+of its tenant did, so a client reading what it has just changed never
+receives an older response. Should the first request fail with an
+exception, or its response be streamed (such as large listings) or
+longer than max_body_size, the waiting ones are served on their own
+and the first response is passed through without being buffered.
+"""
+
+import logging
+
+import eventlet.event
+
+from quantum.api import ACTION_ENVIRON_KEY
+from quantum.api.ratelimit import READ_METHODS, TENANT_RE
+from quantum import wsgi
+
+
+LOG = logging.getLogger('quantum.api.coalesce')
+
+# Request headers which may change the response, besides the URL
+KEY_HEADERS = ('HTTP_ACCEPT', 'HTTP_IF_NONE_MATCH', 'HTTP_X_AUTH_TOKEN',
+               'HTTP_AUTHORIZATION')
+
+
+class CoalescingMiddleware(wsgi.Middleware):
+    """Serves identical concurrent GET and HEAD requests only once"""
+
+    def __init__(self, application, max_body_size=65536):
+        super(CoalescingMiddleware, self).__init__(application)
+        self.max_body_size = int(max_body_size)
+        # request key -> eventlet.event.Event sent the response (see
+        # _serve), or None if it cannot be shared
+        self.in_flight = {}
+        # tenant id -> number of write requests started
+        self.generations = {}
+        self.coalesced = 0
+
+    def _key(self, environ, tenant_id):
+        return ((tenant_id, self.generations.get(tenant_id, 0),
+                 environ['REQUEST_METHOD'], environ.get('PATH_INFO', ''),
+                 environ.get('QUERY_STRING', '')) +
+                tuple(environ.get(header) for header in KEY_HEADERS))
+
+    def __call__(self, environ, start_response):
+        match = TENANT_RE.search(environ.get('PATH_INFO', ''))
+        tenant_id = match and match.group(1)
+        if environ['REQUEST_METHOD'] not in READ_METHODS:
+            if tenant_id is not None:
+                self.generations[tenant_id] = \
+                    self.generations.get(tenant_id, 0) + 1
+            return self.application(environ, start_response)
+
+        key = self._key(environ, tenant_id)
+        event = self.in_flight.get(key)
+        if event is not None:
+            response = event.wait()
+            if response is not None:
+                self.coalesced += 1
+                LOG.debug("Coalesced %s %s", environ['REQUEST_METHOD'],
+                          environ.get('PATH_INFO'))
+                return self._replay(environ, start_response, response)
+            return self.application(environ, start_response)
+
+        event = self.in_flight[key] = eventlet.event.Event()
+        response = app_iter = None
+        try:
+            response, app_iter = self._serve(environ, start_response)
+        finally:
+            del self.in_flight[key]
+            event.send(response)
+        if response is None:
+            return app_iter
+        return self._replay(environ, start_response, response)
+
+    def _serve(self, environ, start_response):
+        """
+        Calls the application. Returns the (action, status, headers,
+        body) response to share, and None; or None and the application's
+        response passed through, when it is streamed or too long.
+        """
+        response = {}
+        chunks = []
+
+        def _start_response(status, headers, exc_info=None):
+            if 'passed_through' in response:
+                return start_response(status, headers, exc_info)
+            response['status'] = status
+            response['headers'] = headers
+            response['exc_info'] = exc_info
+            return chunks.append
+
+        app_iter = self.application(environ, _start_response)
+        if 'status' in response and isinstance(app_iter, list):
+            length = None
+            for name, value in response['headers']:
+                if name.lower() == 'content-length':
+                    length = int(value)
+                    break
+            if length is not None and length <= self.max_body_size:
+                return ((environ.get(ACTION_ENVIRON_KEY), response['status'],
+                         response['headers'], ''.join(chunks + app_iter)),
+                        None)
+
+        response['passed_through'] = True
+        if 'status' in response:
+            write = start_response(response['status'], response['headers'],
+                                   response['exc_info'])
+            for chunk in chunks:
+                write(chunk)
+        return None, app_iter
+
+    @staticmethod
+    def _replay(environ, start_response, response):
+        action, status, headers, body = response
+        # For the statistics of the requests served by others
+        if action is not None:
+            environ[ACTION_ENVIRON_KEY] = action
+        start_response(status, list(headers))
+        return [body]
@@ -0,0 +1,64 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+
+from webob import exc
+
+from quantum.api import api_common as common
+
+
+LOG = logging.getLogger('quantum.api.jobs')
+
+
+def create_resource(provisioner, version):
+    controller_dict = {
+                        '1.1': [Controller(provisioner),
+                                Controller._serialization_metadata,
+                                common.XML_NS_V11]}
+    return common.create_resource(version, controller_dict)
+
+
+class Controller(object):
+    """ Provisioning job API controller for Quantum API v1.1
+
+        A job has the id of the network or port it provisions. Jobs
+        change with no change to the tenant's resources, so they
+        are not tagged for conditional requests.
+    """
+
+    _serialization_metadata = {
+            "attributes": {
+                "job": ["id", "resource", "state"]},
+            "plurals": {"jobs": "job"}
+    }
+
+    def __init__(self, provisioner):
+        self.version = "1.1"
+        self._provisioner = provisioner
+
+    def index(self, request, tenant_id):
+        """ Returns the provisioning jobs of the tenant """
+        return dict(jobs=[job.to_dict()
+                          for job in self._provisioner.get_jobs(tenant_id)])
+
+    def show(self, request, tenant_id, id):
+        """ Returns the provisioning job of the given resource """
+        job = self._provisioner.get_job(tenant_id, id)
+        if job is None:
+            raise exc.HTTPNotFound("Unable to find a provisioning job "
+                                   "with the specified identifier.")
+        return dict(job=job.to_dict())
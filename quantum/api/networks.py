@@ -50,19 +50,21 @@ class Controller(common.QuantumController):
 
     def _item(self, request, tenant_id, network_id,
               net_details=True, port_details=False):
-        # We expect get_network_details to return information
-        # concerning logical ports as well.
-        network = self._plugin.get_network_details(
-                            tenant_id, network_id)
-        # Doing this in the API is inefficient
-        # TODO(salvatore-orlando): This should be fixed with Bug #834012
-        # Don't pass filter options
         ports_data = None
-        if port_details:
-            port_list = self._plugin.get_all_ports(tenant_id, network_id)
-            ports_data = [self._plugin.get_port_details(
-                                   tenant_id, network_id, port['port-id'])
-                      for port in port_list]
+        get_with_ports = getattr(self._plugin,
+                                 'get_network_details_with_ports', None)
+        if port_details and get_with_ports:
+            network = get_with_ports(tenant_id, network_id)
+            ports_data = network.get('net-ports', [])
+        else:
+            # We expect get_network_details to return information
+            # concerning logical ports as well.
+            network = self._plugin.get_network_details(
+                                tenant_id, network_id)
+            if port_details:
+                ports_data = filters.get_ports_details(self._plugin,
+                                                       tenant_id,
+                                                       network_id)
         builder = networks_view.get_view_builder(request, self.version)
         result = builder.build(network, net_details,
                                ports_data, port_details)['network']
@@ -80,8 +82,25 @@ class Controller(common.QuantumController):
         """
         filter_opts = {}
         filter_opts.update(request.GET)
-        networks = self._plugin.get_all_networks(tenant_id,
-                                                 filter_opts=filter_opts)
+        page_opts = self._get_page_opts(filter_opts)
+        limit = page_opts.get('limit')
+        builder = networks_view.get_view_builder(request, self.version)
+        iter_all = getattr(self._plugin, 'iter_all_networks', None)
+        if iter_all is not None and limit is None:
+            networks = iter_all(tenant_id,
+                                filter_opts=filter_opts,
+                                page_opts=page_opts)
+            # Stream the networks to the client, unless filtering or
+            # pagination is left to the API layer
+            if not (filter_opts or page_opts):
+                return dict(networks=(
+                    builder.build(network, net_details)['network']
+                    for network in networks))
+            networks = list(networks)
+        else:
+            networks = self._plugin.get_all_networks(tenant_id,
+                                                     filter_opts=filter_opts,
+                                                     page_opts=page_opts)
         # Inefficient, API-layer filtering
         # will be performed only for the filters not implemented by the plugin
         # NOTE(salvatore-orlando): the plugin is supposed to leave only filters
@@ -90,10 +109,14 @@ class Controller(common.QuantumController):
                                            self._plugin,
                                            tenant_id,
                                            filter_opts)
-        builder = networks_view.get_view_builder(request, self.version)
-        result = [builder.build(network, net_details)['network']
-                  for network in networks]
-        return dict(networks=result)
+        # Likewise, page_opts is left alone by plugins without pagination
+        networks = self._paginate(networks, page_opts, 'net-id')
+        result = dict(networks=[builder.build(network, net_details)['network']
+                                for network in networks])
+        links = self._page_links(request, networks, limit, 'net-id')
+        if links:
+            result['networks_links'] = links
+        return result
 
     @common.APIFaultWrapper()
     def index(self, request, tenant_id):
@@ -128,6 +151,16 @@ class Controller(common.QuantumController):
         # request_params but that would mean all the plugins would need to
         # change.
         body = self._prepare_request_body(body, self._network_ops_param_list)
+        create_async = self._get_async('create_network')
+        if create_async:
+            # The network comes back PROVISIONING, show it
+            network, work = create_async(tenant_id,
+                                         body['network']['name'],
+                                         **body)
+            self._provision(tenant_id, network['net-id'], work)
+            builder = networks_view.get_view_builder(request, self.version)
+            result = builder.build(network, net_detail=True)['network']
+            return dict(network=result)
         network = self._plugin.\
                    create_network(tenant_id,
                                   body['network']['name'],
@@ -136,6 +169,31 @@ class Controller(common.QuantumController):
         result = builder.build(network)['network']
         return dict(network=result)
 
+    def _create_bulk(self, request, tenant_id, body):
+        """ Creates several networks for a given tenant at once.
+        Plugins which do not implement create_network_bulk
+        fall back to creating networks one at a time.
+
+        """
+        items = body['networks']
+        if not isinstance(items, list):
+            raise exc.HTTPBadRequest("'networks' must be a list")
+        bodies = [self._prepare_request_body({'network': item},
+                                             self._network_ops_param_list)
+                  for item in items]
+        create_bulk = getattr(self._plugin, 'create_network_bulk', None)
+        if create_bulk:
+            networks = create_bulk(tenant_id,
+                                   [item['network'] for item in bodies])
+        else:
+            networks = [self._plugin.create_network(tenant_id,
+                                                    item['network']['name'],
+                                                    **item)
+                        for item in bodies]
+        builder = networks_view.get_view_builder(request, self.version)
+        result = [builder.build(network)['network'] for network in networks]
+        return dict(networks=result)
+
     @common.APIFaultWrapper([exception.NetworkNotFound])
     def update(self, request, tenant_id, id, body):
         """ Updates the name for the network with the given id """
@@ -146,6 +204,7 @@ class Controller(common.QuantumController):
                              exception.NetworkInUse])
     def delete(self, request, tenant_id, id):
         """ Destroys the network with the given id """
+        self._wait_provisioned(id)
         self._plugin.delete_network(tenant_id, id)
 
 
@@ -187,3 +246,13 @@ class ControllerV11(Controller):
     def __init__(self, plugin):
         self.version = "1.1"
         super(ControllerV11, self).__init__(plugin)
+
+    @common.APIFaultWrapper()
+    def create(self, request, tenant_id, body):
+        """ Creates a new network, or a list of networks when
+        the request body carries a 'networks' collection
+
+        """
+        if body and 'networks' in body:
+            return self._create_bulk(request, tenant_id, body)
+        return super(ControllerV11, self).create(request, tenant_id, body)
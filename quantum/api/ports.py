@@ -15,6 +15,8 @@
 
 import logging
 
+from webob import exc
+
 from quantum.api import api_common as common
 from quantum.api.views import filters
 from quantum.api.views import ports as ports_view
@@ -59,21 +61,49 @@ class Controller(common.QuantumController):
         """
         filter_opts = {}
         filter_opts.update(request.GET)
-        port_list = self._plugin.get_all_ports(tenant_id,
-                                               network_id,
-                                               filter_opts=filter_opts)
-
+        page_opts = self._get_page_opts(filter_opts)
+        limit = page_opts.get('limit')
+        # Port details are needed for the filters the plugin
+        # leaves to the API layer as well
+        need_details = port_details or len(filter_opts) > 0
+        get_all_details = getattr(self._plugin, 'get_all_ports_details',
+                                  None)
+        details_loaded = need_details and get_all_details is not None
+        iter_all = getattr(self._plugin, 'iter_all_ports', None)
         builder = ports_view.get_view_builder(request, self.version)
+        if not need_details and iter_all is not None and limit is None:
+            port_list = iter_all(tenant_id,
+                                 network_id,
+                                 filter_opts=filter_opts,
+                                 page_opts=page_opts)
+            # Stream the ports to the client, unless pagination
+            # is left to the API layer
+            if not page_opts:
+                return dict(ports=(builder.build(port, port_details)['port']
+                                   for port in port_list))
+            port_list = list(port_list)
+        elif details_loaded:
+            port_list = get_all_details(tenant_id,
+                                        network_id,
+                                        filter_opts=filter_opts,
+                                        page_opts=page_opts)
+        else:
+            port_list = self._plugin.get_all_ports(tenant_id,
+                                                   network_id,
+                                                   filter_opts=filter_opts,
+                                                   page_opts=page_opts)
+        # Paginate before loading port details, unless filters
+        # which need those details have to be applied first
+        if not filter_opts:
+            port_list = self._paginate(port_list, page_opts, 'port-id')
 
-        # Load extra data for ports if required.
+        # Load extra data for ports if required and the plugin
+        # cannot return it for all ports at once.
         # This can be inefficient.
-        # TODO(salvatore-orlando): the fix for bug #834012 should deal with it
-        if port_details:
-            port_list_detail = \
-                [self._plugin.get_port_details(
+        if not details_loaded and (port_details or filter_opts):
+            port_list = [self._plugin.get_port_details(
                             tenant_id, network_id, port['port-id'])
-                  for port in port_list]
-            port_list = port_list_detail
+                         for port in port_list]
 
         # Perform manual filtering if not supported by plugin
         # Inefficient, API-layer filtering
@@ -84,10 +114,14 @@ class Controller(common.QuantumController):
         port_list = filters.filter_ports(port_list, self._plugin,
                                          tenant_id, network_id,
                                          filter_opts)
+        port_list = self._paginate(port_list, page_opts, 'port-id')
 
-        result = [builder.build(port, port_details)['port']
-                  for port in port_list]
-        return dict(ports=result)
+        result = dict(ports=[builder.build(port, port_details)['port']
+                             for port in port_list])
+        links = self._page_links(request, port_list, limit, 'port-id')
+        if links:
+            result['ports_links'] = links
+        return result
 
     def _item(self, request, tenant_id, network_id, port_id,
               att_details=False):
@@ -133,6 +167,16 @@ class Controller(common.QuantumController):
 
         """
         body = self._prepare_request_body(body, self._port_ops_param_list)
+        create_async = self._get_async('create_port')
+        if create_async:
+            # The port comes back PROVISIONING, show it
+            port, work = create_async(tenant_id,
+                                      network_id, body['port']['state'],
+                                      **body)
+            self._provision(tenant_id, port['port-id'], work)
+            builder = ports_view.get_view_builder(request, self.version)
+            result = builder.build(port, port_details=True)['port']
+            return dict(port=result)
         port = self._plugin.create_port(tenant_id,
                                         network_id, body['port']['state'],
                                         **body)
@@ -140,6 +184,31 @@ class Controller(common.QuantumController):
         result = builder.build(port)['port']
         return dict(port=result)
 
+    def _create_bulk(self, request, tenant_id, network_id, body):
+        """ Creates several ports on a given network at once.
+        Plugins which do not implement create_port_bulk
+        fall back to creating ports one at a time.
+
+        """
+        items = body['ports']
+        if not isinstance(items, list):
+            raise exc.HTTPBadRequest("'ports' must be a list")
+        bodies = [self._prepare_request_body({'port': item or {}},
+                                             self._port_ops_param_list)
+                  for item in items]
+        create_bulk = getattr(self._plugin, 'create_port_bulk', None)
+        if create_bulk:
+            ports = create_bulk(tenant_id, network_id,
+                                [item['port'] for item in bodies])
+        else:
+            ports = [self._plugin.create_port(tenant_id, network_id,
+                                              item['port']['state'],
+                                              **item)
+                     for item in bodies]
+        builder = ports_view.get_view_builder(request, self.version)
+        result = [builder.build(port)['port'] for port in ports]
+        return dict(ports=result)
+
     @common.APIFaultWrapper([exception.NetworkNotFound,
                              exception.PortNotFound,
                              exception.StateInvalid])
@@ -153,6 +222,7 @@ class Controller(common.QuantumController):
                              exception.PortInUse])
     def delete(self, request, tenant_id, network_id, id):
         """ Destroys the port with the given id """
+        self._wait_provisioned(id)
         self._plugin.delete_port(tenant_id, network_id, id)
 
 
@@ -184,3 +254,15 @@ class ControllerV11(Controller):
     def __init__(self, plugin):
         self.version = "1.1"
         super(ControllerV11, self).__init__(plugin)
+
+    @common.APIFaultWrapper([exception.NetworkNotFound,
+                             exception.StateInvalid])
+    def create(self, request, tenant_id, network_id, body=None):
+        """ Creates a new port, or a list of ports when
+        the request body carries a 'ports' collection
+
+        """
+        if body and 'ports' in body:
+            return self._create_bulk(request, tenant_id, network_id, body)
+        return super(ControllerV11, self).create(request, tenant_id,
+                                                 network_id, body)
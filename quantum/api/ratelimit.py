@@ -0,0 +1,158 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+API admission control.
+
+RateLimitMiddleware gives every tenant (as found in the
+/tenants/{tenant_id}/ part of the request path) a token bucket for reads
+(GET and HEAD) and one for writes: a bucket holds up to <kind>_burst
+requests and refills at <kind>_rate requests per second, and requests
+finding their bucket empty are refused with 413. Independently of the
+tenant, requests beyond max_concurrent_requests being served are refused
+with 503. Both responses carry a Retry-After header. A rate or limit of
+0 disables the corresponding check.
+
+The limits apply to each server process, so with API workers a tenant
+may be served up to workers times its rate.
+"""
+
+import logging
+import math
+import re
+import time
+
+import webob.exc
+
+from quantum import wsgi
+
+
+LOG = logging.getLogger('quantum.api.ratelimit')
+
+TENANT_RE = re.compile(r'/tenants/([^/]+)/')
+READ_METHODS = ('GET', 'HEAD')
+# Seconds between sweeps of the buckets of idle tenants
+PRUNE_INTERVAL = 60
+
+
+class TokenBucket(object):
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def _refill(self, now):
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self, now):
+        """
+        Takes a token from the bucket; returns 0 if there was one,
+        otherwise the seconds until there will be one.
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+
+class RateLimitMiddleware(wsgi.Middleware):
+    """
+    Per tenant token bucket rate limiting and a global cap on the requests
+    being served.
+    """
+
+    def __init__(self, application, read_rate=0, read_burst=0,
+                 write_rate=0, write_burst=0, max_concurrent_requests=0):
+        super(RateLimitMiddleware, self).__init__(application)
+        # Values from the paste config are strings
+        self.limits = {'read': (float(read_rate), float(read_burst)),
+                       'write': (float(write_rate), float(write_burst))}
+        self.max_concurrent_requests = int(max_concurrent_requests)
+        # (tenant id, 'read' or 'write') -> TokenBucket
+        self.buckets = {}
+        self.in_flight = 0
+        self._last_prune = time.time()
+
+    def process_request(self, req):
+        if (self.max_concurrent_requests and
+            self.in_flight >= self.max_concurrent_requests):
+            LOG.warn("Refusing request, %d requests are being served",
+                     self.in_flight)
+            return self._refusal(webob.exc.HTTPServiceUnavailable,
+                                 "The server is busy.", 1)
+        match = TENANT_RE.search(req.path_info)
+        if match is None:
+            return None
+        tenant_id = match.group(1)
+        kind = req.method in READ_METHODS and 'read' or 'write'
+        rate, burst = self.limits[kind]
+        if not rate:
+            return None
+        now = time.time()
+        if now - self._last_prune > PRUNE_INTERVAL:
+            self._prune(now)
+        bucket = self.buckets.get((tenant_id, kind))
+        if bucket is None:
+            bucket = self.buckets[(tenant_id, kind)] = TokenBucket(
+                rate, max(burst, 1), now)
+        wait = bucket.consume(now)
+        if wait:
+            LOG.info("Rate limiting %s requests of tenant %s", kind,
+                     tenant_id)
+            return self._refusal(webob.exc.HTTPRequestEntityTooLarge,
+                                 "Too many %s requests for tenant %s." %
+                                 (kind, tenant_id), wait)
+        return None
+
+    @staticmethod
+    def _refusal(exc_class, explanation, retry_after):
+        retry_after = str(int(math.ceil(retry_after)))
+        return exc_class(explanation=explanation,
+                         headers=[('Retry-After', retry_after)])
+
+    def _prune(self, now):
+        """Forgets the buckets of tenants idle long enough to refill them"""
+        for key, bucket in self.buckets.items():
+            if bucket.is_full(now):
+                del self.buckets[key]
+        self._last_prune = now
+
+    def _finished(self):
+        self.in_flight -= 1
+
+    def __call__(self, environ, start_response):
+        response = self.process_request(wsgi.Request(environ))
+        if response:
+            return response(environ, start_response)
+        # The request is in flight until its body has been sent
+        self.in_flight += 1
+        try:
+            app_iter = self.application(environ, start_response)
+        except Exception:
+            self._finished()
+            raise
+        return wsgi.ClosingIterator(app_iter, self._finished)
@@ -0,0 +1,210 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+API latency statistics.
+
+StatsMiddleware times every request passing through it, up to the moment
+the last byte of a (possibly streamed) response body has been sent, and
+keeps a histogram of the latencies for each controller action, response
+status and content type, along with gauges of the requests in flight.
+GET <stats_path> returns them, along with the plug-in cache counters and
+the per action SQL statistics when those are enabled, in the Prometheus
+text format.
+
+The statistics are kept in memory by each server process, so with API
+workers every worker reports the requests it served.
+"""
+
+import bisect
+import logging
+import time
+
+import webob
+import webob.exc
+
+from quantum.api import ACTION_ENVIRON_KEY
+from quantum import manager
+from quantum.db import context as db_context
+from quantum import wsgi
+
+
+LOG = logging.getLogger('quantum.api.stats')
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').\
+        replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return ','.join('%s="%s"' % (name, _label(value))
+                    for name, value in sorted(labels.items()))
+
+
+def _split_action(action):
+    """'networks.index' -> ('networks', 'index')"""
+    if not action:
+        return 'none', 'none'
+    controller, _sep, action = action.partition('.')
+    return controller, action
+
+
+class Histogram(object):
+
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self):
+        # The last count is for the latencies above every bucket
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+
+class StatsMiddleware(wsgi.Middleware):
+    """
+    Records API latency statistics and serves them at stats_path to the
+    hosts listed in allowed_hosts.
+    """
+
+    def __init__(self, application, stats_path='/stats',
+                 allowed_hosts='127.0.0.1,::1'):
+        super(StatsMiddleware, self).__init__(application)
+        self.stats_path = stats_path
+        self.allowed_hosts = set(host.strip()
+                                 for host in allowed_hosts.split(',')
+                                 if host.strip())
+        # (controller, action, status, content type) -> Histogram
+        self.histograms = {}
+        # request method -> requests in flight
+        self.in_flight = {}
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') == self.stats_path:
+            return self._serve_stats(environ, start_response)
+
+        method = environ.get('REQUEST_METHOD')
+        self.in_flight[method] = self.in_flight.get(method, 0) + 1
+        start = time.time()
+        response = {}
+
+        def _start_response(status, headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = headers
+            return start_response(status, headers, exc_info)
+
+        def _finish():
+            self._record(environ, method, response, time.time() - start)
+
+        try:
+            app_iter = self.application(environ, _start_response)
+        except Exception:
+            response.setdefault('status', '500')
+            _finish()
+            raise
+        return wsgi.ClosingIterator(app_iter, _finish)
+
+    def _record(self, environ, method, response, duration):
+        self.in_flight[method] -= 1
+        controller, action = _split_action(environ.get(ACTION_ENVIRON_KEY))
+        status = response.get('status', '500').split(' ', 1)[0]
+        content_type = ''
+        for name, value in response.get('headers', ()):
+            if name.lower() == 'content-type':
+                content_type = value.split(';', 1)[0].strip()
+                break
+        key = (controller, action, status, content_type)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(duration)
+
+    def _serve_stats(self, environ, start_response):
+        if environ.get('REMOTE_ADDR') not in self.allowed_hosts:
+            LOG.debug("Refused statistics to %s", environ.get('REMOTE_ADDR'))
+            response = webob.exc.HTTPForbidden()
+        else:
+            response = webob.Response(content_type=CONTENT_TYPE)
+            response.body = ''.join(line + '\n' for line in self.render())
+            response.charset = None
+        return response(environ, start_response)
+
+    def render(self):
+        """Yields the lines of the statistics page"""
+        name = 'quantum_api_request_duration_seconds'
+        yield '# HELP %s API request latency.' % name
+        yield '# TYPE %s histogram' % name
+        for key in sorted(self.histograms):
+            histogram = self.histograms[key]
+            controller, action, status, content_type = key
+            labels = _labels(controller=controller, action=action,
+                             status=status, content_type=content_type)
+            count = 0
+            for bound, bucket_count in zip(BUCKETS + ('+Inf',),
+                                           histogram.counts):
+                count += bucket_count
+                if bound != '+Inf':
+                    bound = '%g' % bound
+                yield '%s_bucket{%s,le="%s"} %d' % (name, labels, bound,
+                                                    count)
+            yield '%s_sum{%s} %.6f' % (name, labels, histogram.sum)
+            yield '%s_count{%s} %d' % (name, labels, count)
+
+        name = 'quantum_api_requests_in_flight'
+        yield '# HELP %s API requests being served.' % name
+        yield '# TYPE %s gauge' % name
+        for method in sorted(self.in_flight):
+            yield '%s{%s} %d' % (name, _labels(method=method),
+                                 self.in_flight[method])
+
+        cache_statistics = getattr(manager.QuantumManager.get_plugin(),
+                                   'cache_statistics', None)
+        if cache_statistics is not None:
+            cache = cache_statistics()
+            for name, stat, type, help in (
+                ('quantum_plugin_cache_hits_total', 'hits', 'counter',
+                 'Plug-in calls answered from the cache.'),
+                ('quantum_plugin_cache_misses_total', 'misses', 'counter',
+                 'Cacheable plug-in calls made to the plug-in.'),
+                ('quantum_plugin_cache_entries', 'entries', 'gauge',
+                 'Plug-in results in the cache.')):
+                yield '# HELP %s %s' % (name, help)
+                yield '# TYPE %s %s' % (name, type)
+                yield '%s %d' % (name, cache[stat])
+
+        if not db_context.instrumentation_enabled():
+            return
+        statistics = db_context.get_action_statistics()
+        for name, stat, help, format in (
+            ('quantum_api_db_queries_total', 'queries',
+             'SQL statements run by API requests.', '%d'),
+            ('quantum_api_db_seconds_total', 'db_time',
+             'Time spent running the SQL statements of API requests.',
+             '%.6f')):
+            yield '# HELP %s %s' % (name, help)
+            yield '# TYPE %s counter' % name
+            for full_action in sorted(statistics):
+                controller, action = _split_action(full_action)
+                yield ('%s{%s} ' + format) % (
+                    name, _labels(controller=controller, action=action),
+                    statistics[full_action][stat])
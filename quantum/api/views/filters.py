@@ -22,18 +22,25 @@ import logging
 LOG = logging.getLogger('quantum.api.views.filters')
 
 
+def get_ports_details(plugin, tenant_id, network_id):
+    """Returns the details of all the ports of a network, with a single
+    plugin call if the plugin implements get_all_ports_details"""
+    get_all_details = getattr(plugin, 'get_all_ports_details', None)
+    if get_all_details:
+        return get_all_details(tenant_id, network_id)
+    # Don't pass filter options, don't care about unused filters
+    port_list = plugin.get_all_ports(tenant_id, network_id)
+    return [plugin.get_port_details(tenant_id, network_id, port['port-id'])
+            for port in port_list]
+
+
 def _load_network_ports_details(network, **kwargs):
     plugin = kwargs.get('plugin', None)
     tenant_id = kwargs.get('tenant_id', None)
     #load network details only if required
     if not 'net-ports' in network:
-        # Don't pass filter options, don't care about unused filters
-        port_list = plugin.get_all_ports(tenant_id, network['net-id'])
-        ports_data = [plugin.get_port_details(
-                                   tenant_id, network['net-id'],
-                                   port['port-id'])
-                      for port in port_list]
-        network['net-ports'] = ports_data
+        network['net-ports'] = get_ports_details(plugin, tenant_id,
+                                                 network['net-id'])
 
 
 def _filter_network_by_name(network, name, **kwargs):
@@ -99,18 +106,22 @@ def _filter_port_has_interface(port, has_interface, **kwargs):
 
 def _do_filtering(items, filters, filter_opts, plugin,
                   tenant_id, network_id=None):
+    # Options which are not filters, such as unknown query parameters,
+    # are ignored
+    applied_filters = [flt for flt in filters if flt in filter_opts]
+    if not applied_filters:
+        return items
     filtered_items = []
     for item in items:
         is_filter_match = False
-        for flt in filters:
-            if flt in filter_opts:
-                is_filter_match = filters[flt](item,
-                                               filter_opts[flt],
-                                               plugin=plugin,
-                                               tenant_id=tenant_id,
-                                               network_id=network_id)
-                if not is_filter_match:
-                    break
+        for flt in applied_filters:
+            is_filter_match = filters[flt](item,
+                                           filter_opts[flt],
+                                           plugin=plugin,
+                                           tenant_id=tenant_id,
+                                           network_id=network_id)
+            if not is_filter_match:
+                break
         if is_filter_match:
             filtered_items.append(item)
     return filtered_items
@@ -136,6 +147,7 @@ def filter_networks(networks, plugin, tenant_id, filter_opts):
 
 
 def filter_ports(ports, plugin, tenant_id, network_id, filter_opts):
+    """ports must carry port details, as returned by get_port_details"""
     # Do filtering only if the plugin supports it
     # and if filtering options have been specific
     if len(filter_opts) == 0:
@@ -147,10 +159,6 @@ def filter_ports(ports, plugin, tenant_id, network_id, filter_opts):
         'op-status': _filter_port_by_op_status,
         'has-attachment': _filter_port_has_interface,
         'attachment': _filter_port_by_interface}
-    # port details are need for filtering
-    ports = [plugin.get_port_details(tenant_id, network_id,
-                                     port['port-id'])
-              for port in ports]
     # filter ports
     return _do_filtering(ports,
                          filters,
@@ -17,22 +17,44 @@
 # @author: Brad Hall, Nicira Networks, Inc.
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
+import functools
+import itertools
 import logging
+import random
+import time
+
+from eventlet import tpool
 import sqlalchemy as sql
 from sqlalchemy import create_engine
+from sqlalchemy.engine import reflection
 from sqlalchemy.exc import DisconnectionError
-from sqlalchemy.orm import sessionmaker, exc
+from sqlalchemy.orm import exc, joinedload, sessionmaker
 
 from quantum.api.api_common import OperationalStatus
 from quantum.common import exceptions as q_exc
+from quantum.db import context
 from quantum.db import models
 
 
 _ENGINE = None
 _MAKER = None
+_READ_ENGINES = []
+_READ_MAKERS = []
+_USE_TPOOL = False
+_SLOW_QUERY_TIME = 0.0
+# Rows fetched at a time by network_iter and port_iter
+ITER_BATCH_SIZE = 100
 BASE = models.BASE
 LOG = logging.getLogger('quantum.db.api')
 
+# configure_db option name -> create_engine() argument; these only apply
+# to pooled (non-sqlite) engines
+POOL_OPTIONS = {
+    'sql_pool_size': 'pool_size',
+    'sql_max_overflow': 'max_overflow',
+    'sql_pool_timeout': 'pool_timeout',
+}
+
 
 class MySQLPingListener(object):
 
@@ -55,29 +77,125 @@ class MySQLPingListener(object):
                 raise
 
 
+def _is_true(value):
+    return str(value).lower() in ('true', '1', 'yes', 'on')
+
+
 def configure_db(options):
     """
     Establish the database, create an engine if needed, and
     register the models.
 
-    :param options: Mapping of configuration options
+    :param options: Mapping of configuration options. Besides
+        sql_connection the following optional keys are understood:
+            sql_idle_timeout - seconds before a pooled connection is
+                recycled (default 3600)
+            sql_pool_size, sql_max_overflow, sql_pool_timeout - sizing
+                of the connection pool (SQLAlchemy defaults otherwise)
+            sql_pool_pre_ping - check MySQL connections are alive when
+                they are checked out of the pool (default True)
+            sql_tpool_enable - run DB API calls in eventlet's native
+                thread pool so they do not block the hub (default False)
+            sql_read_connection - comma separated list of read replicas
+                used by GET requests, see get_session
+            sql_instrumentation - count the statements and DB time of
+                every API request (default False)
+            sql_slow_query_time - log statements running for longer
+                than this many seconds (default 0, disabled)
     """
-    global _ENGINE
+    global _ENGINE, _USE_TPOOL, _SLOW_QUERY_TIME
     if not _ENGINE:
         connection_dict = sql.engine.url.make_url(options['sql_connection'])
         engine_args = {
-            'pool_recycle': 3600,
+            'pool_recycle': int(options.get('sql_idle_timeout', 3600)),
             'echo': False,
             'convert_unicode': True,
         }
 
-        if 'mysql' in connection_dict.drivername:
+        is_sqlite = 'sqlite' in connection_dict.drivername
+        for key, arg in POOL_OPTIONS.items():
+            if options.get(key) is None:
+                continue
+            if is_sqlite:
+                LOG.warn("Ignoring %s, sqlite connections are not pooled",
+                         key)
+                continue
+            engine_args[arg] = int(options[key])
+
+        if ('mysql' in connection_dict.drivername and
+            _is_true(options.get('sql_pool_pre_ping', True))):
             engine_args['listeners'] = [MySQLPingListener()]
 
+        _USE_TPOOL = _is_true(options.get('sql_tpool_enable', False))
+        if _USE_TPOOL and is_sqlite:
+            # sqlite connections are bound to the thread that opened them
+            LOG.warn("Ignoring sql_tpool_enable for sqlite")
+            _USE_TPOOL = False
+
         _ENGINE = create_engine(options['sql_connection'], **engine_args)
+        for url in (options.get('sql_read_connection') or '').split(','):
+            if url.strip():
+                _READ_ENGINES.append(create_engine(url.strip(),
+                                                   **engine_args))
+
+        if _is_true(options.get('sql_instrumentation', False)):
+            context.enable_instrumentation()
+        _SLOW_QUERY_TIME = float(options.get('sql_slow_query_time') or 0)
+        if context.instrumentation_enabled() or _SLOW_QUERY_TIME > 0:
+            for engine in [_ENGINE] + _READ_ENGINES:
+                _instrument_engine(engine)
         register_models()
 
 
+def _instrument_engine(engine):
+    """Times every statement run by engine, see configure_db"""
+    sql.event.listen(engine, 'before_cursor_execute', _before_execute)
+    sql.event.listen(engine, 'after_cursor_execute', _after_execute)
+
+
+def _before_execute(conn, cursor, statement, parameters, ctx, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.time())
+
+
+def _after_execute(conn, cursor, statement, parameters, ctx, executemany):
+    elapsed = time.time() - conn.info['query_start_time'].pop()
+    context.record_statement(elapsed)
+    if _SLOW_QUERY_TIME > 0 and elapsed >= _SLOW_QUERY_TIME:
+        request_context = context.get_current()
+        action = request_context and request_context.action
+        LOG.warn("Slow query (%.3fs) in %s: %s", elapsed, action or '-',
+                 statement)
+
+
+def tpool_aware(f):
+    """
+    Runs a DB API call in eventlet's native thread pool when
+    sql_tpool_enable is set, so that a blocking driver call only stalls
+    one OS thread instead of every green thread in the server. The
+    whole call, including connection checkout, runs in the thread pool;
+    nested calls are made directly by eventlet. The pool has 20 threads
+    unless EVENTLET_THREADPOOL_SIZE says otherwise.
+    """
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if _USE_TPOOL:
+            return tpool.execute(_call_in_context, context.get_current(),
+                                 f, args, kwargs)
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def _call_in_context(request_context, f, args, kwargs):
+    # The request context is green thread local, so hand it over to the
+    # native thread running the call
+    previous = context.get_current()
+    context.set_current(request_context)
+    try:
+        return f(*args, **kwargs)
+    finally:
+        context.set_current(previous)
+
+
 def clear_db():
     global _ENGINE
     assert _ENGINE
@@ -85,22 +203,75 @@ def clear_db():
         _ENGINE.execute(table.delete())
 
 
-def get_session(autocommit=True, expire_on_commit=False):
-    """Helper method to grab session"""
+def get_session(autocommit=True, expire_on_commit=False, read_only=False):
+    """Helper method to grab session
+
+    read_only sessions are bound to a read replica when some are
+    configured and the current request allows it: the request is a GET
+    and it has not written anything yet, so it cannot miss its own
+    changes because of replication lag. The replica is chosen at random
+    for each request, and serves all of its reads.
+    """
     global _MAKER, _ENGINE
+    if read_only and _READ_ENGINES and _replica_allowed():
+        if not _READ_MAKERS:
+            for engine in _READ_ENGINES:
+                _READ_MAKERS.append(sessionmaker(
+                    bind=engine,
+                    autocommit=autocommit,
+                    expire_on_commit=expire_on_commit))
+        request_context = context.get_current()
+        if request_context.replica is None:
+            request_context.replica = random.choice(_READ_MAKERS)
+        return request_context.replica()
     if not _MAKER:
         assert _ENGINE
         _MAKER = sessionmaker(bind=_ENGINE,
                               autocommit=autocommit,
                               expire_on_commit=expire_on_commit)
+        sql.event.listen(_MAKER, 'after_flush', _note_write)
     return _MAKER()
 
 
+def _replica_allowed():
+    request_context = context.get_current()
+    return (request_context is not None and request_context.read_only and
+            not request_context.wrote)
+
+
+def _note_write(session, flush_context):
+    request_context = context.get_current()
+    if request_context is not None:
+        request_context.wrote = True
+
+
 def register_models():
     """Register Models and create properties"""
     global _ENGINE
     assert _ENGINE
     BASE.metadata.create_all(_ENGINE)
+    _create_missing_indexes()
+
+
+def _create_missing_indexes():
+    """
+    create_all only creates missing tables, so indexes added to the
+    models after a table was first created have to be added explicitly
+    for existing deployments to pick them up.
+    """
+    inspector = reflection.Inspector.from_engine(_ENGINE)
+    for table in BASE.metadata.sorted_tables:
+        existing = set([index['name']
+                        for index in inspector.get_indexes(table.name)])
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            LOG.info("Creating index %s on table %s", index.name, table.name)
+            try:
+                index.create(_ENGINE)
+            except sql.exc.SQLAlchemyError, ex:
+                # Another server may have created it concurrently
+                LOG.warn("Unable to create index %s: %s", index.name, ex)
 
 
 def unregister_models():
@@ -110,30 +281,251 @@ def unregister_models():
     BASE.metadata.drop_all(_ENGINE)
 
 
+def _ensure_revision(tenant_id):
+    """Starts counting the revisions of tenant_id, if not done yet"""
+    session = get_session()
+    if session.query(models.TenantRevision).\
+      filter_by(tenant_id=tenant_id).\
+      first():
+        return
+    try:
+        with session.begin():
+            session.add(models.TenantRevision(tenant_id))
+    except sql.exc.IntegrityError:
+        # Another request created it concurrently
+        pass
+
+
+def _bump_revision(session, tenant_id):
+    """
+    Records a change to the networks or ports of tenant_id, as part of
+    the transaction of session making the change.
+    """
+    session.query(models.TenantRevision).\
+      filter_by(tenant_id=tenant_id).\
+      update({'revision': models.TenantRevision.revision + 1},
+             synchronize_session=False)
+
+
+@tpool_aware
+def tenant_revision_get(tenant_id):
+    """
+    Returns the revision of the networks and ports of tenant_id, which
+    changes whenever they are changed through this module, or None if it
+    is not known.
+
+    The revision is read from the primary database. Should the read
+    replica serving the current request lag behind it, the rest of the
+    request is served by the primary database too, so that the data it
+    reads is not older than the revision.
+    """
+    revision = _revision_get(get_session(), tenant_id)
+    if _READ_ENGINES and _replica_allowed():
+        replica_revision = _revision_get(get_session(read_only=True),
+                                         tenant_id)
+        if replica_revision != revision:
+            LOG.debug("Read replica is at revision %s of tenant %s "
+                      "instead of %s, reading from the primary database",
+                      replica_revision, tenant_id, revision)
+            context.get_current().read_only = False
+    return revision
+
+
+def _revision_get(session, tenant_id):
+    revision = session.query(models.TenantRevision.revision).\
+      filter_by(tenant_id=tenant_id).\
+      first()
+    return revision and revision[0]
+
+
+@tpool_aware
 def network_create(tenant_id, name, op_status=OperationalStatus.UNKNOWN):
+    _ensure_revision(tenant_id)
     session = get_session()
 
     with session.begin():
         net = models.Network(tenant_id, name, op_status)
         session.add(net)
+        _bump_revision(session, tenant_id)
         session.flush()
         return net
 
 
-def network_all_tenant_list():
+@tpool_aware
+def network_create_bulk(tenant_id, names,
+                        op_status=OperationalStatus.UNKNOWN):
+    _ensure_revision(tenant_id)
     session = get_session()
+
+    with session.begin():
+        nets = [models.Network(tenant_id, name, op_status)
+                for name in names]
+        # Primary keys are generated client side, so the unit of work
+        # emits a single executemany INSERT for the whole batch
+        session.add_all(nets)
+        _bump_revision(session, tenant_id)
+        session.flush()
+        return nets
+
+
+def _match_bool(value, clause):
+    # has-attachment filter values are 'true' or 'false'
+    if value.lower() == 'true':
+        return clause
+    return sql.not_(clause)
+
+
+def _port_op_status_clause(op_status):
+    """Plugins report ports which are not ACTIVE as DOWN, whatever
+    their stored op_status"""
+    if op_status == OperationalStatus.DOWN:
+        return sql.or_(models.Port.state != 'ACTIVE',
+                       models.Port.op_status == op_status)
+    return sql.and_(models.Port.state == 'ACTIVE',
+                    models.Port.op_status == op_status)
+
+
+# API filter name -> function building the matching SQL criterion.
+# Network filters on port attributes match networks with at least one
+# such port, and are evaluated as EXISTS subqueries.
+NETWORK_FILTERS = {
+    'name': lambda value: models.Network.name == value,
+    'op-status': lambda value: models.Network.op_status == value,
+    'port': lambda value: models.Network.ports.any(
+        models.Port.uuid == value),
+    'port-state': lambda value: models.Network.ports.any(
+        models.Port.state == value),
+    'port-op-status': lambda value: models.Network.ports.any(
+        _port_op_status_clause(value)),
+    'attachment': lambda value: models.Network.ports.any(
+        models.Port.interface_id == value),
+    'has-attachment': lambda value: _match_bool(
+        value, models.Network.ports.any(models.Port.interface_id != None)),
+}
+
+PORT_FILTERS = {
+    'state': lambda value: models.Port.state == value,
+    'op-status': _port_op_status_clause,
+    'attachment': lambda value: models.Port.interface_id == value,
+    'has-attachment': lambda value: _match_bool(
+        value, models.Port.interface_id != None),
+}
+
+
+def network_list_args(plugin_kwargs):
+    """
+    Takes over the filter_opts and page_opts passed to a plugin's
+    get_all_networks call that network_list implements, and returns
+    them as network_list keyword arguments.
+    """
+    return _list_args(plugin_kwargs, NETWORK_FILTERS)
+
+
+def port_list_args(plugin_kwargs):
+    """Same as network_list_args, for get_all_ports and port_list"""
+    return _list_args(plugin_kwargs, PORT_FILTERS)
+
+
+def _list_args(plugin_kwargs, supported_filters):
+    filter_opts = plugin_kwargs.get('filter_opts') or {}
+    filters = dict((key, filter_opts.pop(key)) for key in filter_opts.keys()
+                   if key in supported_filters)
+    args = {'filters': filters}
+    # Pagination is only pushed down to SQL when no filter is left,
+    # otherwise the API layer has to filter the results first and will
+    # paginate them itself.
+    page_opts = plugin_kwargs.get('page_opts')
+    if page_opts and not filter_opts:
+        args['limit'] = page_opts.pop('limit', None)
+        args['marker'] = page_opts.pop('marker', None)
+    return args
+
+
+def _filter_query(query, filters, supported_filters):
+    for key, value in (filters or {}).items():
+        query = query.filter(supported_filters[key](value))
+    return query
+
+
+def _paginate_query(query, column, limit=None, marker=None):
+    """Keyset pagination: items are ordered by column and the page
+    starts right after the marker value"""
+    if limit is None and marker is None:
+        return query
+    query = query.order_by(column)
+    if marker is not None:
+        query = query.filter(column > marker)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _iter_batches(query, column, limit=None, marker=None):
+    """Returns an iterator over the rows of query ordered by column,
+    which fetches them ITER_BATCH_SIZE at a time. The first batch is
+    fetched right away, so that its errors are raised by the call."""
+    batches = _batches(query, column, limit, marker)
+    first_batch = next(batches, [])
+    return itertools.chain(first_batch, itertools.chain.from_iterable(batches))
+
+
+def _batches(query, column, limit, marker):
+    while limit is None or limit > 0:
+        size = ITER_BATCH_SIZE
+        if limit is not None:
+            size = min(size, limit)
+            limit -= size
+        rows = _fetch_batch(query, column, size, marker)
+        if rows:
+            yield rows
+        if len(rows) < size:
+            return
+        marker = getattr(rows[-1], column.key)
+
+
+@tpool_aware
+def _fetch_batch(query, column, size, marker):
+    return _paginate_query(query, column, size, marker).all()
+
+
+@tpool_aware
+def network_all_tenant_list():
+    session = get_session(read_only=True)
     return session.query(models.Network).all()
 
 
-def network_list(tenant_id):
-    session = get_session()
-    return session.query(models.Network).\
-      filter_by(tenant_id=tenant_id).\
-      all()
+@tpool_aware
+def network_list(tenant_id, limit=None, marker=None, filters=None):
+    return _network_list_query(tenant_id, limit, marker, filters).all()
+
+
+def network_iter(tenant_id, limit=None, marker=None, filters=None):
+    """
+    Same as network_list, but returns an iterator which fetches the
+    networks, ordered by uuid, ITER_BATCH_SIZE rows at a time as it is
+    consumed.
+
+    The session is created before this returns, so that it is bound to
+    the engine the current request context selects. Every batch is a
+    keyset paginated query of its own, run like any tpool_aware call,
+    so no connection is held while the caller consumes the rows. The
+    first batch is fetched before this returns.
+    """
+    query = _network_list_query(tenant_id, None, None, filters)
+    return _iter_batches(query, models.Network.uuid, limit, marker)
+
 
+def _network_list_query(tenant_id, limit, marker, filters):
+    session = get_session(read_only=True)
+    query = session.query(models.Network).\
+      filter_by(tenant_id=tenant_id)
+    query = _filter_query(query, filters, NETWORK_FILTERS)
+    return _paginate_query(query, models.Network.uuid, limit, marker)
 
+
+@tpool_aware
 def network_get(net_id):
-    session = get_session()
+    session = get_session(read_only=True)
     try:
         return  session.query(models.Network).\
             filter_by(uuid=net_id).\
@@ -142,38 +534,45 @@ def network_get(net_id):
         raise q_exc.NetworkNotFound(net_id=net_id)
 
 
+@tpool_aware
 def network_update(net_id, tenant_id, **kwargs):
     session = get_session()
     net = network_get(net_id)
     for key in kwargs.keys():
         net[key] = kwargs[key]
-    session.merge(net)
-    session.flush()
+    with session.begin():
+        session.merge(net)
+        _bump_revision(session, net.tenant_id)
+        session.flush()
     return net
 
 
+@tpool_aware
 def network_destroy(net_id):
     session = get_session()
     try:
-        net = session.query(models.Network).\
-          filter_by(uuid=net_id).\
-          one()
-
-        ports = session.query(models.Port).\
-            filter_by(network_id=net_id).\
-            all()
-        for p in ports:
-            session.delete(p)
-
-        session.delete(net)
-        session.flush()
-        return net
+        with session.begin():
+            net = session.query(models.Network).\
+              filter_by(uuid=net_id).\
+              one()
+
+            ports = session.query(models.Port).\
+                filter_by(network_id=net_id).\
+                all()
+            for p in ports:
+                session.delete(p)
+
+            session.delete(net)
+            _bump_revision(session, net.tenant_id)
+            session.flush()
+            return net
     except exc.NoResultFound:
         raise q_exc.NetworkNotFound(net_id=net_id)
 
 
+@tpool_aware
 def validate_network_ownership(tenant_id, net_id):
-    session = get_session()
+    session = get_session(read_only=True)
     try:
         return  session.query(models.Network).\
             filter_by(uuid=net_id).\
@@ -183,9 +582,24 @@ def validate_network_ownership(tenant_id, net_id):
         raise q_exc.NetworkNotFound(net_id=net_id)
 
 
+@tpool_aware
+def network_get_with_ports(tenant_id, net_id):
+    """Fetch a tenant's network, loading its ports in the same query"""
+    session = get_session(read_only=True)
+    try:
+        return session.query(models.Network).\
+            options(joinedload(models.Network.ports)).\
+            filter_by(uuid=net_id).\
+            filter_by(tenant_id=tenant_id).\
+            one()
+    except exc.NoResultFound:
+        raise q_exc.NetworkNotFound(net_id=net_id)
+
+
+@tpool_aware
 def port_create(net_id, state=None, op_status=OperationalStatus.UNKNOWN):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
 
     session = get_session()
     with session.begin():
@@ -196,24 +610,62 @@ def port_create(net_id, state=None, op_status=OperationalStatus.UNKNOWN):
             raise q_exc.StateInvalid(port_state=state)
         port['state'] = state
         session.add(port)
+        _bump_revision(session, net.tenant_id)
         session.flush()
         return port
 
 
-def port_list(net_id):
+@tpool_aware
+def port_create_bulk(net_id, states,
+                     op_status=OperationalStatus.UNKNOWN):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
+
+    ports = []
+    for state in states:
+        if state is None:
+            state = 'DOWN'
+        elif state not in ('ACTIVE', 'DOWN'):
+            raise q_exc.StateInvalid(port_state=state)
+        port = models.Port(net_id, op_status)
+        port['state'] = state
+        ports.append(port)
+
     session = get_session()
-    return session.query(models.Port).\
-      filter_by(network_id=net_id).\
-      all()
+    with session.begin():
+        session.add_all(ports)
+        _bump_revision(session, net.tenant_id)
+        session.flush()
+        return ports
+
+
+@tpool_aware
+def port_list(net_id, limit=None, marker=None, filters=None):
+    return _port_list_query(net_id, limit, marker, filters).all()
+
+
+def port_iter(net_id, limit=None, marker=None, filters=None):
+    """Same as port_list, returning an iterator like network_iter"""
+    query = _port_list_query(net_id, None, None, filters)
+    return _iter_batches(query, models.Port.uuid, limit, marker)
+
+
+def _port_list_query(net_id, limit, marker, filters):
+    # confirm network exists
+    network_get(net_id)
+    session = get_session(read_only=True)
+    query = session.query(models.Port).\
+      filter_by(network_id=net_id)
+    query = _filter_query(query, filters, PORT_FILTERS)
+    return _paginate_query(query, models.Port.uuid, limit, marker)
 
 
+@tpool_aware
 def port_get(port_id, net_id, session=None):
     # confirm network exists
     network_get(net_id)
     if not session:
-        session = get_session()
+        session = get_session(read_only=True)
     try:
         return session.query(models.Port).\
           filter_by(uuid=port_id).\
@@ -223,9 +675,34 @@ def port_get(port_id, net_id, session=None):
         raise q_exc.PortNotFound(net_id=net_id, port_id=port_id)
 
 
+@tpool_aware
+def port_get_for_tenant(tenant_id, net_id, port_id, session=None):
+    """Fetch a port, validating network and port ownership in one query.
+
+    The port table is outer joined to the tenant's network so a missing
+    network and a missing port can still be told apart.
+    """
+    if not session:
+        session = get_session(read_only=True)
+    result = session.query(models.Network, models.Port).\
+      outerjoin(models.Port,
+                sql.and_(models.Port.network_id == models.Network.uuid,
+                         models.Port.uuid == port_id)).\
+      filter(models.Network.uuid == net_id).\
+      filter(models.Network.tenant_id == tenant_id).\
+      first()
+    if result is None:
+        raise q_exc.NetworkNotFound(net_id=net_id)
+    port = result[1]
+    if port is None:
+        raise q_exc.PortNotFound(net_id=net_id, port_id=port_id)
+    return port
+
+
+@tpool_aware
 def port_update(port_id, net_id, **kwargs):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
     port = port_get(port_id, net_id)
     session = get_session()
     for key in kwargs.keys():
@@ -233,14 +710,17 @@ def port_update(port_id, net_id, **kwargs):
             if kwargs[key] not in ('ACTIVE', 'DOWN'):
                 raise q_exc.StateInvalid(port_state=kwargs[key])
         port[key] = kwargs[key]
-    session.merge(port)
-    session.flush()
+    with session.begin():
+        session.merge(port)
+        _bump_revision(session, net.tenant_id)
+        session.flush()
     return port
 
 
+@tpool_aware
 def port_set_attachment(port_id, net_id, new_interface_id):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
 
     session = get_session()
     port = port_get(port_id, net_id)
@@ -263,42 +743,50 @@ def port_set_attachment(port_id, net_id, new_interface_id):
             # this is what should happen
             pass
     port.interface_id = new_interface_id
-    session.merge(port)
-    session.flush()
+    with session.begin():
+        session.merge(port)
+        _bump_revision(session, net.tenant_id)
+        session.flush()
     return port
 
 
+@tpool_aware
 def port_unset_attachment(port_id, net_id):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
 
     session = get_session()
     port = port_get(port_id, net_id, session)
     port.interface_id = None
-    session.add(port)
-    session.flush()
+    with session.begin():
+        session.add(port)
+        _bump_revision(session, net.tenant_id)
+        session.flush()
 
 
+@tpool_aware
 def port_destroy(port_id, net_id):
     # confirm network exists
-    network_get(net_id)
+    net = network_get(net_id)
 
     session = get_session()
     try:
-        port = session.query(models.Port).\
-          filter_by(uuid=port_id).\
-          filter_by(network_id=net_id).\
-          one()
-        if port['interface_id']:
-            raise q_exc.PortInUse(net_id=net_id, port_id=port_id,
-                                att_id=port['interface_id'])
-        session.delete(port)
-        session.flush()
-        return port
+        with session.begin():
+            port = session.query(models.Port).\
+              filter_by(uuid=port_id).\
+              filter_by(network_id=net_id).\
+              one()
+            if port['interface_id']:
+                raise q_exc.PortInUse(net_id=net_id, port_id=port_id,
+                                    att_id=port['interface_id'])
+            session.delete(port)
+            _bump_revision(session, net.tenant_id)
+            session.flush()
+            return port
     except exc.NoResultFound:
         raise q_exc.PortNotFound(port_id=port_id)
 
 
+@tpool_aware
 def validate_port_ownership(tenant_id, net_id, port_id, session=None):
-    validate_network_ownership(tenant_id, net_id)
-    port_get(port_id, net_id)
+    return port_get_for_tenant(tenant_id, net_id, port_id, session)
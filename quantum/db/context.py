@@ -0,0 +1,138 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Per-request database state.
+
+The API router opens a request context around every request it
+dispatches and quantum.db.api consults it to decide which engine serves
+a query. The context is green thread local, so it is only visible to the
+request that opened it. This module deliberately has no dependencies on
+the rest of Quantum so that both layers can import it.
+
+When SQL instrumentation is enabled (sql_instrumentation, see
+quantum.db.api.configure_db) the context also counts the statements a
+request issues and the time spent running them, and the totals are
+aggregated per controller action.
+"""
+
+import contextlib
+
+from eventlet import corolocal
+
+
+_LOCAL = corolocal.local()
+_INSTRUMENTATION = False
+# controller action -> {'requests': n, 'queries': n, 'db_time': seconds}
+_ACTION_STATISTICS = {}
+
+
+class RequestContext(object):
+
+    def __init__(self, read_only=False):
+        # Reads may be served by a replica
+        self.read_only = read_only
+        # Set once the request has written to the primary database
+        self.wrote = False
+        # Session maker of the read replica serving the request
+        self.replica = None
+        # Controller action serving the request, e.g. 'networks.index'
+        self.action = None
+        self.queries = 0
+        self.db_time = 0.0
+
+
+def get_current():
+    """Returns the context of the running request, or None"""
+    return getattr(_LOCAL, 'context', None)
+
+
+def set_current(context):
+    _LOCAL.context = context
+
+
+@contextlib.contextmanager
+def request_context(read_only=False):
+    """Runs the enclosed block as a single request"""
+    previous = get_current()
+    context = RequestContext(read_only)
+    set_current(context)
+    try:
+        yield context
+    finally:
+        set_current(previous)
+
+
+class ContextIterator(object):
+    """
+    Iterates over iterable in a request context, for response bodies
+    which are streamed, and read from the database, once the block
+    opened by request_context has exited.
+    """
+
+    def __init__(self, context, iterable):
+        self.context = context
+        self.iterable = iterable
+        self.iterator = iter(iterable)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        previous = get_current()
+        set_current(self.context)
+        try:
+            return next(self.iterator)
+        finally:
+            set_current(previous)
+
+    def close(self):
+        if hasattr(self.iterable, 'close'):
+            self.iterable.close()
+
+
+def enable_instrumentation():
+    global _INSTRUMENTATION
+    _INSTRUMENTATION = True
+
+
+def instrumentation_enabled():
+    return _INSTRUMENTATION
+
+
+def record_statement(duration):
+    """Accounts for a SQL statement run by the current request"""
+    context = get_current()
+    if context is not None:
+        context.queries += 1
+        context.db_time += duration
+
+
+def record_request(context):
+    """Adds a finished request to the statistics of its action"""
+    stats = _ACTION_STATISTICS.setdefault(context.action or 'unknown',
+                                          {'requests': 0,
+                                           'queries': 0,
+                                           'db_time': 0.0})
+    stats['requests'] += 1
+    stats['queries'] += context.queries
+    stats['db_time'] += context.db_time
+
+
+def get_action_statistics():
+    """Returns a copy of the per action statistics"""
+    return dict((action, dict(stats))
+                for action, stats in _ACTION_STATISTICS.items())
@@ -20,7 +20,7 @@
 
 import uuid
 
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relation, object_mapper
 
@@ -70,8 +70,8 @@ class Port(BASE, QuantumBase):
 
     uuid = Column(String(255), primary_key=True)
     network_id = Column(String(255), ForeignKey("networks.uuid"),
-                        nullable=False)
-    interface_id = Column(String(255), nullable=True)
+                        nullable=False, index=True)
+    interface_id = Column(String(255), nullable=True, index=True)
     # Port state - Hardcoding string value at the moment
     state = Column(String(8))
     op_status = Column(String(16))
@@ -95,7 +95,7 @@ class Network(BASE, QuantumBase):
     __tablename__ = 'networks'
 
     uuid = Column(String(255), primary_key=True)
-    tenant_id = Column(String(255), nullable=False)
+    tenant_id = Column(String(255), nullable=False, index=True)
     name = Column(String(255))
     ports = relation(Port, order_by=Port.uuid, backref="network")
     op_status = Column(String(16))
@@ -110,3 +110,18 @@ class Network(BASE, QuantumBase):
     def __repr__(self):
         return "<Network(%s,%s,%s,%s)>" % \
           (self.uuid, self.name, self.op_status, self.tenant_id)
+
+
+class TenantRevision(BASE, QuantumBase):
+    """Counts the changes made to the networks and ports of a tenant"""
+    __tablename__ = 'tenant_revisions'
+
+    tenant_id = Column(String(255), primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+
+    def __init__(self, tenant_id):
+        self.tenant_id = tenant_id
+        self.revision = 0
+
+    def __repr__(self):
+        return "<TenantRevision(%s,%s)>" % (self.tenant_id, self.revision)
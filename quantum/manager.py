@@ -23,6 +23,7 @@ instantiating the correct plugin that concretely implement quantum_plugin_base
 class.
 The caller should make sure that QuantumManager is a singleton.
 """
+import ConfigParser
 import gettext
 import logging
 import os
@@ -32,11 +33,15 @@ gettext.install('quantum', unicode=1)
 from quantum.common import utils
 from quantum.common.config import find_config_file
 from quantum.common.exceptions import ClassNotFound
+from quantum import plugin_cache
+from quantum import provisioning
 from quantum_plugin_base import QuantumPluginBase
 
 LOG = logging.getLogger('quantum.manager')
 CONFIG_FILE = "plugins.ini"
 LOG = logging.getLogger('quantum.manager')
+CACHE_OPTIONS = ('cache_size', 'cache_ttl', 'cache_tenants')
+PROVISIONING_OPTIONS = ('provisioning_workers', 'provisioning_max_jobs')
 
 
 def find_config(basepath):
@@ -46,6 +51,23 @@ def find_config(basepath):
     return None
 
 
+def get_plugin_options(options, config_file, names):
+    """
+    Returns the values of the options listed in names, taken from options
+    or else from the [PLUGIN] section of config_file.
+    """
+    plugin_options = {}
+    config = ConfigParser.ConfigParser()
+    if config_file:
+        config.read(config_file)
+    for name in names:
+        if name in options:
+            plugin_options[name] = options[name]
+        elif config.has_option("PLUGIN", name):
+            plugin_options[name] = config.get("PLUGIN", name)
+    return plugin_options
+
+
 class QuantumManager(object):
 
     _instance = None
@@ -81,8 +103,38 @@ class QuantumManager(object):
                       "All compatibility tests passed")
         self.plugin = plugin_klass()
 
+        cache_options = get_plugin_options(options, self.configuration_file,
+                                           CACHE_OPTIONS)
+        if (int(cache_options.get('cache_size', 0)) > 0 and
+            getattr(self.plugin, 'supports_caching', False)):
+            LOG.debug("Caching plug-in results: %s", cache_options)
+            self.plugin = plugin_cache.CachingPlugin(self.plugin,
+                                                     **cache_options)
+
+        self.provisioner = None
+        provisioning_options = get_plugin_options(options,
+                                                  self.configuration_file,
+                                                  PROVISIONING_OPTIONS)
+        workers = int(provisioning_options.get('provisioning_workers', 0))
+        if workers > 0 and (hasattr(self.plugin, 'create_network_async') or
+                            hasattr(self.plugin, 'create_port_async')):
+            LOG.debug("Provisioning resources with %d workers", workers)
+            self.provisioner = provisioning.Provisioner(
+                workers,
+                provisioning_options.get('provisioning_max_jobs', 1000))
+
     @classmethod
     def get_plugin(cls, options=None, config_file=None):
         if cls._instance is None:
             cls._instance = cls(options, config_file)
         return cls._instance.plugin
+
+    @classmethod
+    def get_provisioner(cls):
+        """
+        Returns the Provisioner running the device side work of the
+        resources created asynchronously, or None if they are not.
+        """
+        if cls._instance is None:
+            return None
+        return cls._instance.provisioner
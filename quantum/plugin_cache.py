@@ -0,0 +1,217 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Read-through cache of Plug-in results.
+
+CachingPlugin wraps a Plug-in and remembers, for every tenant, the
+results of the last cache_size distinct read calls (get_all_networks,
+get_network_details, ...) for cache_ttl seconds, evicting the least
+recently used ones first. Any other call made through it for a tenant,
+e.g. create_network or plug_interface, drops everything cached for the
+tenant. Changes made without going through the same QuantumManager
+(another quantum-server process, an agent updating operational status,
+the NVP controller...) are only seen once the cached results expire.
+
+QuantumManager only wraps Plug-ins which set the class attribute
+supports_caching to True; see plugins.ini for the options.
+"""
+
+import collections
+import copy
+import time
+
+
+# Plug-in methods whose results are cached; each takes the tenant id as
+# its first argument
+CACHED_METHODS = ('get_all_networks',
+                  'get_network_details',
+                  'get_network_details_with_ports',
+                  'get_all_ports',
+                  'get_all_ports_details',
+                  'get_port_details',
+                  'get_interface_details')
+# Plug-in methods which neither read through nor invalidate the cache
+UNCACHED_METHODS = ('iter_all_networks',
+                    'iter_all_ports',
+                    'get_revision')
+
+
+def _freeze(value):
+    """Returns a hashable equivalent of a call argument"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.iteritems()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _LRUDict(object):
+    """
+    Mapping which remembers the order its keys were set in, least
+    recently set first (collections.OrderedDict is not available on
+    Python 2.6). Setting or popping a key is linear in the number of
+    keys, which are few.
+    """
+
+    __slots__ = ('_values', '_order')
+
+    def __init__(self):
+        self._values = {}
+        self._order = collections.deque()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __setitem__(self, key, value):
+        if key in self._values:
+            self._order.remove(key)
+        self._values[key] = value
+        self._order.append(key)
+
+    def pop(self, key, default=None):
+        if key not in self._values:
+            return default
+        self._order.remove(key)
+        return self._values.pop(key)
+
+    def pop_oldest(self):
+        """Removes the least recently set key and returns its value"""
+        return self._values.pop(self._order.popleft())
+
+    def values(self):
+        return [self._values[key] for key in self._order]
+
+    def clear(self):
+        self._values.clear()
+        self._order.clear()
+
+
+class _TenantCache(object):
+
+    __slots__ = ('entries', 'generation')
+
+    def __init__(self):
+        # key -> (expiry time, result, options left by the plugin)
+        self.entries = _LRUDict()
+        # Incremented whenever the tenant's entries are dropped
+        self.generation = 0
+
+
+class CachingPlugin(object):
+    """Plug-in proxy caching the results of read calls per tenant"""
+
+    def __init__(self, plugin, cache_size=100, cache_ttl=5.0,
+                 cache_tenants=1000):
+        self._plugin = plugin
+        self._size = int(cache_size)
+        self._ttl = float(cache_ttl)
+        self._max_tenants = int(cache_tenants)
+        # tenant id -> _TenantCache, least recently used first
+        self._tenants = _LRUDict()
+        self.hits = 0
+        self.misses = 0
+        for name in CACHED_METHODS:
+            if hasattr(plugin, name):
+                setattr(self, name, self._cached(name))
+
+    # isinstance() checks, such as the one made for extension interfaces,
+    # have to see the Plug-in's class
+    @property
+    def __class__(self):
+        return self._plugin.__class__
+
+    def __getattr__(self, name):
+        value = getattr(self._plugin, name)
+        if (name in UNCACHED_METHODS or name.startswith('_') or
+            not callable(value)):
+            return value
+        return self._invalidating(name, value)
+
+    def cache_statistics(self):
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'entries': sum(len(tenant.entries)
+                               for tenant in self._tenants.values())}
+
+    def invalidate(self, tenant_id=None):
+        """Drops the cached results of tenant_id, or of every tenant"""
+        if tenant_id is None:
+            tenants = self._tenants.values()
+            self._tenants.clear()
+        else:
+            tenants = [self._tenants.pop(tenant_id, _TenantCache())]
+        for tenant in tenants:
+            tenant.generation += 1
+
+    def _tenant(self, tenant_id):
+        tenant = self._tenants.pop(tenant_id, None)
+        if tenant is None:
+            tenant = _TenantCache()
+            if len(self._tenants) >= self._max_tenants:
+                self._tenants.pop_oldest()
+        self._tenants[tenant_id] = tenant
+        return tenant
+
+    def _cached(self, name):
+        method = getattr(self._plugin, name)
+
+        def read_through(tenant_id, *args, **kwargs):
+            tenant = self._tenant(tenant_id)
+            key = (name, _freeze(args), _freeze(kwargs))
+            now = time.time()
+            entry = tenant.entries.pop(key, None)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                tenant.entries[key] = entry
+                result, options = entry[1:]
+                # Plug-ins remove the filter and page options they
+                # implemented from the caller's dicts
+                for option, value in options.iteritems():
+                    kwargs[option].clear()
+                    kwargs[option].update(value)
+                return copy.deepcopy(result)
+
+            self.misses += 1
+            generation = tenant.generation
+            result = method(tenant_id, *args, **kwargs)
+            # Do not store what was read while the tenant's resources
+            # were being changed
+            if tenant.generation == generation:
+                options = dict((option, dict(value))
+                               for option, value in kwargs.iteritems()
+                               if isinstance(value, dict))
+                tenant.entries[key] = (now + self._ttl,
+                                       copy.deepcopy(result), options)
+                if len(tenant.entries) > self._size:
+                    tenant.entries.pop_oldest()
+            return result
+
+        read_through.__name__ = name
+        return read_through
+
+    def _invalidating(self, name, method):
+        def call(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            finally:
+                if args:
+                    self.invalidate(args[0])
+                else:
+                    self.invalidate(kwargs.get('tenant_id'))
+
+        call.__name__ = name
+        return call
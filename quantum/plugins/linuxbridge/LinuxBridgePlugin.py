@@ -68,7 +68,8 @@ class LinuxBridgePlugin(QuantumPluginBase):
         the specified tenant.
         """
         LOG.debug("LinuxBridgePlugin.get_all_networks() called")
-        networks_list = db.network_list(tenant_id)
+        networks_list = db.network_list(tenant_id,
+                                        **db.network_list_args(kwargs))
         new_networks_list = []
         for network in networks_list:
             new_network_dict = cutil.make_net_dict(network[const.UUID],
@@ -76,17 +77,27 @@ class LinuxBridgePlugin(QuantumPluginBase):
                                                    [], network[const.OPSTATUS])
             new_networks_list.append(new_network_dict)
 
-        # This plugin does not perform filtering at the moment
         return new_networks_list
 
+    def iter_all_networks(self, tenant_id, **kwargs):
+        """
+        Same as get_all_networks, returning an iterator so that
+        the networks can be streamed to the client.
+        """
+        LOG.debug("LinuxBridgePlugin.iter_all_networks() called")
+        networks = db.network_iter(tenant_id, **db.network_list_args(kwargs))
+        return (cutil.make_net_dict(network[const.UUID],
+                                    network[const.NETWORKNAME],
+                                    [], network[const.OPSTATUS])
+                for network in networks)
+
     def get_network_details(self, tenant_id, net_id):
         """
         retrieved a list of all the remote vifs that
         are attached to the network
         """
         LOG.debug("LinuxBridgePlugin.get_network_details() called")
-        db.validate_network_ownership(tenant_id, net_id)
-        network = db.network_get(net_id)
+        network = db.validate_network_ownership(tenant_id, net_id)
         ports_list = db.port_list(net_id)
         ports_on_net = []
         for port in ports_list:
@@ -100,6 +111,19 @@ class LinuxBridgePlugin(QuantumPluginBase):
 
         return new_network
 
+    def get_network_details_with_ports(self, tenant_id, net_id):
+        """
+        Same as get_network_details, the network and its ports are
+        loaded with a single query
+        """
+        LOG.debug("LinuxBridgePlugin.get_network_details_with_ports() called")
+        network = db.network_get_with_ports(tenant_id, net_id)
+        ports_on_net = [cutil.make_port_dict(port) for port in network.ports]
+        return cutil.make_net_dict(network[const.UUID],
+                                   network[const.NETWORKNAME],
+                                   ports_on_net,
+                                   network[const.OPSTATUS])
+
     def create_network(self, tenant_id, net_name, **kwargs):
         """
         Creates a new Virtual Network, and assigns it
@@ -168,25 +192,41 @@ class LinuxBridgePlugin(QuantumPluginBase):
         """
         LOG.debug("LinuxBridgePlugin.get_all_ports() called")
         db.validate_network_ownership(tenant_id, net_id)
-        network = db.network_get(net_id)
-        ports_list = db.port_list(net_id)
+        ports_list = db.port_list(net_id, **db.port_list_args(kwargs))
         ports_on_net = []
         for port in ports_list:
             new_port = cutil.make_port_dict(port)
             ports_on_net.append(new_port)
 
-        # This plugin does not perform filtering at the moment
         return ports_on_net
 
+    def iter_all_ports(self, tenant_id, net_id, **kwargs):
+        """
+        Same as get_all_ports, returning an iterator so that
+        the ports can be streamed to the client.
+        """
+        LOG.debug("LinuxBridgePlugin.iter_all_ports() called")
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_iter(net_id, **db.port_list_args(kwargs))
+        return (cutil.make_port_dict(port) for port in ports)
+
+    def get_all_ports_details(self, tenant_id, net_id, **kwargs):
+        """
+        Retrieves the details of all the ports belonging to the
+        specified Virtual Network.
+        """
+        LOG.debug("LinuxBridgePlugin.get_all_ports_details() called")
+        db.validate_network_ownership(tenant_id, net_id)
+        ports_list = db.port_list(net_id, **db.port_list_args(kwargs))
+        return [cutil.make_port_dict(port) for port in ports_list]
+
     def get_port_details(self, tenant_id, net_id, port_id):
         """
         This method allows the user to retrieve a remote interface
         that is attached to this particular port.
         """
         LOG.debug("LinuxBridgePlugin.get_port_details() called")
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        network = db.network_get(net_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         new_port_dict = cutil.make_port_dict(port)
         return new_port_dict
 
@@ -202,13 +242,23 @@ class LinuxBridgePlugin(QuantumPluginBase):
         new_port_dict = cutil.make_port_dict(port)
         return new_port_dict
 
+    def create_port_bulk(self, tenant_id, net_id, ports):
+        """
+        Creates several ports on the specified Virtual Network
+        in a single transaction.
+        """
+        LOG.debug("LinuxBridgePlugin.create_port_bulk() called")
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_create_bulk(net_id, [p.get('state') for p in ports],
+                                    op_status=OperationalStatus.DOWN)
+        return [cutil.make_port_dict(port) for port in ports]
+
     def update_port(self, tenant_id, net_id, port_id, **kwargs):
         """
         Updates the attributes of a port on the specified Virtual Network.
         """
         LOG.debug("LinuxBridgePlugin.update_port() called")
         db.validate_port_ownership(tenant_id, net_id, port_id)
-        network = db.network_get(net_id)
         self._validate_port_state(kwargs["state"])
         port = db.port_update(port_id, net_id, **kwargs)
 
@@ -223,9 +273,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         is deleted.
         """
         LOG.debug("LinuxBridgePlugin.delete_port() called")
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        network = db.network_get(net_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         attachment_id = port[const.INTERFACEID]
         if not attachment_id:
             db.port_destroy(port_id, net_id)
@@ -241,9 +289,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         specified Virtual Network.
         """
         LOG.debug("LinuxBridgePlugin.plug_interface() called")
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        network = db.network_get(net_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         attachment_id = port[const.INTERFACEID]
         if attachment_id:
             raise exc.PortInUse(port_id=port_id, net_id=net_id,
@@ -256,9 +302,7 @@ class LinuxBridgePlugin(QuantumPluginBase):
         specified Virtual Network.
         """
         LOG.debug("LinuxBridgePlugin.unplug_interface() called")
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        network = db.network_get(net_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         attachment_id = port[const.INTERFACEID]
         if attachment_id == None:
             raise exc.InvalidDetach(port_id=port_id, net_id=net_id,
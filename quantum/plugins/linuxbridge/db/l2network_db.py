@@ -41,6 +41,7 @@ def initialize():
                                                                  conf.DB_HOST,
                                                                  conf.DB_PORT,
                                                                  conf.DB_NAME)}
+    options.update(conf.DB_POOL_OPTIONS)
 
     db.configure_db(options)
     create_vlanids()
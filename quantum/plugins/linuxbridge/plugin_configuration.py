@@ -46,3 +46,6 @@ if DB_CONNECTION != 'sqlite':
     DB_PASS = SECTION_CONF['pass']
     DB_HOST = SECTION_CONF['host']
     DB_PORT = SECTION_CONF['port']
+# Optional connection pool settings passed through to quantum.db.api
+DB_POOL_OPTIONS = dict((key, value) for key, value in SECTION_CONF.items()
+                       if key.startswith('sql_'))
@@ -241,6 +241,8 @@ class NvpPlugin(object):
     functionality using NVP.
     '''
     supported_extension_aliases = ["portstats"]
+    # Reads are requests to the NVP controller, worth caching
+    supports_caching = True
 
     def __init__(self, configfile=None, loglevel=None, cli=False):
         if loglevel:
@@ -374,6 +376,27 @@ class NvpPlugin(object):
                   tenant_id, d))
         return d
 
+    def get_network_details_with_ports(self, tenant_id, netw_id):
+        '''
+        Same as get_network_details, with the details of every port
+        of the network in 'net-ports'. All the ports are fetched with
+        a single NVP request.
+
+        :raises: exception.NetworkNotFound
+        :raises: exception.QuantumException
+        '''
+        ports = self.get_all_ports_details(tenant_id, netw_id)
+        result = nvplib.get_network(self.controller, netw_id)
+        d = {"net-id": netw_id,
+             "net-ifaces": [port["attachment"] for port in ports
+                            if port["attachment"] != "None"],
+             "net-name": result["display_name"],
+             "net-op-status": "UP",
+             "net-ports": ports}
+        LOG.debug("get_network_details_with_ports() completed for tenant "
+                  "%s: %s" % (tenant_id, d))
+        return d
+
     def update_network(self, tenant_id, netw_id, **kwargs):
         '''
         Updates the properties of a particular Virtual Network.
@@ -430,6 +453,36 @@ class NvpPlugin(object):
         LOG.debug(ids)
         return ids
 
+    def get_all_ports_details(self, tenant_id, netw_id, **kwargs):
+        '''
+        Retrieves the details of all the ports belonging to the specified
+        Virtual Network. Attachments and operational status are fetched
+        as relations of a single query_ports request rather than with
+        two requests per port.
+
+        :returns: a list of mappings shaped like the result of
+                  get_port_details
+        :raises: exception.NetworkNotFound
+        '''
+        filters = kwargs.get("filter_opts") or {}
+        if not nvplib.check_tenant(self.controller, netw_id, tenant_id):
+            raise exception.NetworkNotFound(net_id=netw_id)
+        lports = nvplib.query_ports(self.controller, netw_id,
+          relations="LogicalPortAttachment,LogicalPortStatus",
+          filters=filters)
+        if filters and "attachment" in filters:
+            del filters["attachment"]
+
+        ports = []
+        for lport in lports:
+            status = lport["_relations"]["LogicalPortStatus"]
+            op_status = "UP" if status["link_status_up"] else "DOWN"
+            ports.append(self._make_port_details(netw_id, lport["uuid"],
+                                                lport, op_status))
+        LOG.debug("get_all_ports_details() completed for tenant: %s" %
+                  tenant_id)
+        return ports
+
     def create_port(self, tenant_id, netw_id, port_init_state=None,
             **params):
         '''
@@ -520,21 +573,24 @@ class NvpPlugin(object):
             raise exception.NetworkNotFound(net_id=netw_id)
         port = nvplib.get_port(self.controller, netw_id, portw_id,
           "LogicalPortAttachment")
-        state = "ACTIVE" if port["admin_status_enabled"] else "DOWN"
         op_status = nvplib.get_port_status(self.controller, netw_id, portw_id)
+        d = self._make_port_details(netw_id, portw_id, port, op_status)
+        LOG.debug("Port details for tenant %s: %s" % (tenant_id, d))
+        return d
 
-        relation = port["_relations"]
+    def _make_port_details(self, netw_id, port_id, lport, op_status):
+        state = "ACTIVE" if lport["admin_status_enabled"] else "DOWN"
+
+        relation = lport["_relations"]
         attach_type = relation["LogicalPortAttachment"]["type"]
 
         vif_uuid = "None"
         if attach_type == "VifAttachment":
             vif_uuid = relation["LogicalPortAttachment"]["vif_uuid"]
 
-        d = {"port-id": portw_id, "attachment": vif_uuid,
-             "net-id": netw_id, "port-state": state,
-             "port-op-status": op_status}
-        LOG.debug("Port details for tenant %s: %s" % (tenant_id, d))
-        return d
+        return {"port-id": port_id, "attachment": vif_uuid,
+                "net-id": netw_id, "port-state": state,
+                "port-op-status": op_status}
 
     def plug_interface(self, tenant_id, netw_id, portw_id,
                        remote_interface_id):
@@ -21,10 +21,11 @@ import urlparse
 import logging
 import request
 import time
-import json
 from common import _conn_str
 from eventlet import timeout
 
+from quantum import jsonutils
+
 
 logging.basicConfig(level=logging.INFO)
 lg = logging.getLogger("nvp_api_request")
@@ -323,7 +324,7 @@ class NvpGetApiProvidersRequestEventlet(NvpApiRequestEventlet):
         try:
             if self.successful():
                 ret = []
-                body = json.loads(self.value.body)
+                body = jsonutils.loads(self.value.body)
                 for node in body.get('results', []):
                     for role in node.get('roles', []):
                         if role.get('role') == 'api_provider':
@@ -15,7 +15,7 @@
 # @author: Brad Hall, Nicira Networks, Inc.
 
 from quantum.common import exceptions as exception
-import json
+from quantum import jsonutils
 import logging
 import NvpApiClient
 
@@ -39,7 +39,7 @@ def check_default_transport_zone(c):
     resp = do_single_request("GET",
         "/ws.v1/transport-zone?uuid=%s" % c.default_tz_uuid,
         controller=c)
-    result = json.loads(resp)
+    result = jsonutils.loads(resp)
     if int(result["result_count"]) == 0:
         msg.append("Unable to find zone \"%s\" for controller \"%s\"" %
             (c.default_tz_uuid, c.name))
@@ -64,7 +64,7 @@ def get_network(controller, net_id):
     path = "/ws.v1/lswitch/%s" % net_id
     try:
         resp_obj = do_single_request("GET", path, controller=controller)
-        network = json.loads(resp_obj)
+        network = jsonutils.loads(resp_obj)
     except NvpApiClient.ResourceNotFound as e:
         raise exception.NetworkNotFound(net_id=net_id)
     except NvpApiClient.NvpApiException as e:
@@ -83,12 +83,12 @@ def create_lswitch(controller, lswitch_obj):
     uri = "/ws.v1/lswitch"
     try:
         resp_obj = do_single_request("POST", uri,
-                                     json.dumps(lswitch_obj),
+                                     jsonutils.dumps(lswitch_obj),
                                      controller=controller)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
 
-    r = json.loads(resp_obj)
+    r = jsonutils.loads(resp_obj)
     d = {}
     d["net-id"] = r["uuid"]
     d["net-name"] = r["display_name"]
@@ -103,14 +103,14 @@ def update_network(controller, network, **kwargs):
         lswitch_obj["display_name"] = kwargs["name"]
     try:
         resp_obj = do_single_request("PUT", uri,
-          json.dumps(lswitch_obj), controller=controller)
+          jsonutils.dumps(lswitch_obj), controller=controller)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Network not found, Error: %s" % str(e))
         raise exception.NetworkNotFound(net_id=network)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
 
-    obj = json.loads(resp_obj)
+    obj = jsonutils.loads(resp_obj)
     return obj
 
 
@@ -125,7 +125,7 @@ def get_all_networks(controller, tenant_id, networks):
         raise exception.QuantumException()
     if not resp_obj:
         return []
-    lswitches = json.loads(resp_obj)["results"]
+    lswitches = jsonutils.loads(resp_obj)["results"]
     for lswitch in lswitches:
         net_id = lswitch["uuid"]
         if net_id not in [x["net-id"] for x in networks]:
@@ -145,7 +145,7 @@ def query_networks(controller, tenant_id, fields="*", tags=None):
         raise exception.QuantumException()
     if not resp_obj:
         return []
-    lswitches = json.loads(resp_obj)["results"]
+    lswitches = jsonutils.loads(resp_obj)["results"]
     nets = [{'net-id': lswitch["uuid"],
              'net-name': lswitch["display_name"]}
              for lswitch in lswitches]
@@ -202,7 +202,7 @@ def get_port_stats(controller, network_id, port_id):
     try:
         path = "/ws.v1/lswitch/%s/lport/%s/statistic" % (network_id, port_id)
         resp = do_single_request("GET", path, controller=controller)
-        stats = json.loads(resp)
+        stats = jsonutils.loads(resp)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port_id, net_id=network_id)
@@ -236,7 +236,7 @@ def query_ports(controller, network, relations=None, fields="*", filters=None):
         raise exception.NetworkNotFound(net_id=network)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
-    return json.loads(resp_obj)["results"]
+    return jsonutils.loads(resp_obj)["results"]
 
 
 def delete_port(controller, network, port):
@@ -254,7 +254,7 @@ def delete_all_ports(controller, ls_uuid):
     res = do_single_request("GET",
       "/ws.v1/lswitch/%s/lport?fields=uuid" % ls_uuid,
       controller=controller)
-    res = json.loads(res)
+    res = jsonutils.loads(res)
     for r in res["results"]:
         do_single_request("DELETE",
           "/ws.v1/lswitch/%s/lport/%s" % (ls_uuid, r["uuid"]),
@@ -267,7 +267,7 @@ def get_port(controller, network, port, relations=None):
         uri += "relations=%s" % relations
     try:
         resp_obj = do_single_request("GET", uri, controller=controller)
-        port = json.loads(resp_obj)
+        port = jsonutils.loads(resp_obj)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port or Network not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port, net_id=network)
@@ -286,7 +286,7 @@ def plug_interface(controller, network, port, type, attachment=None):
     lport_obj["type"] = type
     try:
         resp_obj = do_single_request("PUT", uri,
-          json.dumps(lport_obj), controller=controller)
+          jsonutils.dumps(lport_obj), controller=controller)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port or Network not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port, net_id=network)
@@ -300,7 +300,7 @@ def plug_interface(controller, network, port, type, attachment=None):
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
 
-    result = json.dumps(resp_obj)
+    result = jsonutils.dumps(resp_obj)
     return result
 
 
@@ -309,13 +309,13 @@ def unplug_interface(controller, network, port):
     lport_obj = {"type": "NoAttachment"}
     try:
         resp_obj = do_single_request("PUT",
-          uri, json.dumps(lport_obj), controller=controller)
+          uri, jsonutils.dumps(lport_obj), controller=controller)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port or Network not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port, net_id=network)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
-    return json.loads(resp_obj)
+    return jsonutils.loads(resp_obj)
 
 
 def update_port(network, port_id, **params):
@@ -333,14 +333,14 @@ def update_port(network, port_id, **params):
     uri = "/ws.v1/lswitch/" + network + "/lport/" + port_id
     try:
         resp_obj = do_single_request("PUT", uri,
-          json.dumps(lport_obj), controller=controller)
+          jsonutils.dumps(lport_obj), controller=controller)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port or Network not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port_id, net_id=network)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
 
-    obj = json.loads(resp_obj)
+    obj = jsonutils.loads(resp_obj)
     obj["port-op-status"] = get_port_status(controller, network, obj["uuid"])
     return obj
 
@@ -362,14 +362,14 @@ def create_port(tenant, network, port_init_state, **params):
     path = "/ws.v1/lswitch/" + ls_uuid + "/lport"
     try:
         resp_obj = do_single_request("POST", path,
-          json.dumps(lport_obj), controller=controller)
+          jsonutils.dumps(lport_obj), controller=controller)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Network not found, Error: %s" % str(e))
         raise exception.NetworkNotFound(net_id=network)
     except NvpApiClient.NvpApiException as e:
         raise exception.QuantumException()
 
-    result = json.loads(resp_obj)
+    result = jsonutils.loads(resp_obj)
     result['port-op-status'] = get_port_status(controller, ls_uuid,
                                                result['uuid'])
     return result
@@ -390,7 +390,7 @@ def get_port_status(controller, lswitch_id, port_id):
         r = do_single_request("GET",
             "/ws.v1/lswitch/%s/lport/%s/status" % (lswitch_id, port_id),
             controller=controller)
-        r = json.loads(r)
+        r = jsonutils.loads(r)
     except NvpApiClient.ResourceNotFound as e:
         LOG.error("Port not found, Error: %s" % str(e))
         raise exception.PortNotFound(port_id=port_id, net_id=lswitch_id)
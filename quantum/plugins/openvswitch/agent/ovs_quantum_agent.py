@@ -20,8 +20,12 @@
 # @author: Dave Lapsley, Nicira Networks, Inc.
 
 import ConfigParser
+import itertools
+import json
 import logging
 from optparse import OptionParser
+import os
+import select
 import shlex
 import signal
 import subprocess
@@ -30,6 +34,12 @@ import time
 
 from sqlalchemy.ext.sqlsoup import SqlSoup
 
+try:
+    import ovsdb_client
+except ImportError:
+    # Not installed along with the agent, e.g. on XenServer
+    ovsdb_client = None
+
 logging.basicConfig()
 LOG = logging.getLogger(__name__)
 
@@ -40,11 +50,34 @@ OP_STATUS_DOWN = "DOWN"
 # A placeholder for dead vlans.
 DEAD_VLAN_TAG = "4095"
 
+# Tells the quantum server that what it reports about the networks and
+# ports of a tenant changed, see quantum.db.api.tenant_revision_get
+BUMP_REVISION_SQL = ("UPDATE tenant_revisions SET revision = revision + 1 "
+                     "WHERE tenant_id = (SELECT tenant_id FROM networks "
+                     "WHERE uuid = :net_id)")
+
+# ovs-ofctl commands reading the flows to change from a file
+FLOW_BATCH_COMMANDS = {"add-flow": "add-flows",
+                       "del-flows": "del-flows"}
+
 # Default interval values
 DEFAULT_POLLING_INTERVAL = 2
 DEFAULT_RECONNECT_INTERVAL = 2
 
 
+def interface_columns(interface):
+    """
+    Returns the name, ofport and external_ids of an Interface row, given
+    as a dict of the JSON values ovs-vsctl or ovsdb-client printed.
+    """
+    # Columns with no value hold an empty set, ["set", []]
+    ofport = interface["ofport"]
+    if not isinstance(ofport, int):
+        ofport = "[]"
+    return (str(interface["name"]), str(ofport),
+            dict(interface["external_ids"][1]))
+
+
 # A class to represent a VIF (i.e., a port that has 'iface-id' and 'vif-mac'
 # attributes set).
 class VifPort:
@@ -62,46 +95,195 @@ class VifPort:
                 self.switch.br_name)
 
 
+class VsctlTransaction:
+    '''ovs-vsctl commands changing the database, run by a single ovs-vsctl
+    call when committed.
+
+    ovs-vsctl applies either all the commands it is given or none of
+    them. Should the call fail, the commands are run again one at a time,
+    so that each failing command is reported and the others are applied,
+    as they would have been without the transaction.
+
+    Flow changes requested while the transaction is open are made after
+    it has been committed, in the order they were requested, and those
+    of the same kind requested in a row by a single ovs-ofctl call.'''
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.commands = []
+        # (ovs-ofctl command, arguments), in order
+        self.flow_commands = []
+
+    def add(self, args):
+        self.commands.append(args)
+
+    def add_flow_command(self, cmd, args):
+        self.flow_commands.append((cmd, args))
+
+    def commit(self):
+        '''Runs the commands.
+
+        :returns: a list of (command, error message) for the commands
+            which failed.'''
+        errors = self.bridge.run_vsctl_batch(self.commands)
+        self.bridge.run_flow_commands(self.flow_commands)
+        self.commands = []
+        self.flow_commands = []
+        return errors
+
+
 class OVSBridge:
     def __init__(self, br_name, root_helper):
         self.br_name = br_name
         self.root_helper = root_helper
+        # The open VsctlTransaction, if any
+        self.transaction = None
 
     def run_cmd(self, args):
+        status, out, err = self.run_cmd_status(args)
+        if status != 0:
+            LOG.error("Command %s failed with status %s: %s" %
+                      (" ".join(args), status, err.strip()))
+        return out
+
+    def run_cmd_status(self, args, process_input=None):
+        '''Returns the exit status, output and error output of a command,
+        fed process_input if given.'''
         cmd = shlex.split(self.root_helper) + args
         LOG.debug("## running command: " + " ".join(cmd))
-        p = subprocess.Popen(cmd, stdout=subprocess.PIPE)
-        retval = p.communicate()[0]
+        stdin = None
+        if process_input is not None:
+            stdin = subprocess.PIPE
+        p = subprocess.Popen(cmd, stdin=stdin, stdout=subprocess.PIPE,
+                             stderr=subprocess.PIPE)
+        out, err = p.communicate(process_input)
         if p.returncode == -(signal.SIGALRM):
             LOG.debug("## timeout running command: " + " ".join(cmd))
-        return retval
+        return p.returncode, out, err
 
     def run_vsctl(self, args):
         full_args = ["ovs-vsctl", "--timeout=2"] + args
         return self.run_cmd(full_args)
 
+    def run_vsctl_batch(self, commands):
+        '''Runs ovs-vsctl commands in a single call.
+
+        :returns: a list of (command, error message) for the commands
+            which failed.'''
+        if not commands:
+            return []
+        error = self.vsctl_transact(commands)
+        if error is None:
+            return []
+        if len(commands) == 1:
+            failures = [(commands[0], error)]
+        else:
+            LOG.warn("ovs-vsctl transaction on %s failed, running its "
+                     "commands one at a time: %s" % (self.br_name, error))
+            failures = []
+            for command in commands:
+                error = self.vsctl_transact([command])
+                if error is not None:
+                    failures.append((command, error))
+        for command, error in failures:
+            LOG.error("ovs-vsctl %s failed: %s" % (" ".join(command), error))
+        return failures
+
+    def vsctl_transact(self, commands):
+        '''Runs ovs-vsctl commands in a single call.
+
+        :returns: None, or the error message if the call failed.'''
+        args = ["ovs-vsctl", "--timeout=2"]
+        for command in commands:
+            args += ["--"] + command
+        status, _out, err = self.run_cmd_status(args)
+        if status == 0:
+            return None
+        return err.strip()
+
+    def begin_transaction(self):
+        '''Queues the database and flow changes made through the bridge
+        until commit_transaction is called.'''
+        if self.transaction is None:
+            self.transaction = VsctlTransaction(self)
+        return self.transaction
+
+    def commit_transaction(self):
+        '''Makes the changes queued since begin_transaction.
+
+        :returns: a list of (command, error message) for the ovs-vsctl
+            commands which failed.'''
+        transaction, self.transaction = self.transaction, None
+        if transaction is None:
+            return []
+        return transaction.commit()
+
+    def modify_db(self, args):
+        if self.transaction is not None:
+            self.transaction.add(args)
+        else:
+            self.run_vsctl_batch([args])
+
+    def modify_flows(self, cmd, args):
+        if self.transaction is not None:
+            self.transaction.add_flow_command(cmd, args)
+        else:
+            self.run_ofctl(cmd, args)
+
     def reset_bridge(self):
-        self.run_vsctl(["--", "--if-exists", "del-br", self.br_name])
-        self.run_vsctl(["add-br", self.br_name])
+        self.run_vsctl_batch([["--if-exists", "del-br", self.br_name],
+                              ["add-br", self.br_name]])
+
+    def add_port(self, port_name):
+        self.modify_db(["add-port", self.br_name, port_name])
 
     def delete_port(self, port_name):
-        self.run_vsctl(["--", "--if-exists", "del-port", self.br_name,
-          port_name])
+        self.modify_db(["--if-exists", "del-port", self.br_name, port_name])
 
     def set_db_attribute(self, table_name, record, column, value):
         args = ["set", table_name, record, "%s=%s" % (column, value)]
-        self.run_vsctl(args)
+        self.modify_db(args)
 
     def clear_db_attribute(self, table_name, record, column):
         args = ["clear", table_name, record, column]
-        self.run_vsctl(args)
+        self.modify_db(args)
 
     def run_ofctl(self, cmd, args):
         full_args = ["ovs-ofctl", cmd, self.br_name] + args
         return self.run_cmd(full_args)
 
+    def run_ofctl_batch(self, cmd, flows):
+        '''Adds ("add-flow") or deletes ("del-flows") flows with a single
+        ovs-ofctl call, writing their specifications to its standard
+        input.'''
+        full_args = ["ovs-ofctl", FLOW_BATCH_COMMANDS[cmd], self.br_name, "-"]
+        status, _out, err = self.run_cmd_status(full_args,
+                                                "\n".join(flows) + "\n")
+        if status != 0:
+            LOG.error("ovs-ofctl %s of %d flows on %s failed: %s" %
+                      (cmd, len(flows), self.br_name, err.strip()))
+
+    def run_flow_commands(self, commands):
+        '''Runs (ovs-ofctl command, arguments) in order, the add-flow and
+        del-flows commands of single flows which follow each other as
+        one batch.'''
+        def batch_key(command):
+            cmd, args = command
+            if cmd in FLOW_BATCH_COMMANDS and len(args) == 1:
+                return cmd
+            # Not batched, e.g. the deletion of every flow
+            return None
+
+        for cmd, group in itertools.groupby(commands, batch_key):
+            group = list(group)
+            if cmd is None or len(group) == 1:
+                for command in group:
+                    self.run_ofctl(*command)
+            else:
+                self.run_ofctl_batch(cmd, [args[0] for _cmd, args in group])
+
     def remove_all_flows(self):
-        self.run_ofctl("del-flows", [])
+        self.modify_flows("del-flows", [])
 
     def get_port_ofport(self, port_name):
         return self.db_get_val("Interface", port_name, "ofport")
@@ -116,7 +298,7 @@ class OVSBridge:
         if "match" in dict:
             flow_str += "," + dict["match"]
         flow_str += ",actions=%s" % (dict["actions"])
-        self.run_ofctl("add-flow", [flow_str])
+        self.modify_flows("add-flow", [flow_str])
 
     def delete_flows(self, **dict):
         all_args = []
@@ -127,23 +309,22 @@ class OVSBridge:
         if "actions" in dict:
             all_args.append("actions=%s" % (dict["actions"]))
         flow_str = ",".join(all_args)
-        self.run_ofctl("del-flows", [flow_str])
+        self.modify_flows("del-flows", [flow_str])
 
+    # The ports are added by their own ovs-vsctl call, whatever the open
+    # transaction, since their ofport is returned
     def add_tunnel_port(self, port_name, remote_ip):
-        self.run_vsctl(["add-port", self.br_name, port_name])
-        self.set_db_attribute("Interface", port_name, "type", "gre")
-        self.set_db_attribute("Interface", port_name, "options:remote_ip",
-                              remote_ip)
-        self.set_db_attribute("Interface", port_name, "options:in_key", "flow")
-        self.set_db_attribute("Interface", port_name, "options:out_key",
-                              "flow")
+        self.run_vsctl_batch([["add-port", self.br_name, port_name],
+                              ["set", "Interface", port_name, "type=gre",
+                               "options:remote_ip=%s" % remote_ip,
+                               "options:in_key=flow",
+                               "options:out_key=flow"]])
         return self.get_port_ofport(port_name)
 
     def add_patch_port(self, local_name, remote_name):
-        self.run_vsctl(["add-port", self.br_name, local_name])
-        self.set_db_attribute("Interface", local_name, "type", "patch")
-        self.set_db_attribute("Interface", local_name, "options:peer",
-                              remote_name)
+        self.run_vsctl_batch([["add-port", self.br_name, local_name],
+                              ["set", "Interface", local_name, "type=patch",
+                               "options:peer=%s" % remote_name]])
         return self.get_port_ofport(local_name)
 
     def db_get_map(self, table, record, column):
@@ -167,6 +348,34 @@ class OVSBridge:
         res = self.run_vsctl(["list-ports", self.br_name])
         return res.split("\n")[0:-1]
 
+    def get_port_interfaces(self):
+        """
+        Returns the name, ofport and external_ids of the interface of
+        every port of the bridge, read with a single ovs-vsctl call.
+        """
+        res = self.run_vsctl(["--format=json", "--",
+                              "--columns=name,external_ids,ofport",
+                              "list", "Interface", "--",
+                              "list-ports", self.br_name])
+        # The table of every interface comes on the first line, followed
+        # by the names of the ports of the bridge
+        table, _sep, names = res.partition("\n")
+        try:
+            table = json.loads(table)
+        except ValueError:
+            LOG.error("Unable to list the interfaces of %s", self.br_name)
+            return []
+        port_names = set(names.split("\n"))
+        interfaces = []
+        for row in table["data"]:
+            interface = dict(zip(table["headings"], row))
+            if interface["name"] in port_names:
+                interfaces.append(interface_columns(interface))
+        return interfaces
+
+    def iface_to_br(self, iface_name):
+        return self.run_vsctl(["iface-to-br", iface_name]).strip()
+
     def get_port_stats(self, port_name):
         return self.db_get_map("Interface", port_name, "statistics")
 
@@ -179,29 +388,224 @@ class OVSBridge:
             "uuid=%s" % xs_vif_uuid,
             ]).strip()
 
+    # returns a VifPort for the interface if it is a VIF, else None
+    def get_vif_port(self, name, ofport, external_ids):
+        if "iface-id" in external_ids and "attached-mac" in external_ids:
+            return VifPort(name, ofport, external_ids["iface-id"],
+                           external_ids["attached-mac"], self)
+        elif ("xs-vif-uuid" in external_ids and
+              "attached-mac" in external_ids):
+            # if this is a xenserver and iface-id is not automatically
+            # synced to OVS from XAPI, we grab it from XAPI directly
+            iface_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
+            return VifPort(name, ofport, iface_id,
+                           external_ids["attached-mac"], self)
+        return None
+
     # returns a VIF object for each VIF port
     def get_vif_ports(self):
         edge_ports = []
-        port_names = self.get_port_name_list()
-        for name in port_names:
-            external_ids = self.db_get_map("Interface", name, "external_ids")
-            ofport = self.db_get_val("Interface", name, "ofport")
-            if "iface-id" in external_ids and "attached-mac" in external_ids:
-                p = VifPort(name, ofport, external_ids["iface-id"],
-                            external_ids["attached-mac"], self)
-                edge_ports.append(p)
-            elif ("xs-vif-uuid" in external_ids and
-                  "attached-mac" in external_ids):
-                # if this is a xenserver and iface-id is not automatically
-                # synced to OVS from XAPI, we grab it from XAPI directly
-                iface_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
-                p = VifPort(name, ofport, iface_id,
-                            external_ids["attached-mac"], self)
+        for name, ofport, external_ids in self.get_port_interfaces():
+            p = self.get_vif_port(name, ofport, external_ids)
+            if p is not None:
                 edge_ports.append(p)
 
         return edge_ports
 
 
+class InterfaceMonitor(object):
+    '''Follows the VIF ports of a bridge as they change.
+
+    Runs "ovsdb-client monitor" on the Interface table, which prints its
+    contents when it starts, then every row inserted, modified or
+    deleted, and applies those changes to the VIF ports it knows of.
+    A VIF is only reported once ovs-vswitchd has given it an OpenFlow
+    port number, which usually comes after the row is inserted.
+    Whether a new VIF is on the bridge is asked to ovs-vsctl once. If
+    the monitor stream is lost or garbled, a new one is started, whose
+    initial contents replace the VIF ports.'''
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+        self.process = None
+        self._buffer = ""
+        # Interface row uuid -> VifPort, for the VIFs on the bridge
+        self.vif_ports = {}
+        # Interface row uuid -> whether the interface is on the bridge
+        self.on_bridge = {}
+
+    def start(self):
+        '''Starts the monitor and reads the initial contents.
+
+        :returns: whether the monitor is running.'''
+        cmd = shlex.split(self.bridge.root_helper) + [
+            "ovsdb-client", "monitor", "Interface",
+            "name,ofport,external_ids", "--format=json"]
+        LOG.debug("## running command: " + " ".join(cmd))
+        try:
+            self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+        except OSError as e:
+            LOG.error("Unable to run ovsdb-client: %s" % e)
+            return False
+        self._buffer = ""
+        self.vif_ports = {}
+        self.on_bridge = {}
+        if not self.read_updates(None):
+            LOG.error("ovsdb-client monitor exited")
+            self.stop()
+            return False
+        return True
+
+    def stop(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.terminate()
+            self.process.wait()
+            self.process = None
+
+    def get_vif_ports(self):
+        '''Returns the VIF ports of the bridge.
+
+        The bridge is polled while the monitor cannot be started.'''
+        if self.process is None and not self.start():
+            return self.bridge.get_vif_ports()
+        return self.vif_ports.values()
+
+    def wait(self, timeout):
+        '''Waits up to timeout seconds for changes, and applies them.'''
+        if self.process is None:
+            time.sleep(timeout)
+            return
+        if not self.read_updates(timeout):
+            LOG.warn("Lost the ovsdb-client monitor stream, resyncing")
+            self.stop()
+            self.start()
+
+    def read_updates(self, timeout):
+        '''Applies the updates received within timeout seconds, or waits
+        for the next one if timeout is None.
+
+        :returns: False if the stream ended.'''
+        fd = self.process.stdout.fileno()
+        while True:
+            readable = select.select([fd], [], [], timeout)[0]
+            if not readable:
+                return True
+            data = os.read(fd, 65536)
+            if not data:
+                return False
+            lines = (self._buffer + data).split("\n")
+            # Keep the incomplete last line for later
+            self._buffer = lines.pop()
+            for line in lines:
+                if line.strip():
+                    try:
+                        update = json.loads(line)
+                    except ValueError:
+                        LOG.error("Invalid ovsdb-client output: %s" % line)
+                        return False
+                    self.apply_update(update)
+                    # Apply whatever else is already there, without waiting
+                    timeout = 0
+
+    def apply_update(self, table):
+        port_names = None
+        for row in table["data"]:
+            row = dict(zip(table["headings"], row))
+            uuid, action = row["row"], row["action"]
+            if action == "delete":
+                self.vif_ports.pop(uuid, None)
+                self.on_bridge.pop(uuid, None)
+                continue
+            # "old" rows only hold the columns which changed
+            if action not in ("initial", "insert", "new"):
+                continue
+            ofport = row["ofport"]
+            if not isinstance(ofport, int) or ofport <= 0:
+                # No OpenFlow port number yet, or none can be given
+                self.vif_ports.pop(uuid, None)
+                continue
+            port = self.bridge.get_vif_port(*interface_columns(row))
+            if port is None:
+                self.vif_ports.pop(uuid, None)
+                continue
+            if uuid not in self.on_bridge:
+                if action == "initial":
+                    # One call for the whole initial contents
+                    if port_names is None:
+                        port_names = set(self.bridge.get_port_name_list())
+                    on_bridge = port.port_name in port_names
+                else:
+                    on_bridge = (self.bridge.iface_to_br(port.port_name) ==
+                                 self.bridge.br_name)
+                self.on_bridge[uuid] = on_bridge
+            if self.on_bridge[uuid]:
+                self.vif_ports[uuid] = port
+
+
+class NativeOVSBridge(OVSBridge):
+    '''OVSBridge reading and changing the Open vSwitch database over a
+    connection to ovsdb-server, an ovsdb_client.Vsctl, rather than by
+    running ovs-vsctl. The commands ovsdb_client does not implement are
+    still given to ovs-vsctl.'''
+
+    def __init__(self, br_name, root_helper, ovsdb):
+        OVSBridge.__init__(self, br_name, root_helper)
+        self.ovsdb = ovsdb
+
+    def run_vsctl(self, args):
+        try:
+            return self.ovsdb.execute(args)
+        except ovsdb_client.UnsupportedCommand:
+            return OVSBridge.run_vsctl(self, args)
+        except ovsdb_client.OvsdbError as e:
+            # ovs-vsctl prints nothing when it fails
+            LOG.error("ovs-vsctl %s failed: %s" % (" ".join(args), e))
+            return ""
+
+    def vsctl_transact(self, commands):
+        try:
+            self.ovsdb.run(commands)
+        except ovsdb_client.UnsupportedCommand:
+            return OVSBridge.vsctl_transact(self, commands)
+        except ovsdb_client.OvsdbError as e:
+            return str(e)
+        return None
+
+    def get_port_interfaces(self):
+        try:
+            interfaces = self.ovsdb.port_interfaces(self.br_name)
+        except ovsdb_client.OvsdbError as e:
+            LOG.error("Unable to list the interfaces of %s: %s" %
+                      (self.br_name, e))
+            return []
+        return [interface_columns(interface) for interface in interfaces]
+
+
+def make_bridge(br_name, root_helper, ovsdb=None):
+    '''Returns an OVSBridge, using ovsdb if given an ovsdb_client.Vsctl.'''
+    if ovsdb is not None:
+        return NativeOVSBridge(br_name, root_helper, ovsdb)
+    return OVSBridge(br_name, root_helper)
+
+
+def get_ovsdb(config):
+    '''Returns the ovsdb_client.Vsctl selected by the [AGENT] section of
+    config, or None if the agent runs ovs-vsctl.'''
+    if (not config.has_option("AGENT", "ovsdb_interface") or
+        config.get("AGENT", "ovsdb_interface") == "vsctl"):
+        return None
+    if config.get("AGENT", "ovsdb_interface") != "native":
+        raise Exception("Unknown ovsdb_interface %s" %
+                        config.get("AGENT", "ovsdb_interface"))
+    if ovsdb_client is None:
+        raise Exception("ovsdb_client.py was not installed with the agent")
+    connection = ovsdb_client.DEFAULT_CONNECTION
+    if config.has_option("AGENT", "ovsdb_connection"):
+        connection = config.get("AGENT", "ovsdb_connection")
+    return ovsdb_client.Vsctl(ovsdb_client.Client(connection))
+
+
 class LocalVLANMapping:
     def __init__(self, vlan, lsw_id, vif_ids=None):
         if vif_ids is None:
@@ -217,11 +621,33 @@ class LocalVLANMapping:
 class OVSQuantumAgent(object):
 
     def __init__(self, integ_br, root_helper,
-                 polling_interval, reconnect_interval):
+                 polling_interval, reconnect_interval, ovsdb_monitor=False,
+                 ovsdb=None):
         self.root_helper = root_helper
+        self.ovsdb = ovsdb
         self.setup_integration_br(integ_br)
         self.polling_interval = polling_interval
         self.reconnect_interval = reconnect_interval
+        self.int_monitor = None
+        if ovsdb_monitor:
+            self.int_monitor = InterfaceMonitor(self.int_br)
+
+    def get_vif_ports(self):
+        if self.int_monitor is not None:
+            return self.int_monitor.get_vif_ports()
+        return self.int_br.get_vif_ports()
+
+    def wait(self):
+        # The database is still polled for binding changes
+        if self.int_monitor is not None:
+            self.int_monitor.wait(self.polling_interval)
+        else:
+            time.sleep(self.polling_interval)
+
+    def set_op_status(self, port, op_status, changed_networks):
+        if port.op_status != op_status:
+            port.op_status = op_status
+            changed_networks.add(port.network_id)
 
     def port_bound(self, port, vlan_id):
         self.int_br.set_db_attribute("Port", port.port_name,
@@ -233,7 +659,7 @@ class OVSQuantumAgent(object):
             self.int_br.clear_db_attribute("Port", port.port_name, "tag")
 
     def setup_integration_br(self, integ_br):
-        self.int_br = OVSBridge(integ_br, self.root_helper)
+        self.int_br = make_bridge(integ_br, self.root_helper, self.ovsdb)
         self.int_br.remove_all_flows()
         # switch all traffic using L2 learning
         self.int_br.add_flow(priority=1, actions="normal")
@@ -276,7 +702,10 @@ class OVSQuantumAgent(object):
 
             new_vif_ports = {}
             new_local_bindings = {}
-            vif_ports = self.int_br.get_vif_ports()
+            changed_networks = set()
+            vif_ports = self.get_vif_ports()
+            # Make the changes of this iteration with one ovs-vsctl call
+            self.int_br.begin_transaction()
             for p in vif_ports:
                 new_vif_ports[p.vif_id] = p
                 if p.vif_id in all_bindings:
@@ -299,7 +728,9 @@ class OVSQuantumAgent(object):
                           % (old_b, str(p)))
                         self.port_unbound(p, True)
                         if p.vif_id in all_bindings:
-                            all_bindings[p.vif_id].op_status = OP_STATUS_DOWN
+                            self.set_op_status(all_bindings[p.vif_id],
+                                               OP_STATUS_DOWN,
+                                               changed_networks)
                     if new_b is not None:
                         # If we don't have a binding we have to stick it on
                         # the dead vlan
@@ -307,7 +738,9 @@ class OVSQuantumAgent(object):
                         vlan_id = vlan_bindings.get(net_id, DEAD_VLAN_TAG)
                         self.port_bound(p, vlan_id)
                         if p.vif_id in all_bindings:
-                            all_bindings[p.vif_id].op_status = OP_STATUS_UP
+                            self.set_op_status(all_bindings[p.vif_id],
+                                               OP_STATUS_UP,
+                                               changed_networks)
                         LOG.info(("Adding binding to net-id = %s "
                                   "for %s on vlan %s") %
                                  (new_b, str(p), vlan_id))
@@ -319,11 +752,16 @@ class OVSQuantumAgent(object):
                         old_b = old_local_bindings[vif_id]
                         self.port_unbound(old_vif_ports[vif_id], False)
                     if vif_id in all_bindings:
-                        all_bindings[vif_id].op_status = OP_STATUS_DOWN
+                        self.set_op_status(all_bindings[vif_id],
+                                           OP_STATUS_DOWN,
+                                           changed_networks)
+            self.int_br.commit_transaction()
 
             old_vif_ports = new_vif_ports
             old_local_bindings = new_local_bindings
             try:
+                for net_id in changed_networks:
+                    db.execute(BUMP_REVISION_SQL, params={'net_id': net_id})
                 db.commit()
             except Exception as e:
                 LOG.info("Unable to commit to database! Exception: %s" % e)
@@ -331,7 +769,7 @@ class OVSQuantumAgent(object):
                 old_local_bindings = {}
                 old_vif_ports = {}
 
-            time.sleep(self.polling_interval)
+            self.wait()
 
 
 class OVSQuantumTunnelAgent(object):
@@ -359,14 +797,19 @@ class OVSQuantumTunnelAgent(object):
     MAX_VLAN_TAG = 4094
 
     def __init__(self, integ_br, tun_br, remote_ip_file, local_ip,
-                 root_helper, polling_interval, reconnect_interval):
+                 root_helper, polling_interval, reconnect_interval,
+                 ovsdb_monitor=False, ovsdb=None):
         '''Constructor.
 
         :param integ_br: name of the integration bridge.
         :param tun_br: name of the tunnel bridge.
         :param remote_ip_file: name of file containing list of hypervisor IPs.
-        :param local_ip: local IP address of this hypervisor.'''
+        :param local_ip: local IP address of this hypervisor.
+        :param ovsdb_monitor: follow the VIF ports with an InterfaceMonitor
+            rather than polling the integration bridge.
+        :param ovsdb: an ovsdb_client.Vsctl to use instead of ovs-vsctl.'''
         self.root_helper = root_helper
+        self.ovsdb = ovsdb
         self.available_local_vlans = set(
             xrange(OVSQuantumTunnelAgent.MIN_VLAN_TAG,
                    OVSQuantumTunnelAgent.MAX_VLAN_TAG))
@@ -376,6 +819,24 @@ class OVSQuantumTunnelAgent(object):
         self.db_connected = False
         self.polling_interval = polling_interval
         self.reconnect_interval = reconnect_interval
+        self.int_monitor = None
+        if ovsdb_monitor:
+            self.int_monitor = InterfaceMonitor(self.int_br)
+
+    def get_vif_ports(self):
+        if self.int_monitor is not None:
+            return self.int_monitor.get_vif_ports()
+        return self.int_br.get_vif_ports()
+
+    def wait(self):
+        '''Waits for the next iteration of the processing loop.
+
+        With an InterfaceMonitor, VIF port changes end the wait early; the
+        database is still polled every polling_interval.'''
+        if self.int_monitor is not None:
+            self.int_monitor.wait(self.polling_interval)
+        else:
+            time.sleep(self.polling_interval)
 
     def provision_local_vlan(self, net_uuid, lsw_id):
         '''Provisions a local VLAN.
@@ -463,7 +924,7 @@ class OVSQuantumTunnelAgent(object):
         Create patch ports and remove all existing flows.
 
         :param integ_br: the name of the integration bridge.'''
-        self.int_br = OVSBridge(integ_br, self.root_helper)
+        self.int_br = make_bridge(integ_br, self.root_helper, self.ovsdb)
         self.int_br.delete_port("patch-tun")
         self.patch_tun_ofport = self.int_br.add_patch_port("patch-tun",
                                                            "patch-int")
@@ -482,7 +943,7 @@ class OVSQuantumTunnelAgent(object):
         :param remote_ip_file: path to file that contains list of destination
             IP addresses.
         :param local_ip: the ip address of this node.'''
-        self.tun_br = OVSBridge(tun_br, self.root_helper)
+        self.tun_br = make_bridge(tun_br, self.root_helper, self.ovsdb)
         self.tun_br.reset_bridge()
         self.patch_int_ofport = self.tun_br.add_patch_port("patch-int",
                                                            "patch-tun")
@@ -564,7 +1025,7 @@ class OVSQuantumTunnelAgent(object):
                 continue
 
             # Get bindings from OVS bridge.
-            vif_ports = self.int_br.get_vif_ports()
+            vif_ports = self.get_vif_ports()
             new_vif_ports = dict([(p.vif_id, p) for p in vif_ports])
             new_vif_ports_ids = set(new_vif_ports.keys())
 
@@ -591,7 +1052,10 @@ class OVSQuantumTunnelAgent(object):
             LOG.debug('new_bindings: %s' % new_bindings)
             LOG.debug('changed_bindings: %s' % changed_bindings)
 
-            # Take action.
+            # Take action, making the changes of this iteration with one
+            # ovs-vsctl call per bridge.
+            self.int_br.begin_transaction()
+            self.tun_br.begin_transaction()
             for p in dead_vif_ports:
                 LOG.info("No quantum binding for port " + str(p)
                          + "putting on dead vlan")
@@ -637,10 +1101,12 @@ class OVSQuantumTunnelAgent(object):
                     except Exception:
                         LOG.info("Unable to unbind Port " + str(p) +
                                  " on net-id = " + old_port.network_uuid)
+            self.int_br.commit_transaction()
+            self.tun_br.commit_transaction()
 
             old_vif_ports = new_vif_ports
             old_local_bindings = new_local_bindings
-            time.sleep(self.polling_interval)
+            self.wait()
 
 
 def main():
@@ -697,12 +1163,22 @@ def main():
             reconnect_interval = DEFAULT_RECONNECT_INTERVAL
             LOG.info("Reconnect interval not defined. Using default.")
         root_helper = config.get("AGENT", "root_helper")
+        ovsdb_monitor = False
+        if config.has_option("AGENT", "ovsdb_monitor"):
+            ovsdb_monitor = config.getboolean("AGENT", "ovsdb_monitor")
 
     except Exception as e:
         LOG.error("Error parsing common params in config_file: '%s': %s" %
                   (config_file, str(e)))
         sys.exit(1)
 
+    try:
+        ovsdb = get_ovsdb(config)
+    except Exception as e:
+        LOG.error("Unable to use the OVSDB interface in config_file: "
+                  "'%s': %s" % (config_file, str(e)))
+        sys.exit(1)
+
     if enable_tunneling:
         # Get parameters for OVSQuantumTunnelAgent
         try:
@@ -729,11 +1205,13 @@ def main():
 
         plugin = OVSQuantumTunnelAgent(integ_br, tun_br, remote_ip_file,
                                        local_ip, root_helper,
-                                       polling_interval, reconnect_interval)
+                                       polling_interval, reconnect_interval,
+                                       ovsdb_monitor, ovsdb)
     else:
         # Get parameters for OVSQuantumAgent.
         plugin = OVSQuantumAgent(integ_br, root_helper,
-                                 polling_interval, reconnect_interval)
+                                 polling_interval, reconnect_interval,
+                                 ovsdb_monitor, ovsdb)
 
     # Start everything.
     plugin.daemon_loop(db_connection_url)
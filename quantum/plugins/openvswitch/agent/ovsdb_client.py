@@ -0,0 +1,748 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+OVSDB client speaking the JSON-RPC protocol of RFC 7047.
+
+Client keeps a connection to ovsdb-server open, on its unix socket or
+over TCP, so that the agents read and change the Open_vSwitch database
+without running ovs-vsctl through the root helper for every access. It
+sends transact, monitor and get_schema requests, answers the echo
+requests of the server and reconnects when the connection is lost.
+
+A Monitor keeps a replica of some columns of the database, which the
+server updates as they change; it is filled again when the connection
+has to be reestablished.
+
+Vsctl runs the ovs-vsctl commands the agents use over a Client: the
+commands changing the database (add-port, del-port, set, clear, add-br,
+...) go in a single transaction, after which Vsctl waits for
+ovs-vswitchd to apply the new configuration as ovs-vsctl does, and the
+queries (list-ports, iface-to-br, get, ...) are answered from a Monitor
+of the bridges, ports and interfaces.
+"""
+
+import json
+import logging
+import re
+import select
+import socket
+import threading
+import time
+
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_CONNECTION = "unix:/var/run/openvswitch/db.sock"
+DATABASE = "Open_vSwitch"
+# Seconds to wait for a reply, or for ovs-vswitchd to apply a change
+DEFAULT_TIMEOUT = 2.0
+
+# Columns of the replica kept by Vsctl
+MONITORED_COLUMNS = {"Open_vSwitch": ["bridges", "cur_cfg"],
+                     "Bridge": ["name", "ports"],
+                     "Port": ["name", "interfaces"],
+                     "Interface": ["name", "ofport", "external_ids"]}
+
+UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-([0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}$")
+BARE_STRING_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_.-]*$")
+
+
+class OvsdbError(Exception):
+    pass
+
+
+class UnsupportedCommand(OvsdbError):
+    """An ovs-vsctl command Vsctl does not implement"""
+    pass
+
+
+def parse_connection(connection):
+    """'unix:<path>' or 'tcp:<host>:<port>' -> (address family, address)"""
+    method, _sep, address = connection.partition(":")
+    if method == "unix" and address:
+        return socket.AF_UNIX, address
+    if method == "tcp":
+        host, _sep, port = address.rpartition(":")
+        if host and port.isdigit():
+            return socket.AF_INET, (host, int(port))
+    raise OvsdbError("Invalid OVSDB connection %s" % connection)
+
+
+def set_elements(value):
+    """Returns the elements of a set column value as a list"""
+    if isinstance(value, list) and value and value[0] == "set":
+        return value[1]
+    return [value]
+
+
+def map_dict(value):
+    """Returns a map column value as a dict"""
+    return dict(value[1])
+
+
+def uuid_value(value):
+    """["uuid", <uuid>] -> <uuid>"""
+    return value[1]
+
+
+def format_atom(atom):
+    if isinstance(atom, bool):
+        return atom and "true" or "false"
+    if isinstance(atom, list) and atom[0] in ("uuid", "named-uuid"):
+        return atom[1]
+    if isinstance(atom, basestring):
+        if (not BARE_STRING_RE.match(atom) or
+            atom in ("true", "false")):
+            return json.dumps(atom)
+        return str(atom)
+    return str(atom)
+
+
+def format_value(value):
+    """Formats a column value the way ovs-vsctl prints it"""
+    if isinstance(value, list) and value[0] == "set":
+        if len(value[1]) == 1:
+            return format_atom(value[1][0])
+        return "[%s]" % ", ".join(format_atom(v) for v in value[1])
+    if isinstance(value, list) and value[0] == "map":
+        return "{%s}" % ", ".join("%s=%s" % (format_atom(k), format_atom(v))
+                                  for k, v in sorted(value[1]))
+    return format_atom(value)
+
+
+class Client(object):
+    """Persistent JSON-RPC connection to ovsdb-server"""
+
+    def __init__(self, connection=DEFAULT_CONNECTION,
+                 timeout=DEFAULT_TIMEOUT):
+        self.connection = connection
+        self.timeout = timeout
+        self.sock = None
+        self.schema = None
+        # Monitor id -> Monitor, started again on every new connection
+        self.monitors = {}
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+        self._next_id = 0
+        self._lock = threading.RLock()
+
+    def connect(self):
+        with self._lock:
+            if self.sock is not None:
+                return
+            family, address = parse_connection(self.connection)
+            sock = socket.socket(family, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(self.timeout)
+                sock.connect(address)
+            except socket.error as e:
+                sock.close()
+                raise OvsdbError("Unable to connect to %s: %s" %
+                                 (self.connection, e))
+            LOG.debug("Connected to %s" % self.connection)
+            self.sock = sock
+            self._buffer = ""
+            for monitor in self.monitors.values():
+                monitor.start()
+
+    def close(self):
+        with self._lock:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+    def call(self, method, params):
+        """Sends a request and returns the result of its reply."""
+        with self._lock:
+            self.connect()
+            self._next_id += 1
+            request_id = self._next_id
+            self._send({"method": method, "params": params,
+                        "id": request_id})
+            deadline = time.time() + self.timeout
+            while True:
+                message = self._receive(deadline - time.time())
+                if message is None:
+                    self.close()
+                    raise OvsdbError("Timeout waiting for the reply to %s" %
+                                     method)
+                # Replies have no method
+                if "method" not in message and \
+                   message.get("id") == request_id:
+                    if message.get("error") is not None:
+                        raise OvsdbError("%s failed: %s" %
+                                         (method, message["error"]))
+                    return message["result"]
+                self._dispatch(message)
+
+    def poll(self, timeout=0):
+        """Waits up to timeout seconds for messages from the server and
+        processes those received.
+
+        :returns: whether any message was processed, or the connection
+            reestablished."""
+        with self._lock:
+            self.connect()
+            processed = False
+            try:
+                message = self._receive(timeout)
+                while message is not None:
+                    processed = True
+                    self._dispatch(message)
+                    message = self._receive(0)
+            except OvsdbError as e:
+                # Reconnecting fills the monitors again
+                LOG.warn("%s, reconnecting" % e)
+                self.connect()
+                processed = True
+            return processed
+
+    def get_schema(self):
+        if self.schema is None:
+            self.schema = self.call("get_schema", [DATABASE])
+        return self.schema
+
+    def transact(self, operations):
+        """Runs operations in a single transaction.
+
+        :returns: the result of every operation.
+        :raises OvsdbError: if an operation, or the commit, failed; its
+            index attribute is the index of the failed operation, or the
+            number of operations if the commit failed.
+        """
+        results = self.call("transact", [DATABASE] + list(operations))
+        for index, result in enumerate(results):
+            if result and result.get("error") is not None:
+                error = OvsdbError("%s: %s" % (result["error"],
+                                               result.get("details", "")))
+                error.index = index
+                raise error
+        return results
+
+    def _send(self, message):
+        try:
+            self.sock.sendall(json.dumps(message))
+        except socket.error as e:
+            self.close()
+            raise OvsdbError("Lost the connection to %s: %s" %
+                             (self.connection, e))
+
+    def _receive(self, timeout):
+        """Returns the next message, or None if none came within timeout
+        seconds."""
+        while True:
+            message = self._decode()
+            if message is not None:
+                return message
+            try:
+                if not select.select([self.sock], [], [],
+                                     max(timeout, 0))[0]:
+                    return None
+                data = self.sock.recv(65536)
+            except (select.error, socket.error) as e:
+                self.close()
+                raise OvsdbError("Lost the connection to %s: %s" %
+                                 (self.connection, e))
+            if not data:
+                self.close()
+                raise OvsdbError("%s closed the connection" %
+                                 self.connection)
+            self._buffer += data
+
+    def _decode(self):
+        """Returns the first complete message of the buffer, if any"""
+        buffer = self._buffer.lstrip()
+        if not buffer:
+            self._buffer = ""
+            return None
+        try:
+            message, end = self._decoder.raw_decode(buffer)
+        except ValueError:
+            # Not received entirely yet
+            self._buffer = buffer
+            return None
+        self._buffer = buffer[end:]
+        return message
+
+    def _dispatch(self, message):
+        method = message.get("method")
+        if method == "echo":
+            self._send({"id": message["id"], "result": message["params"],
+                        "error": None})
+        elif method == "update":
+            monitor_id, updates = message["params"]
+            monitor = self.monitors.get(monitor_id)
+            if monitor is not None:
+                monitor.apply(updates)
+        else:
+            LOG.debug("Ignoring OVSDB message %s" % message)
+
+
+class Monitor(object):
+    """Replica of some columns of the database.
+
+    rows holds, for every monitored table, a dict of row uuid -> {column:
+    value}, with the values in their JSON form. The replica is updated
+    whenever the client processes messages; call client.poll() first to
+    read the latest changes."""
+
+    def __init__(self, client, columns):
+        """:param columns: dict of table -> list of columns to monitor."""
+        self.client = client
+        self.columns = columns
+        self.rows = dict((table, {}) for table in columns)
+        self.id = "monitor-%d" % len(client.monitors)
+        client.monitors[self.id] = self
+        if client.sock is None:
+            # Starts every monitor of the client
+            client.connect()
+        else:
+            self.start()
+
+    def start(self):
+        requests = dict((table, {"columns": columns})
+                        for table, columns in self.columns.iteritems())
+        updates = self.client.call("monitor", [DATABASE, self.id, requests])
+        self.rows = dict((table, {}) for table in self.columns)
+        self.apply(updates)
+
+    def apply(self, updates):
+        for table, rows in updates.iteritems():
+            replica = self.rows[table]
+            for uuid, row in rows.iteritems():
+                if row.get("new") is None:
+                    replica.pop(uuid, None)
+                else:
+                    replica[uuid] = row["new"]
+
+
+class Vsctl(object):
+    """Runs the ovs-vsctl commands used by the agents over a Client"""
+
+    def __init__(self, client):
+        self.client = client
+        self.monitor = Monitor(client, MONITORED_COLUMNS)
+
+    def rows(self, table):
+        return self.monitor.rows[table]
+
+    def find(self, table, record):
+        """Returns the uuid of the row named record, or of uuid record"""
+        if UUID_RE.match(record) and record in self.rows(table):
+            return record
+        for uuid, row in self.rows(table).iteritems():
+            if row.get("name") == record:
+                return uuid
+        return None
+
+    def refresh(self):
+        """Applies the changes notified by the server"""
+        self.client.poll(0)
+
+    # Queries
+
+    def list_bridges(self):
+        self.refresh()
+        return sorted(row["name"] for row in self.rows("Bridge").values())
+
+    def list_ports(self, br_name):
+        self.refresh()
+        bridge = self.find("Bridge", br_name)
+        if bridge is None:
+            raise OvsdbError("no bridge named %s" % br_name)
+        ports = self.rows("Port")
+        # The bridge's own port is not listed
+        return sorted(ports[uuid_value(uuid)]["name"]
+                      for uuid in set_elements(
+                          self.rows("Bridge")[bridge]["ports"])
+                      if uuid_value(uuid) in ports and
+                      ports[uuid_value(uuid)]["name"] != br_name)
+
+    def port_interfaces(self, br_name):
+        """Returns the name, ofport and external_ids columns of the
+        interfaces of the ports listed by list_ports, as dicts."""
+        interfaces = self.rows("Interface")
+        result = []
+        for name in self.list_ports(br_name):
+            port = self.rows("Port")[self.find("Port", name)]
+            for uuid in set_elements(port["interfaces"]):
+                interface = interfaces.get(uuid_value(uuid))
+                if interface is not None:
+                    result.append(interface)
+        return result
+
+    def iface_to_br(self, iface_name):
+        self.refresh()
+        interface = self.find("Interface", iface_name)
+        for bridge in self.rows("Bridge").values():
+            for port_uuid in set_elements(bridge["ports"]):
+                port = self.rows("Port").get(uuid_value(port_uuid))
+                if port is None:
+                    continue
+                if ["uuid", interface] in set_elements(port["interfaces"]):
+                    return bridge["name"]
+        raise OvsdbError("no interface named %s" % iface_name)
+
+    def select(self, table, where, columns):
+        """Returns the rows of table matching the where conditions"""
+        operation = {"op": "select", "table": table, "where": where,
+                     "columns": columns}
+        return self.client.transact([operation])[0]["rows"]
+
+    def get(self, table, record, column):
+        """Returns the value of column, or column:key, of a row"""
+        table = self._table(table)
+        column, _sep, key = column.partition(":")
+        rows = self.select(table, self._where(table, record), [column])
+        if not rows:
+            raise OvsdbError("no row %s in table %s" % (record, table))
+        value = rows[0][column]
+        if key:
+            values = map_dict(value)
+            if key not in values:
+                raise OvsdbError("no key %s in %s record %s column %s" %
+                                 (key, table, record, column))
+            return values[key]
+        return value
+
+    def wait_for_row(self, table, name, timeout):
+        """Waits up to timeout seconds for the row named name to exist.
+
+        :returns: whether it does."""
+        deadline = time.time() + timeout
+        while True:
+            self.refresh()
+            if self.find(table, name) is not None:
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            self.client.poll(remaining)
+
+    def execute(self, args):
+        """Runs ovs-vsctl arguments and returns what ovs-vsctl would have
+        printed.
+
+        Either every command changes the database, or there is a single
+        query.
+
+        :raises UnsupportedCommand: for the arguments which have to be
+            given to ovs-vsctl itself."""
+        global_options, commands = _split_commands(args)
+        if global_options or not commands:
+            raise UnsupportedCommand("unsupported arguments %s" % args)
+        options, name, command_args = _parse_command(commands[0])
+        if name not in READ_COMMANDS:
+            self.run(commands)
+            return ""
+        if len(commands) > 1 or options:
+            raise UnsupportedCommand("unsupported arguments %s" % args)
+        try:
+            if name == "list-br":
+                lines = self.list_bridges()
+            elif name == "list-ports":
+                lines = self.list_ports(*command_args)
+            elif name == "iface-to-br":
+                lines = [self.iface_to_br(*command_args)]
+            else:
+                lines = [format_value(self.get(*command_args))]
+        except TypeError:
+            raise OvsdbError("invalid arguments to %s: %s" %
+                             (name, " ".join(command_args)))
+        return "".join(line + "\n" for line in lines)
+
+    # Changes
+
+    def run(self, commands):
+        """Runs ovs-vsctl write commands in a single transaction.
+
+        :param commands: list of ovs-vsctl commands, each an argument list
+            such as ["--if-exists", "del-port", "br-int", "tap0"].
+        :raises OvsdbError: if a command is invalid or failed."""
+        self.refresh()
+        txn = _Transaction(self)
+        for command in commands:
+            options, name, args = _parse_command(command)
+            handler = getattr(self, "_cmd_" + name.replace("-", "_"), None)
+            if handler is None or name in READ_COMMANDS:
+                raise UnsupportedCommand("unsupported command %s" % name)
+            start = len(txn.operations)
+            try:
+                handler(txn, options, *args)
+            except (TypeError, ValueError):
+                raise OvsdbError("invalid arguments to %s: %s" %
+                                 (name, " ".join(args)))
+            txn.commands.extend([command] *
+                                (len(txn.operations) - start))
+        if not txn.operations:
+            return
+        # Have ovs-vswitchd tell when it applied the changes
+        txn.operations.append({"op": "mutate", "table": "Open_vSwitch",
+                               "where": [],
+                               "mutations": [["next_cfg", "+=", 1]]})
+        txn.operations.append({"op": "select", "table": "Open_vSwitch",
+                               "where": [], "columns": ["next_cfg"]})
+        try:
+            results = self.client.transact(txn.operations)
+        except OvsdbError as e:
+            index = getattr(e, "index", None)
+            if index is not None and index < len(txn.commands):
+                raise OvsdbError("%s (%s)" % (e, " ".join(
+                    txn.commands[index])))
+            raise
+        self.wait_for_vswitchd(results[-1]["rows"][0]["next_cfg"])
+
+    def wait_for_vswitchd(self, next_cfg):
+        deadline = time.time() + self.client.timeout
+        while True:
+            configs = [row.get("cur_cfg", 0)
+                       for row in self.rows("Open_vSwitch").values()]
+            if configs and min(configs) >= next_cfg:
+                return
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                LOG.warn("ovs-vswitchd has not applied configuration %d "
+                         "yet" % next_cfg)
+                return
+            self.client.poll(remaining)
+
+    def _where(self, table, record):
+        if UUID_RE.match(record):
+            return [["_uuid", "==", ["uuid", record]]]
+        if table == "Open_vSwitch" and record == ".":
+            return []
+        return [["name", "==", record]]
+
+    def _table(self, table):
+        """Returns the name of table, which ovs-vsctl matches without
+        regard to case"""
+        for name in self.client.get_schema()["tables"]:
+            if name.lower() == table.lower():
+                return name
+        raise OvsdbError("unknown table %s" % table)
+
+    def _column_type(self, table, column):
+        tables = self.client.get_schema()["tables"]
+        if table not in tables or column not in tables[table]["columns"]:
+            raise OvsdbError("%s does not contain a column %s" %
+                             (table, column))
+        column_type = tables[table]["columns"][column]["type"]
+        if not isinstance(column_type, dict):
+            column_type = {"key": column_type}
+        return column_type
+
+    @staticmethod
+    def _base_type(base):
+        if isinstance(base, dict):
+            return base["type"]
+        return base
+
+    def _parse_atom(self, text, base):
+        base = self._base_type(base)
+        if text.startswith('"'):
+            return json.loads(text)
+        if base == "integer":
+            return int(text)
+        if base == "real":
+            return float(text)
+        if base == "boolean":
+            if text not in ("true", "false"):
+                raise OvsdbError("%s is not a boolean" % text)
+            return text == "true"
+        if base == "uuid":
+            return ["uuid", text]
+        return text
+
+    def _cmd_add_br(self, txn, options, br_name):
+        if txn.exists("Bridge", br_name):
+            if "--may-exist" in options:
+                return
+            raise OvsdbError("cannot create a bridge named %s because a "
+                             "bridge named %s already exists" %
+                             (br_name, br_name))
+        port = txn.insert_port(br_name, {"type": "internal"})
+        bridge = txn.insert("Bridge", {"name": br_name,
+                                       "ports": ["named-uuid", port]})
+        txn.mutate("Open_vSwitch", [], "bridges", "insert",
+                   ["set", [["named-uuid", bridge]]])
+        txn.set_exists(("Bridge", "Port", "Interface"), br_name, True)
+
+    def _cmd_del_br(self, txn, options, br_name):
+        bridge = self.find("Bridge", br_name)
+        if not txn.exists("Bridge", br_name) or bridge is None:
+            if "--if-exists" in options:
+                return
+            raise OvsdbError("no bridge named %s" % br_name)
+        txn.mutate("Open_vSwitch", [], "bridges", "delete",
+                   ["set", [["uuid", bridge]]])
+        txn.set_exists(("Bridge",), br_name, False)
+
+    def _cmd_add_port(self, txn, options, br_name, port_name):
+        if not txn.exists("Bridge", br_name):
+            raise OvsdbError("no bridge named %s" % br_name)
+        if txn.exists("Port", port_name):
+            if "--may-exist" in options:
+                return
+            raise OvsdbError("cannot create a port named %s because a "
+                             "port named %s already exists" %
+                             (port_name, port_name))
+        port = txn.insert_port(port_name, {})
+        txn.mutate("Bridge", [["name", "==", br_name]], "ports", "insert",
+                   ["set", [["named-uuid", port]]])
+        txn.set_exists(("Port", "Interface"), port_name, True)
+
+    def _cmd_del_port(self, txn, options, *args):
+        port_name = args[-1]
+        port = self.find("Port", port_name)
+        if port is None or not txn.exists("Port", port_name):
+            if "--if-exists" in options:
+                return
+            raise OvsdbError("no port named %s" % port_name)
+        where = []
+        if len(args) > 1:
+            where = [["name", "==", args[0]]]
+        txn.mutate("Bridge", where, "ports", "delete",
+                   ["set", [["uuid", port]]])
+        txn.set_exists(("Port",), port_name, False)
+        interfaces = self.rows("Interface")
+        for uuid in set_elements(self.rows("Port")[port]["interfaces"]):
+            interface = interfaces.get(uuid_value(uuid))
+            if interface is not None:
+                txn.set_exists(("Interface",), interface["name"], False)
+
+    def _cmd_set(self, txn, options, table, record, *settings):
+        table = self._table(table)
+        row = {}
+        mutations = []
+        for setting in settings:
+            column, _sep, value = setting.partition("=")
+            column, _sep, key = column.partition(":")
+            column_type = self._column_type(table, column)
+            if key:
+                if "value" not in column_type:
+                    raise OvsdbError("%s column %s is not a map" %
+                                     (table, column))
+                value = self._parse_atom(value, column_type["value"])
+                mutations.append([column, "delete", ["set", [key]]])
+                mutations.append([column, "insert",
+                                  ["map", [[key, value]]]])
+            elif value == "[]":
+                row[column] = ["set", []]
+            else:
+                row[column] = self._parse_atom(value, column_type["key"])
+        self._update(txn, table, record, row, mutations)
+
+    def _cmd_clear(self, txn, options, table, record, *columns):
+        table = self._table(table)
+        row = {}
+        for column in columns:
+            if "value" in self._column_type(table, column):
+                row[column] = ["map", []]
+            else:
+                row[column] = ["set", []]
+        self._update(txn, table, record, row, [])
+
+    def _cmd_set_controller(self, txn, options, br_name, *targets):
+        controllers = [txn.insert("Controller", {"target": target})
+                       for target in targets]
+        row = {"controller": ["set", [["named-uuid", controller]
+                                      for controller in controllers]]}
+        self._update(txn, "Bridge", br_name, row, [])
+
+    def _cmd_set_fail_mode(self, txn, options, br_name, mode):
+        self._update(txn, "Bridge", br_name, {"fail_mode": mode}, [])
+
+    def _update(self, txn, table, record, row, mutations):
+        if (table in MONITORED_COLUMNS and table != "Open_vSwitch" and
+            not txn.exists(table, record)):
+            raise OvsdbError("no row %s in table %s" % (record, table))
+        where = self._where(table, record)
+        if row:
+            txn.operations.append({"op": "update", "table": table,
+                                   "where": where, "row": row})
+        if mutations:
+            txn.operations.append({"op": "mutate", "table": table,
+                                   "where": where, "mutations": mutations})
+
+
+# Commands answered by Vsctl.execute rather than run
+READ_COMMANDS = ("list-br", "list-ports", "iface-to-br", "get")
+
+
+class _Transaction(object):
+    """Operations of the commands given to Vsctl.run"""
+
+    def __init__(self, vsctl):
+        self.vsctl = vsctl
+        self.operations = []
+        # The command of every operation
+        self.commands = []
+        # (table, name) -> whether earlier commands created or deleted
+        # the row
+        self.changed = {}
+
+    def exists(self, table, name):
+        if (table, name) in self.changed:
+            return self.changed[(table, name)]
+        return self.vsctl.find(table, name) is not None
+
+    def set_exists(self, tables, name, exists):
+        for table in tables:
+            self.changed[(table, name)] = exists
+
+    def insert(self, table, row):
+        uuid_name = "row%d" % len(self.operations)
+        self.operations.append({"op": "insert", "table": table, "row": row,
+                                "uuid-name": uuid_name})
+        return uuid_name
+
+    def insert_port(self, name, interface_row):
+        interface_row = dict(interface_row, name=name)
+        interface = self.insert("Interface", interface_row)
+        return self.insert("Port", {"name": name,
+                                    "interfaces": ["named-uuid", interface]})
+
+    def mutate(self, table, where, column, mutator, value):
+        self.operations.append({"op": "mutate", "table": table,
+                                "where": where,
+                                "mutations": [[column, mutator, value]]})
+
+
+def _parse_command(command):
+    """["--if-exists", "del-port", "tap0"] ->
+    (["--if-exists"], "del-port", ["tap0"])"""
+    options = []
+    for index, arg in enumerate(command):
+        if not arg.startswith("--"):
+            return options, arg, list(command[index + 1:])
+        options.append(arg)
+    raise OvsdbError("missing command name")
+
+
+def _split_commands(args):
+    """Splits ovs-vsctl arguments at the "--" separators, returning the
+    global options and the commands."""
+    commands = [[]]
+    for arg in args:
+        if arg == "--":
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    global_options = []
+    if commands[0] and all(arg.startswith("--") for arg in commands[0]):
+        global_options = commands.pop(0)
+    return global_options, [command for command in commands if command]
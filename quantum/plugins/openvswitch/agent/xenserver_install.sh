@@ -15,6 +15,7 @@ yum --enablerepo=base -y install MySQL-python
 sed -i 's/enabled=1/enabled=0' /etc/yum.repos.d/epel.repo
 
 cp ovs_quantum_agent.py /etc/xapi.d/plugins
+cp ovsdb_client.py /etc/xapi.d/plugins
 cp ovs_quantum_plugin.ini /etc/xapi.d/plugins
 
 xe network-list name-label="integration-bridge" | grep xapi >/dev/null 2>&1
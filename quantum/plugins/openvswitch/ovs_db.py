@@ -17,7 +17,23 @@
 # @author: Brad Hall, Nicira Networks, Inc.
 # @author: Dan Wendlandt, Nicira Networks, Inc.
 
+"""
+VLAN allocation for the Open vSwitch plugin.
 
+Every VLAN of the configured ranges has a row in ovs_vlan_allocations,
+so a VLAN is claimed by flipping the allocated flag of a single row.
+The first free row from a random VLAN on is read with SELECT ... FOR
+UPDATE, so that concurrent servers seldom lock the same row, then
+claimed with an UPDATE conditional on the row still being free: two
+servers sharing the database can never claim the same VLAN, even where
+the database ignores FOR UPDATE (sqlite). The network a VLAN is bound
+to is recorded in vlan_bindings, which the agents read.
+"""
+
+import logging
+import random
+
+from sqlalchemy import exc as sa_exc
 from sqlalchemy.orm import exc
 
 import quantum.db.api as db
@@ -25,6 +41,139 @@ import quantum.db.models as models
 import ovs_models
 
 
+LOG = logging.getLogger('quantum.plugins.openvswitch.ovs_db')
+
+VLAN_MIN = 1
+VLAN_MAX = 4094
+# Times a VLAN claim is retried after losing a race for a free row
+_RESERVE_ATTEMPTS = 10
+
+
+# Exception thrown if no more VLANs are available
+class NoFreeVLANException(Exception):
+    pass
+
+
+def _in_ranges(vlan_id, vlan_ranges):
+    for vlan_min, vlan_max in vlan_ranges:
+        if vlan_min <= vlan_id <= vlan_max:
+            return True
+    return False
+
+
+@db.tpool_aware
+def sync_vlan_allocations(vlan_ranges):
+    """
+    Makes ovs_vlan_allocations hold a row for every VLAN of vlan_ranges,
+    a list of (min, max) tuples. VLANs outside the ranges are dropped
+    once they are released.
+    """
+    session = db.get_session()
+    try:
+        with session.begin():
+            bound = set(vlan_id for vlan_id, in
+                        session.query(ovs_models.VlanBinding.vlan_id))
+            existing = set()
+            for alloc in session.query(ovs_models.VlanAllocation):
+                if alloc.allocated or _in_ranges(alloc.vlan_id,
+                                                 vlan_ranges):
+                    existing.add(alloc.vlan_id)
+                else:
+                    session.delete(alloc)
+            missing = set()
+            for vlan_min, vlan_max in vlan_ranges:
+                missing.update(xrange(vlan_min, vlan_max + 1))
+            # VLANs bound before the allocation table existed stay in
+            # use, whether or not they are in the ranges
+            missing.update(bound)
+            missing.difference_update(existing)
+            session.flush()
+            if missing:
+                LOG.debug("Adding %d VLANs to the allocation table",
+                          len(missing))
+                # One executemany INSERT rather than thousands of
+                # flushed objects
+                session.execute(
+                    ovs_models.VlanAllocation.__table__.insert(),
+                    [{'vlan_id': vlan_id, 'allocated': vlan_id in bound}
+                     for vlan_id in sorted(missing)])
+    except sa_exc.IntegrityError:
+        # Another server filled the table concurrently
+        LOG.debug("VLAN allocation table was synchronized concurrently")
+
+
+@db.tpool_aware
+def reserve_vlan(network_id):
+    """
+    Claims a free VLAN for network_id and binds it to the network.
+
+    :returns: the VLAN id
+    :raises: NoFreeVLANException
+    """
+    session = db.get_session()
+    for attempt in xrange(_RESERVE_ATTEMPTS):
+        with session.begin():
+            start = random.randint(VLAN_MIN, VLAN_MAX)
+            alloc = _first_free_vlan(
+                session, ovs_models.VlanAllocation.vlan_id >= start)
+            if alloc is None:
+                alloc = _first_free_vlan(
+                    session, ovs_models.VlanAllocation.vlan_id < start)
+            if alloc is None:
+                raise NoFreeVLANException("No VLAN free for network %s" %
+                                          network_id)
+            claimed = session.query(ovs_models.VlanAllocation).\
+              filter_by(vlan_id=alloc.vlan_id, allocated=False).\
+              update({'allocated': True}, synchronize_session=False)
+            if claimed:
+                session.add(ovs_models.VlanBinding(alloc.vlan_id,
+                                                   network_id))
+                LOG.debug("Allocated VLAN %s for network %s",
+                          alloc.vlan_id, network_id)
+                return alloc.vlan_id
+        LOG.debug("VLAN %s was claimed concurrently, retrying",
+                  alloc.vlan_id)
+    raise NoFreeVLANException("Unable to claim a VLAN for network %s" %
+                              network_id)
+
+
+def _first_free_vlan(session, clause):
+    return session.query(ovs_models.VlanAllocation).\
+      filter_by(allocated=False).\
+      filter(clause).\
+      order_by(ovs_models.VlanAllocation.vlan_id).\
+      with_lockmode('update').\
+      first()
+
+
+@db.tpool_aware
+def release_vlan(network_id, vlan_ranges):
+    """
+    Unbinds the VLAN of network_id and returns it to the free pool, or
+    drops it if it is no longer in vlan_ranges.
+    """
+    session = db.get_session()
+    with session.begin():
+        try:
+            binding = session.query(ovs_models.VlanBinding).\
+              filter_by(network_id=network_id).\
+              one()
+        except exc.NoResultFound:
+            LOG.error("No vlan found with network \"%s\"", network_id)
+            return
+        vlan_id = binding.vlan_id
+        session.delete(binding)
+        allocations = session.query(ovs_models.VlanAllocation).\
+          filter_by(vlan_id=vlan_id)
+        if _in_ranges(vlan_id, vlan_ranges):
+            allocations.update({'allocated': False},
+                               synchronize_session=False)
+        else:
+            allocations.delete(synchronize_session=False)
+    LOG.debug("Deallocated VLAN %s (used by network %s)",
+              vlan_id, network_id)
+
+
 def get_vlans():
     session = db.get_session()
     try:
@@ -36,23 +185,3 @@ def get_vlans():
     for x in bindings:
         res.append((x.vlan_id, x.network_id))
     return res
-
-
-def add_vlan_binding(vlanid, netid):
-    session = db.get_session()
-    binding = ovs_models.VlanBinding(vlanid, netid)
-    session.add(binding)
-    session.flush()
-    return binding.vlan_id
-
-
-def remove_vlan_binding(netid):
-    session = db.get_session()
-    try:
-        binding = session.query(ovs_models.VlanBinding).\
-          filter_by(network_id=netid).\
-          one()
-        session.delete(binding)
-    except exc.NoResultFound:
-            pass
-    session.flush()
@@ -20,12 +20,29 @@
 
 import uuid
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relation
 from quantum.db.models import BASE
 
 
+class VlanAllocation(BASE):
+    """Represents a VLAN of the configured ranges, and whether a network
+    is using it"""
+    __tablename__ = 'ovs_vlan_allocations'
+
+    vlan_id = Column(Integer, primary_key=True, autoincrement=False)
+    allocated = Column(Boolean, nullable=False, default=False, index=True)
+
+    def __init__(self, vlan_id, allocated=False):
+        self.vlan_id = vlan_id
+        self.allocated = allocated
+
+    def __repr__(self):
+        return "<VlanAllocation(%s,%s)>" % \
+          (self.vlan_id, self.allocated)
+
+
 class VlanBinding(BASE):
     """Represents a binding of network_id, vlan_id"""
     __tablename__ = 'vlan_bindings'
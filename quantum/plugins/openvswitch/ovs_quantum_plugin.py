@@ -40,51 +40,21 @@ LOG.basicConfig(level=LOG.WARN)
 LOG.getLogger("ovs_quantum_plugin")
 
 
-# Exception thrown if no more VLANs are available
-class NoFreeVLANException(Exception):
-    pass
-
-
-class VlanMap(object):
-    vlans = {}
-    net_ids = {}
-    free_vlans = set()
-    VLAN_MIN = 1
-    VLAN_MAX = 4094
-
-    def __init__(self):
-        self.vlans.clear()
-        self.net_ids.clear()
-        self.free_vlans = set(xrange(self.VLAN_MIN, self.VLAN_MAX + 1))
-
-    def already_used(self, vlan_id, network_id):
-        self.free_vlans.remove(vlan_id)
-        self.set_vlan(vlan_id, network_id)
-
-    def set_vlan(self, vlan_id, network_id):
-        self.vlans[vlan_id] = network_id
-        self.net_ids[network_id] = vlan_id
-
-    def acquire(self, network_id):
-        if len(self.free_vlans):
-            vlan = self.free_vlans.pop()
-            self.set_vlan(vlan, network_id)
-            LOG.debug("Allocated VLAN %s for network %s" % (vlan, network_id))
-            return vlan
-        else:
-            raise NoFreeVLANException("No VLAN free for network %s" %
-                                      network_id)
-
-    def release(self, network_id):
-        vlan = self.net_ids.get(network_id, None)
-        if vlan is not None:
-            self.free_vlans.add(vlan)
-            del self.vlans[vlan]
-            del self.net_ids[network_id]
-            LOG.debug("Deallocated VLAN %s (used by network %s)"
-                      % (vlan, network_id))
-        else:
-            LOG.error("No vlan found with network \"%s\"", network_id)
+def parse_vlan_ranges(value):
+    """
+    Parses a comma separated list of min:max VLAN ranges into a list of
+    (min, max) tuples.
+    """
+    vlan_ranges = []
+    for entry in value.split(','):
+        try:
+            vlan_min, vlan_max = [int(x) for x in entry.split(':')]
+        except ValueError:
+            raise Exception("Invalid VLAN range \"%s\"" % entry.strip())
+        if not ovs_db.VLAN_MIN <= vlan_min <= vlan_max <= ovs_db.VLAN_MAX:
+            raise Exception("Invalid VLAN range \"%s\"" % entry.strip())
+        vlan_ranges.append((vlan_min, vlan_max))
+    return vlan_ranges
 
 
 class OVSQuantumPlugin(QuantumPluginBase):
@@ -104,27 +74,33 @@ class OVSQuantumPlugin(QuantumPluginBase):
         config.read(configfile)
         LOG.debug("Config: %s" % config)
 
-        options = {"sql_connection": config.get("DATABASE", "sql_connection")}
+        options = dict(config.items("DATABASE"))
         db.configure_db(options)
 
-        self.vmap = VlanMap()
-        # Populate the map with anything that is already present in the
-        # database
-        vlans = ovs_db.get_vlans()
-        for x in vlans:
-            vlan_id, network_id = x
-            LOG.debug("Adding already populated vlan %s -> %s"
-                      % (vlan_id, network_id))
-            self.vmap.already_used(vlan_id, network_id)
+        vlan_ranges = "%d:%d" % (ovs_db.VLAN_MIN, ovs_db.VLAN_MAX)
+        if config.has_option("OVS", "vlan-ranges"):
+            vlan_ranges = config.get("OVS", "vlan-ranges")
+        self.vlan_ranges = parse_vlan_ranges(vlan_ranges)
+        LOG.debug("Allocating VLANs from %s" % self.vlan_ranges)
+        ovs_db.sync_vlan_allocations(self.vlan_ranges)
+
+    def get_revision(self, tenant_id):
+        # The agent bumps the revision when it changes op_status
+        return db.tenant_revision_get(tenant_id)
 
     def get_all_networks(self, tenant_id, **kwargs):
         nets = []
-        for x in db.network_list(tenant_id):
+        for x in db.network_list(tenant_id, **db.network_list_args(kwargs)):
             LOG.debug("Adding network: %s" % x.uuid)
             nets.append(self._make_net_dict(str(x.uuid), x.name,
                                             None, x.op_status))
         return nets
 
+    def iter_all_networks(self, tenant_id, **kwargs):
+        nets = db.network_iter(tenant_id, **db.network_list_args(kwargs))
+        return (self._make_net_dict(str(x.uuid), x.name, None, x.op_status)
+                for x in nets)
+
     def _make_net_dict(self, net_id, net_name, ports, op_status):
         res = {'net-id': net_id,
                 'net-name': net_name,
@@ -137,32 +113,65 @@ class OVSQuantumPlugin(QuantumPluginBase):
         net = db.network_create(tenant_id, net_name,
                           op_status=OperationalStatus.UP)
         LOG.debug("Created network: %s" % net)
-        vlan_id = self.vmap.acquire(str(net.uuid))
-        ovs_db.add_vlan_binding(vlan_id, str(net.uuid))
+        self._reserve_vlan(net)
         return self._make_net_dict(str(net.uuid), net.name, [],
                                         net.op_status)
 
+    def _reserve_vlan(self, net):
+        try:
+            return ovs_db.reserve_vlan(str(net.uuid))
+        except ovs_db.NoFreeVLANException:
+            # Do not leave a network behind without a VLAN
+            db.network_destroy(net.uuid)
+            raise
+
+    def create_network_bulk(self, tenant_id, networks):
+        nets = db.network_create_bulk(tenant_id,
+                                      [n['name'] for n in networks],
+                                      op_status=OperationalStatus.UP)
+        reserved = []
+        try:
+            for net in nets:
+                LOG.debug("Created network: %s" % net)
+                ovs_db.reserve_vlan(str(net.uuid))
+                reserved.append(net)
+        except Exception:
+            # The client never learns about any of the networks when the
+            # request fails, so undo the whole batch
+            exc_info = sys.exc_info()
+            for net in reserved:
+                ovs_db.release_vlan(str(net.uuid), self.vlan_ranges)
+            for net in nets:
+                db.network_destroy(net.uuid)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return [self._make_net_dict(str(net.uuid), net.name, [],
+                                    net.op_status)
+                for net in nets]
+
     def delete_network(self, tenant_id, net_id):
-        db.validate_network_ownership(tenant_id, net_id)
-        net = db.network_get(net_id)
+        net = db.validate_network_ownership(tenant_id, net_id)
 
         # Verify that no attachments are plugged into the network
         for port in db.port_list(net_id):
             if port.interface_id:
                 raise q_exc.NetworkInUse(net_id=net_id)
         net = db.network_destroy(net_id)
-        ovs_db.remove_vlan_binding(net_id)
-        self.vmap.release(net_id)
+        ovs_db.release_vlan(net_id, self.vlan_ranges)
         return self._make_net_dict(str(net.uuid), net.name, [],
                                         net.op_status)
 
     def get_network_details(self, tenant_id, net_id):
-        db.validate_network_ownership(tenant_id, net_id)
-        net = db.network_get(net_id)
+        net = db.validate_network_ownership(tenant_id, net_id)
         ports = self.get_all_ports(tenant_id, net_id)
         return self._make_net_dict(str(net.uuid), net.name,
                                     ports, net.op_status)
 
+    def get_network_details_with_ports(self, tenant_id, net_id):
+        net = db.network_get_with_ports(tenant_id, net_id)
+        ports = [self._make_port_dict(port) for port in net.ports]
+        return self._make_net_dict(str(net.uuid), net.name,
+                                   ports, net.op_status)
+
     def update_network(self, tenant_id, net_id, **kwargs):
         db.validate_network_ownership(tenant_id, net_id)
         net = db.network_update(net_id, tenant_id, **kwargs)
@@ -184,10 +193,19 @@ class OVSQuantumPlugin(QuantumPluginBase):
     def get_all_ports(self, tenant_id, net_id, **kwargs):
         ids = []
         db.validate_network_ownership(tenant_id, net_id)
-        ports = db.port_list(net_id)
-        # This plugin does not perform filtering at the moment
+        ports = db.port_list(net_id, **db.port_list_args(kwargs))
         return [{'port-id': str(p.uuid)} for p in ports]
 
+    def iter_all_ports(self, tenant_id, net_id, **kwargs):
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_iter(net_id, **db.port_list_args(kwargs))
+        return ({'port-id': str(p.uuid)} for p in ports)
+
+    def get_all_ports_details(self, tenant_id, net_id, **kwargs):
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_list(net_id, **db.port_list_args(kwargs))
+        return [self._make_port_dict(port) for port in ports]
+
     def create_port(self, tenant_id, net_id, port_state=None, **kwargs):
         LOG.debug("Creating port with network_id: %s" % net_id)
         db.validate_network_ownership(tenant_id, net_id)
@@ -195,6 +213,14 @@ class OVSQuantumPlugin(QuantumPluginBase):
                                 op_status=OperationalStatus.DOWN)
         return self._make_port_dict(port)
 
+    def create_port_bulk(self, tenant_id, net_id, ports):
+        LOG.debug("Creating %d ports with network_id: %s"
+                  % (len(ports), net_id))
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_create_bulk(net_id, [p.get('state') for p in ports],
+                                    op_status=OperationalStatus.DOWN)
+        return [self._make_port_dict(port) for port in ports]
+
     def delete_port(self, tenant_id, net_id, port_id):
         db.validate_port_ownership(tenant_id, net_id, port_id)
         port = db.port_destroy(port_id, net_id)
@@ -204,14 +230,12 @@ class OVSQuantumPlugin(QuantumPluginBase):
         """
         Updates the state of a port on the specified Virtual Network.
         """
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         db.port_update(port_id, net_id, **kwargs)
         return self._make_port_dict(port)
 
     def get_port_details(self, tenant_id, net_id, port_id):
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         return self._make_port_dict(port)
 
     def plug_interface(self, tenant_id, net_id, port_id, remote_iface_id):
@@ -224,6 +248,5 @@ class OVSQuantumPlugin(QuantumPluginBase):
         db.port_update(port_id, net_id, op_status=OperationalStatus.DOWN)
 
     def get_interface_details(self, tenant_id, net_id, port_id):
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        res = db.port_get(port_id, net_id)
+        res = db.port_get_for_tenant(tenant_id, net_id, port_id)
         return res.interface_id
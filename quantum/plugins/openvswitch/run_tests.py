@@ -41,7 +41,7 @@ sys.path.append(os.path.dirname(__file__))
 from quantum.api.api_common import OperationalStatus
 from quantum.common.test_lib import run_tests, test_config
 import quantum.tests.unit
-from tests.unit.test_vlan_map import VlanMapTest
+from tests.unit.test_vlan_map import VlanAllocationTest
 
 if __name__ == '__main__':
     exit_status = False
@@ -0,0 +1,268 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import os
+import mox
+import unittest
+from agent import ovs_quantum_agent
+
+BRIDGE = 'br-int'
+VIF_ID = '404deaec-5d37-11e1-a64b-000c29d5f0a8'
+VIF_MAC = '3c:09:24:1e:78:23'
+LIST_INTERFACES = ["--format=json", "--",
+                   "--columns=name,external_ids,ofport",
+                   "list", "Interface", "--", "list-ports", BRIDGE]
+VSCTL = ["ovs-vsctl", "--timeout=2"]
+
+
+def _interfaces_output(rows, port_names):
+    table = {"data": rows, "headings": ["name", "external_ids", "ofport"]}
+    return "".join([json.dumps(table) + "\n"] +
+                   [name + "\n" for name in port_names])
+
+
+class OVSBridgeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mox = mox.Mox()
+        self.br = ovs_quantum_agent.OVSBridge(BRIDGE, 'sudo')
+        self.mox.StubOutWithMock(self.br, 'run_vsctl')
+
+    def tearDown(self):
+        self.mox.UnsetStubs()
+
+    def testGetVifPorts(self):
+        rows = [["tap0", ["map", [["attached-mac", VIF_MAC],
+                                  ["iface-id", VIF_ID]]], 3],
+                # Not plugged yet
+                ["tap1", ["map", [["iface-id", "other"]]], ["set", []]],
+                ["patch-tun", ["map", []], 1],
+                # On another bridge
+                ["tap2", ["map", [["attached-mac", VIF_MAC],
+                                  ["iface-id", "elsewhere"]]], 4]]
+        self.br.run_vsctl(LIST_INTERFACES).AndReturn(
+            _interfaces_output(rows, ["patch-tun", "tap0", "tap1"]))
+        self.mox.ReplayAll()
+
+        ports = self.br.get_vif_ports()
+        self.assertEqual(len(ports), 1)
+        port = ports[0]
+        self.assertEqual((port.port_name, port.ofport, port.vif_id,
+                          port.vif_mac, port.switch),
+                         ("tap0", "3", VIF_ID, VIF_MAC, self.br))
+        self.mox.VerifyAll()
+
+    def testGetPortInterfaces(self):
+        rows = [["tap1", ["map", []], ["set", []]]]
+        self.br.run_vsctl(LIST_INTERFACES).AndReturn(
+            _interfaces_output(rows, ["tap1"]))
+        # ovs-vsctl failed
+        self.br.run_vsctl(LIST_INTERFACES).AndReturn("")
+        self.mox.ReplayAll()
+
+        self.assertEqual(self.br.get_port_interfaces(),
+                         [("tap1", "[]", {})])
+        self.assertEqual(self.br.get_port_interfaces(), [])
+        self.mox.VerifyAll()
+
+
+class VsctlTransactionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mox = mox.Mox()
+        self.br = ovs_quantum_agent.OVSBridge(BRIDGE, 'sudo')
+        self.mox.StubOutWithMock(self.br, 'run_cmd_status')
+        self.mox.StubOutWithMock(self.br, 'run_ofctl')
+
+    def tearDown(self):
+        self.mox.UnsetStubs()
+
+    def testCommit(self):
+        self.br.run_cmd_status(VSCTL + ["--", "set", "Port", "tap0", "tag=1",
+                                        "--", "clear", "Port", "tap1",
+                                        "tag"]).AndReturn((0, "", ""))
+        # Flows are changed once the transaction has been committed
+        self.br.run_ofctl("del-flows", ["in_port=3"])
+        self.mox.ReplayAll()
+
+        self.br.begin_transaction()
+        self.br.set_db_attribute("Port", "tap0", "tag", 1)
+        self.br.delete_flows(match="in_port=3")
+        self.br.clear_db_attribute("Port", "tap1", "tag")
+        self.assertEqual(self.br.commit_transaction(), [])
+        self.assertEqual(self.br.commit_transaction(), [])
+        self.mox.VerifyAll()
+
+    def testCommitErrors(self):
+        error = "ovs-vsctl: no row \"tap1\" in table Port\n"
+        self.br.run_cmd_status(VSCTL + ["--", "set", "Port", "tap0", "tag=1",
+                                        "--", "set", "Port", "tap1",
+                                        "tag=2"]).AndReturn((1, "", error))
+        self.br.run_cmd_status(VSCTL + ["--", "set", "Port", "tap0",
+                                        "tag=1"]).AndReturn((0, "", ""))
+        self.br.run_cmd_status(VSCTL + ["--", "set", "Port", "tap1",
+                                        "tag=2"]).AndReturn((1, "", error))
+        self.mox.ReplayAll()
+
+        self.br.begin_transaction()
+        self.br.set_db_attribute("Port", "tap0", "tag", 1)
+        self.br.set_db_attribute("Port", "tap1", "tag", 2)
+        self.assertEqual(self.br.commit_transaction(),
+                         [(["set", "Port", "tap1", "tag=2"], error.strip())])
+        self.mox.VerifyAll()
+
+    def testFlowBatches(self):
+        self.br.run_ofctl("del-flows", [])
+        self.br.run_cmd_status(
+            ["ovs-ofctl", "add-flows", BRIDGE, "-"],
+            "priority=2,in_port=3,actions=drop\n"
+            "priority=2,in_port=4,actions=drop\n").AndReturn((0, "", ""))
+        self.br.run_ofctl("del-flows", ["in_port=5"])
+        self.br.run_cmd_status(
+            ["ovs-ofctl", "del-flows", BRIDGE, "-"],
+            "tun_id=42\ndl_vlan=1\n").AndReturn((1, "", "error"))
+        self.mox.ReplayAll()
+
+        self.br.begin_transaction()
+        self.br.remove_all_flows()
+        self.br.add_flow(priority=2, match="in_port=3", actions="drop")
+        self.br.add_flow(priority=2, match="in_port=4", actions="drop")
+        self.br.delete_flows(match="in_port=5")
+        self.br.commit_transaction()
+        self.br.begin_transaction()
+        self.br.delete_flows(match="tun_id=42")
+        self.br.delete_flows(match="dl_vlan=1")
+        self.br.commit_transaction()
+        self.mox.VerifyAll()
+
+    def testCommandErrorLogged(self):
+        self.mox.StubOutWithMock(ovs_quantum_agent.LOG, 'error')
+        self.br.run_cmd_status(VSCTL + ["iface-to-br", "tap9"]).AndReturn(
+            (1, "", "ovs-vsctl: no interface named tap9\n"))
+        ovs_quantum_agent.LOG.error(mox.StrContains(
+            "ovs-vsctl: no interface named tap9"))
+        self.mox.ReplayAll()
+
+        self.assertEqual(self.br.iface_to_br("tap9"), "")
+        self.mox.VerifyAll()
+
+
+def _monitor_update(action, uuid, name, ofport, external_ids):
+    return {"headings": ["row", "action", "name", "ofport", "external_ids"],
+            "data": [[uuid, action, name, ofport,
+                      ["map", external_ids.items()]]]}
+
+
+class FakeProcess(object):
+
+    def __init__(self, stdout):
+        self.stdout = stdout
+
+
+class InterfaceMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mox = mox.Mox()
+        self.br = ovs_quantum_agent.OVSBridge(BRIDGE, 'sudo')
+        self.mox.StubOutWithMock(self.br, 'get_port_name_list')
+        self.mox.StubOutWithMock(self.br, 'iface_to_br')
+        self.monitor = ovs_quantum_agent.InterfaceMonitor(self.br)
+        self.vif_ids = {"attached-mac": VIF_MAC, "iface-id": VIF_ID}
+
+    def tearDown(self):
+        self.mox.UnsetStubs()
+
+    def testApplyUpdate(self):
+        self.br.get_port_name_list().AndReturn(["tap0"])
+        self.br.iface_to_br("tap2").AndReturn("br-other")
+        self.mox.ReplayAll()
+
+        self.monitor.apply_update(_monitor_update("initial", "u0", "tap0", 3,
+                                                  self.vif_ids))
+        # Not plugged yet
+        self.monitor.apply_update(_monitor_update("insert", "u2", "tap2",
+                                                  ["set", []],
+                                                  self.vif_ids))
+        self.assertEqual(self.monitor.vif_ports.keys(), ["u0"])
+        # Bridge membership is only asked once
+        self.monitor.apply_update(_monitor_update("new", "u2", "tap2", 4,
+                                                  self.vif_ids))
+        self.assertEqual(self.monitor.vif_ports.keys(), ["u0"])
+        self.monitor.apply_update(_monitor_update("delete", "u0", "tap0", 3,
+                                                  self.vif_ids))
+        self.assertEqual(self.monitor.vif_ports, {})
+        self.mox.VerifyAll()
+
+    def testOfportAssignment(self):
+        self.br.iface_to_br("tap1").AndReturn(BRIDGE)
+        self.mox.ReplayAll()
+
+        # ovs-vswitchd has not given the interface a port number yet
+        self.monitor.apply_update(_monitor_update("insert", "u1", "tap1",
+                                                  ["set", []],
+                                                  self.vif_ids))
+        self.monitor.apply_update(_monitor_update("new", "u1", "tap1", -1,
+                                                  self.vif_ids))
+        self.assertEqual(self.monitor.vif_ports, {})
+        self.monitor.apply_update(_monitor_update("new", "u1", "tap1", 5,
+                                                  self.vif_ids))
+        self.assertEqual(self.monitor.vif_ports["u1"].ofport, "5")
+        self.mox.VerifyAll()
+
+    def testInvalidOutput(self):
+        self.mox.StubOutWithMock(self.monitor, 'stop')
+        self.mox.StubOutWithMock(self.monitor, 'start')
+        self.monitor.stop()
+        self.monitor.start().AndReturn(True)
+        self.mox.ReplayAll()
+
+        read_fd, write_fd = os.pipe()
+        stdout = os.fdopen(read_fd)
+        self.monitor.process = FakeProcess(stdout)
+        os.write(write_fd, "{garbled\n")
+        self.monitor.wait(0)
+        os.close(write_fd)
+        stdout.close()
+        self.mox.VerifyAll()
+
+    def testStreamLoss(self):
+        self.br.iface_to_br("tap0").AndReturn(BRIDGE)
+        self.mox.StubOutWithMock(self.monitor, 'stop')
+        self.mox.StubOutWithMock(self.monitor, 'start')
+        self.monitor.stop()
+        self.monitor.start().AndReturn(True)
+        self.mox.ReplayAll()
+
+        read_fd, write_fd = os.pipe()
+        stdout = os.fdopen(read_fd)
+        self.monitor.process = FakeProcess(stdout)
+        update = json.dumps(_monitor_update("insert", "u0", "tap0", 3,
+                                            self.vif_ids)) + "\n"
+        # The second half of the line arrives later
+        os.write(write_fd, update[:10])
+        self.monitor.wait(0)
+        self.assertEqual(self.monitor.vif_ports, {})
+        os.write(write_fd, update[10:])
+        self.monitor.wait(0)
+        port = self.monitor.get_vif_ports()[0]
+        self.assertEqual((port.port_name, port.ofport, port.vif_id),
+                         ("tap0", "3", VIF_ID))
+
+        os.close(write_fd)
+        self.monitor.wait(0)
+        stdout.close()
+        self.mox.VerifyAll()
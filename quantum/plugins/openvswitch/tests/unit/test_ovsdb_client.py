@@ -0,0 +1,494 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import copy
+import json
+import os
+import select
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+
+from agent import ovs_quantum_agent
+from agent import ovsdb_client
+
+BRIDGE = 'br-int'
+VIF_ID = '404deaec-5d37-11e1-a64b-000c29d5f0a8'
+VIF_MAC = '3c:09:24:1e:78:23'
+
+_SET = {"min": 0, "max": "unlimited"}
+_OPTIONAL = {"min": 0, "max": 1}
+_STRING_MAP = dict(_SET, key="string", value="string")
+
+
+def _refs(table):
+    return {"type": dict(_SET, key={"type": "uuid", "refTable": table})}
+
+
+# The part of the Open_vSwitch schema used by the agents
+SCHEMA = {
+    "name": "Open_vSwitch",
+    "tables": {
+        "Open_vSwitch": {"columns": {
+            "bridges": _refs("Bridge"),
+            "next_cfg": {"type": "integer"},
+            "cur_cfg": {"type": "integer"}}},
+        "Bridge": {"columns": {
+            "name": {"type": "string"},
+            "ports": _refs("Port"),
+            "controller": _refs("Controller"),
+            "fail_mode": {"type": dict(_OPTIONAL, key="string")},
+            "datapath_id": {"type": dict(_OPTIONAL, key="string")}}},
+        "Port": {"columns": {
+            "name": {"type": "string"},
+            "interfaces": _refs("Interface"),
+            "tag": {"type": dict(_OPTIONAL, key="integer")}}},
+        "Interface": {"columns": {
+            "name": {"type": "string"},
+            "type": {"type": "string"},
+            "options": {"type": _STRING_MAP},
+            "external_ids": {"type": _STRING_MAP},
+            "ofport": {"type": dict(_OPTIONAL, key="integer")}}},
+        "Controller": {"columns": {
+            "target": {"type": "string"}}}}}
+ROOT_TABLE = "Open_vSwitch"
+
+
+def _column_type(table, column):
+    column_type = SCHEMA["tables"][table]["columns"][column]["type"]
+    if not isinstance(column_type, dict):
+        column_type = {"key": column_type}
+    key = column_type["key"]
+    if isinstance(key, dict):
+        key = key["type"]
+    if "value" in column_type:
+        return "map", key
+    if column_type.get("min", 1) == 1 and column_type.get("max", 1) == 1:
+        return "scalar", key
+    return "set", key
+
+
+class FakeOvsdbServer(threading.Thread):
+    """ovsdb-server stand-in serving a few JSON-RPC methods of RFC 7047,
+    which also plays ovs-vswitchd: it assigns an ofport to every new
+    interface and catches cur_cfg up with next_cfg after each
+    transaction."""
+
+    def __init__(self, path):
+        super(FakeOvsdbServer, self).__init__()
+        self.daemon = True
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(path)
+        self.listener.listen(5)
+        # Connection -> unparsed data
+        self.connections = {}
+        # Connection -> list of (monitor id, table -> columns)
+        self.monitors = {}
+        self.tables = dict((table, {}) for table in SCHEMA["tables"])
+        self.tables[ROOT_TABLE][str(uuid.uuid4())] = self._row(ROOT_TABLE,
+                                                               {})
+        self.next_ofport = 1
+        self.running = True
+        self.drop_connections = False
+        self.send_echo = False
+        self.echo_replies = []
+        self.transactions = 0
+
+    def run(self):
+        decoder = json.JSONDecoder()
+        while self.running:
+            if self.drop_connections:
+                for conn in self.connections.keys():
+                    self._close(conn)
+                self.drop_connections = False
+            readable = select.select([self.listener] +
+                                     self.connections.keys(), [], [],
+                                     0.01)[0]
+            for sock in readable:
+                if sock is self.listener:
+                    conn, _address = sock.accept()
+                    self.connections[conn] = ""
+                    self.monitors[conn] = []
+                    continue
+                data = sock.recv(65536)
+                if not data:
+                    self._close(sock)
+                    continue
+                buffer = (self.connections[sock] + data).lstrip()
+                while buffer:
+                    try:
+                        message, end = decoder.raw_decode(buffer)
+                    except ValueError:
+                        break
+                    buffer = buffer[end:].lstrip()
+                    self._handle(sock, message)
+                if sock in self.connections:
+                    self.connections[sock] = buffer
+
+    def stop(self):
+        self.running = False
+        self.join()
+        for conn in self.connections.keys():
+            self._close(conn)
+        self.listener.close()
+
+    def disconnect(self):
+        self.drop_connections = True
+        while self.drop_connections:
+            time.sleep(0.01)
+
+    def _close(self, conn):
+        conn.close()
+        del self.connections[conn]
+        del self.monitors[conn]
+
+    def _send(self, conn, message):
+        try:
+            conn.sendall(json.dumps(message))
+        except socket.error:
+            # Closed by the client, noticed by the next recv
+            pass
+
+    def _handle(self, conn, message):
+        method = message.get("method")
+        if method is None:
+            self.echo_replies.append(message)
+            return
+        if self.send_echo:
+            self.send_echo = False
+            self._send(conn, {"method": "echo", "params": ["ping"],
+                              "id": "echo"})
+        error = None
+        result = None
+        params = message["params"]
+        if method == "get_schema":
+            result = SCHEMA
+        elif method == "echo":
+            result = params
+        elif method == "monitor":
+            _database, monitor_id, requests = params
+            columns = dict((table, request["columns"])
+                           for table, request in requests.iteritems())
+            self.monitors[conn].append((monitor_id, columns))
+            result = self._updates(columns, {}, self.tables)
+        elif method == "transact":
+            before = copy.deepcopy(self.tables)
+            result = self._transact(params[1:])
+            self._send(conn, {"id": message["id"], "result": result,
+                              "error": None})
+            self._notify(before)
+            root = self.tables[ROOT_TABLE].values()[0]
+            if root["next_cfg"] != root["cur_cfg"]:
+                before = copy.deepcopy(self.tables)
+                self._reconfigure()
+                self._notify(before)
+            return
+        else:
+            error = "unknown method"
+        self._send(conn, {"id": message["id"], "result": result,
+                          "error": error})
+
+    def _notify(self, before):
+        for conn, monitors in self.monitors.items():
+            for monitor_id, columns in monitors:
+                updates = self._updates(columns, before, self.tables)
+                if updates:
+                    self._send(conn, {"method": "update", "id": None,
+                                      "params": [monitor_id, updates]})
+
+    def _updates(self, columns, before, after):
+        updates = {}
+        for table, names in columns.iteritems():
+            old_rows = before.get(table, {})
+            new_rows = after[table]
+            for row_uuid in set(old_rows) | set(new_rows):
+                update = {}
+                if row_uuid in old_rows:
+                    update["old"] = self._to_json(table, old_rows[row_uuid],
+                                                  names)
+                if row_uuid in new_rows:
+                    update["new"] = self._to_json(table, new_rows[row_uuid],
+                                                  names)
+                if update.get("old") != update.get("new"):
+                    updates.setdefault(table, {})[row_uuid] = update
+        return updates
+
+    def _reconfigure(self):
+        for row in self.tables["Interface"].values():
+            if not row["ofport"]:
+                row["ofport"] = [self.next_ofport]
+                self.next_ofport += 1
+        root = self.tables[ROOT_TABLE].values()[0]
+        root["cur_cfg"] = root["next_cfg"]
+
+    # Values are kept as a list for sets, a dict for maps, and uuids as
+    # strings
+
+    def _row(self, table, row):
+        defaults = {}
+        for column in SCHEMA["tables"][table]["columns"]:
+            kind, key = _column_type(table, column)
+            if kind == "map":
+                defaults[column] = {}
+            elif kind == "set":
+                defaults[column] = []
+            else:
+                defaults[column] = {"integer": 0}.get(key, "")
+        defaults.update(row)
+        return defaults
+
+    def _atom(self, key, value, named):
+        if key == "uuid":
+            if value[0] == "named-uuid":
+                return named[value[1]]
+            return value[1]
+        return value
+
+    def _value(self, table, column, value, named):
+        kind, key = _column_type(table, column)
+        if kind == "map":
+            return dict((k, self._atom(key, v, named))
+                        for k, v in value[1])
+        if isinstance(value, list) and value[0] == "set":
+            atoms = [self._atom(key, v, named) for v in value[1]]
+        else:
+            atoms = [self._atom(key, value, named)]
+        if kind == "scalar":
+            return atoms[0]
+        return atoms
+
+    def _to_json(self, table, row, columns):
+        result = {}
+        for column in columns:
+            kind, key = _column_type(table, column)
+            value = row[column]
+            if kind == "map":
+                result[column] = ["map", sorted(value.items())]
+                continue
+            if key == "uuid":
+                atoms = [["uuid", v] for v in value]
+            elif kind == "scalar":
+                atoms = [value]
+            else:
+                atoms = value
+            if len(atoms) == 1:
+                result[column] = atoms[0]
+            else:
+                result[column] = ["set", atoms]
+        return result
+
+    def _matches(self, table, row_uuid, row, where, named):
+        for column, function, value in where:
+            if column == "_uuid":
+                current, value = row_uuid, value[1]
+            else:
+                current = row[column]
+                value = self._value(table, column, value, named)
+            if function == "==" and current != value:
+                return False
+            if function == "includes" and \
+               any(current.get(k) != v for k, v in value.items()):
+                return False
+        return True
+
+    def _transact(self, operations):
+        self.transactions += 1
+        saved = copy.deepcopy(self.tables)
+        named = {}
+        results = []
+        for operation in operations:
+            try:
+                results.append(self._operation(operation, named))
+            except (KeyError, IndexError, TypeError) as e:
+                results.append({"error": "constraint violation",
+                                "details": str(e)})
+                self.tables = saved
+                return results
+        self._collect_garbage()
+        return results
+
+    def _operation(self, operation, named):
+        table = operation["table"]
+        rows = self.tables[table]
+        if operation["op"] == "insert":
+            row_uuid = str(uuid.uuid4())
+            if "uuid-name" in operation:
+                named[operation["uuid-name"]] = row_uuid
+            rows[row_uuid] = self._row(table, dict(
+                (column, self._value(table, column, value, named))
+                for column, value in operation["row"].iteritems()))
+            return {"uuid": ["uuid", row_uuid]}
+        if operation["op"] not in ("select", "update", "mutate", "delete"):
+            raise KeyError(operation["op"])
+        matching = [(row_uuid, row) for row_uuid, row in rows.items()
+                    if self._matches(table, row_uuid, row,
+                                     operation["where"], named)]
+        if operation["op"] == "select":
+            return {"rows": [self._to_json(table, row,
+                                           operation["columns"])
+                             for _uuid, row in matching]}
+        for row_uuid, row in matching:
+            if operation["op"] == "update":
+                for column, value in operation["row"].iteritems():
+                    row[column] = self._value(table, column, value, named)
+            elif operation["op"] == "mutate":
+                for column, mutator, value in operation["mutations"]:
+                    self._mutate(table, row, column, mutator, value, named)
+            else:
+                del rows[row_uuid]
+        return {"count": len(matching)}
+
+    def _mutate(self, table, row, column, mutator, value, named):
+        kind, key = _column_type(table, column)
+        if mutator == "+=":
+            row[column] += value
+        elif kind == "map" and mutator == "insert":
+            for k, v in self._value(table, column, value, named).items():
+                row[column].setdefault(k, v)
+        elif kind == "map" and mutator == "delete":
+            for k in value[1]:
+                row[column].pop(k, None)
+        elif mutator == "insert":
+            for atom in self._value(table, column, value, named):
+                if atom not in row[column]:
+                    row[column].append(atom)
+        elif mutator == "delete":
+            for atom in self._value(table, column, value, named):
+                if atom in row[column]:
+                    row[column].remove(atom)
+        else:
+            raise KeyError(mutator)
+
+    def _collect_garbage(self):
+        # Rows of the other tables only live while referenced
+        while True:
+            referenced = set()
+            for table, rows in self.tables.iteritems():
+                for row in rows.values():
+                    for column in row:
+                        kind, key = _column_type(table, column)
+                        if key == "uuid":
+                            referenced.update(row[column])
+            garbage = [(table, row_uuid)
+                       for table, rows in self.tables.iteritems()
+                       if table != ROOT_TABLE
+                       for row_uuid in rows if row_uuid not in referenced]
+            if not garbage:
+                return
+            for table, row_uuid in garbage:
+                del self.tables[table][row_uuid]
+
+
+class OvsdbClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        path = os.path.join(self.tempdir, 'db.sock')
+        self.server = FakeOvsdbServer(path)
+        self.server.start()
+        self.client = ovsdb_client.Client('unix:' + path)
+        self.vsctl = ovsdb_client.Vsctl(self.client)
+        self.vsctl.run([["add-br", BRIDGE]])
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.tempdir)
+
+    def testPorts(self):
+        self.vsctl.run([["add-port", BRIDGE, "tap0"],
+                        ["set", "Interface", "tap0",
+                         "external_ids:iface-id=%s" % VIF_ID,
+                         "external_ids:attached-mac=\"%s\"" % VIF_MAC],
+                        ["set", "Port", "tap0", "tag=1"]])
+        self.assertEqual(self.vsctl.list_ports(BRIDGE), ["tap0"])
+        self.assertEqual(self.vsctl.iface_to_br("tap0"), BRIDGE)
+        # ofport was assigned before run returned
+        self.assertEqual(self.vsctl.execute(["get", "Interface", "tap0",
+                                             "ofport"]), "2\n")
+        self.assertEqual(self.vsctl.execute(["get", "Port", "tap0", "tag"]),
+                         "1\n")
+        self.assertEqual(
+            self.vsctl.execute(["get", "Interface", "tap0",
+                                "external_ids:attached-mac"]),
+            '"%s"\n' % VIF_MAC)
+        interfaces = self.vsctl.port_interfaces(BRIDGE)
+        self.assertEqual(ovs_quantum_agent.interface_columns(interfaces[0]),
+                         ("tap0", "2", {"iface-id": VIF_ID,
+                                        "attached-mac": VIF_MAC}))
+
+        self.vsctl.execute(["--", "--if-exists", "del-port", BRIDGE, "tap0",
+                            "--", "--if-exists", "del-port", BRIDGE, "tap1"])
+        self.assertEqual(self.vsctl.execute(["list-ports", BRIDGE]), "")
+        self.assertEqual(self.server.tables["Port"].keys(),
+                         [self.vsctl.find("Port", BRIDGE)])
+
+    def testErrors(self):
+        self.assertRaises(ovsdb_client.OvsdbError, self.vsctl.run,
+                          [["del-port", BRIDGE, "tap0"]])
+        self.assertRaises(ovsdb_client.OvsdbError, self.vsctl.run,
+                          [["set", "Port", "tap0", "tag=1"]])
+        self.assertRaises(ovsdb_client.OvsdbError, self.vsctl.run,
+                          [["set", "Port", BRIDGE, "tag=x"]])
+        self.assertRaises(ovsdb_client.UnsupportedCommand,
+                          self.vsctl.execute, ["--format=json", "list",
+                                               "Interface"])
+        try:
+            self.client.transact([{"op": "select", "table": "Port",
+                                   "where": [], "columns": ["name"]},
+                                  {"op": "frobnicate", "table": "Port",
+                                   "where": []}])
+        except ovsdb_client.OvsdbError as e:
+            self.assertEqual(e.index, 1)
+        else:
+            self.fail("The transaction did not fail")
+
+    def testReconnect(self):
+        transactions = self.server.transactions
+        self.server.disconnect()
+        self.server.send_echo = True
+        # The monitor is started again on the new connection
+        self.vsctl.run([["add-port", BRIDGE, "tap0"]])
+        self.assertEqual(self.vsctl.list_ports(BRIDGE), ["tap0"])
+        self.assertEqual(self.server.transactions, transactions + 1)
+        self.assertEqual(self.server.echo_replies,
+                         [{"id": "echo", "result": ["ping"],
+                           "error": None}])
+
+    def testNativeBridge(self):
+        br = ovs_quantum_agent.make_bridge(BRIDGE, 'sudo', self.vsctl)
+        self.assertEqual(br.add_patch_port("patch-tun", "patch-int"), "2")
+        br.add_port("tap0")
+        br.begin_transaction()
+        br.set_db_attribute("Interface", "tap0", "external_ids:iface-id",
+                            VIF_ID)
+        br.set_db_attribute("Interface", "tap0", "external_ids:attached-mac",
+                            VIF_MAC)
+        br.set_db_attribute("Port", "missing", "tag", "1")
+        errors = br.commit_transaction()
+        self.assertEqual([command for command, error in errors],
+                         [["set", "Port", "missing", "tag=1"]])
+
+        self.assertEqual(br.get_port_name_list(), ["patch-tun", "tap0"])
+        ports = br.get_vif_ports()
+        self.assertEqual([(port.port_name, port.ofport, port.vif_id)
+                          for port in ports], [("tap0", "3", VIF_ID)])
+        self.assertEqual(br.db_get_map("Interface", "patch-tun", "options"),
+                         {"peer": "patch-int"})
@@ -14,49 +14,140 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+import tempfile
 import unittest
-from ovs_quantum_plugin import VlanMap, NoFreeVLANException
 
+import quantum.db.api as db
+import ovs_db
+import ovs_models
+from ovs_quantum_plugin import OVSQuantumPlugin, parse_vlan_ranges
 
-class VlanMapTest(unittest.TestCase):
+
+VLAN_RANGES = [(10, 19), (30, 34)]
+PLUGIN_INI = """
+[DATABASE]
+sql_connection = sqlite://
+
+[OVS]
+vlan-ranges = 10:12
+"""
+
+
+class VlanAllocationTest(unittest.TestCase):
 
     def setUp(self):
-        self.vmap = VlanMap()
+        db.configure_db({'sql_connection': 'sqlite://'})
+        ovs_db.sync_vlan_allocations(VLAN_RANGES)
 
     def tearDown(self):
-        pass
+        db.clear_db()
+
+    def _allocated(self):
+        session = db.get_session()
+        return sorted(a.vlan_id for a in
+                      session.query(ovs_models.VlanAllocation).
+                      filter_by(allocated=True))
 
     def testAddVlan(self):
-        vlan_id = self.vmap.acquire("foobar")
-        self.assertTrue(vlan_id >= VlanMap.VLAN_MIN)
-        self.assertTrue(vlan_id <= VlanMap.VLAN_MAX)
+        vlan_id = ovs_db.reserve_vlan("foobar")
+        self.assertTrue(10 <= vlan_id <= 19 or 30 <= vlan_id <= 34)
+        self.assertEqual(ovs_db.get_vlans(), [(vlan_id, "foobar")])
+        self.assertEqual(self._allocated(), [vlan_id])
 
     def testReleaseVlan(self):
-        vlan_id = self.vmap.acquire("foobar")
-        self.vmap.release("foobar")
-
-    def testAddRelease4kVlans(self):
-        vlan_id = None
-        num_vlans = VlanMap.VLAN_MAX - VlanMap.VLAN_MIN
-        for id in xrange(num_vlans):
-            vlan_id = self.vmap.acquire("net-%s" % id)
-            self.assertTrue(vlan_id >= VlanMap.VLAN_MIN)
-            self.assertTrue(vlan_id <= VlanMap.VLAN_MAX)
-        for id in xrange(num_vlans):
-            self.vmap.release("net-%s" % id)
-
-    def testAlreadyUsed(self):
-        existing_vlan = 2
-        self.vmap.already_used(existing_vlan, "net1")
+        vlan_id = ovs_db.reserve_vlan("foobar")
+        ovs_db.release_vlan("foobar", VLAN_RANGES)
+        self.assertEqual(ovs_db.get_vlans(), [])
+        self.assertEqual(self._allocated(), [])
+
+    def testAddReleaseAllVlans(self):
+        vlans = set()
+        for id in xrange(15):
+            vlans.add(ovs_db.reserve_vlan("net-%s" % id))
+        self.assertEqual(vlans, set(range(10, 20) + range(30, 35)))
+        self.assertRaises(ovs_db.NoFreeVLANException,
+                          ovs_db.reserve_vlan, "net-15")
+        for id in xrange(15):
+            ovs_db.release_vlan("net-%s" % id, VLAN_RANGES)
+        self.assertEqual(self._allocated(), [])
+
+    def testReserveFromRandomVlan(self):
+        randint = ovs_db.random.randint
         try:
-            # this value is high enough that we will exhaust
-            # all VLANs.  We want to make sure 'existing_vlan'
-            # is never reallocated.
-            num_vlans = VlanMap.VLAN_MAX - VlanMap.VLAN_MIN + 1
-            for x in xrange(num_vlans):
-                vlan_id = self.vmap.acquire("net-%x" % x)
-                self.assertTrue(vlan_id != existing_vlan)
-
-            self.fail("Did not run out of VLANs as expected")
-        except NoFreeVLANException:
-            pass  # Expected exit
+            ovs_db.random.randint = lambda a, b: 33
+            self.assertEqual(ovs_db.reserve_vlan("net1"), 33)
+            self.assertEqual(ovs_db.reserve_vlan("net2"), 34)
+            # Wraps around past the last free VLAN
+            self.assertEqual(ovs_db.reserve_vlan("net3"), 10)
+        finally:
+            ovs_db.random.randint = randint
+
+    def testSyncKeepsBoundVlans(self):
+        vlan_id = ovs_db.reserve_vlan("net1")
+        ovs_db.sync_vlan_allocations([(100, 101)])
+        self.assertEqual(self._allocated(), [vlan_id])
+        vlans = set([ovs_db.reserve_vlan("net2"),
+                     ovs_db.reserve_vlan("net3")])
+        self.assertEqual(vlans, set([100, 101]))
+        self.assertRaises(ovs_db.NoFreeVLANException,
+                          ovs_db.reserve_vlan, "net4")
+        # Released out of range VLANs are not handed out again
+        ovs_db.release_vlan("net1", [(100, 101)])
+        self.assertRaises(ovs_db.NoFreeVLANException,
+                          ovs_db.reserve_vlan, "net4")
+
+    def testSyncAdoptsExistingBindings(self):
+        session = db.get_session()
+        session.query(ovs_models.VlanAllocation).delete()
+        session.add(ovs_models.VlanBinding(12, "net1"))
+        session.flush()
+        ovs_db.sync_vlan_allocations(VLAN_RANGES)
+        self.assertEqual(self._allocated(), [12])
+        for id in xrange(14):
+            self.assertNotEqual(ovs_db.reserve_vlan("net-%s" % id), 12)
+
+    def testParseVlanRanges(self):
+        self.assertEqual(parse_vlan_ranges("1:4094"), [(1, 4094)])
+        self.assertEqual(parse_vlan_ranges("10:19, 30:34"), VLAN_RANGES)
+        for value in ("0:10", "10:5", "1:4095", "10", "a:b"):
+            self.assertRaises(Exception, parse_vlan_ranges, value)
+
+
+class OVSPluginVlanTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.ini_file = tempfile.mkstemp(suffix='.ini')
+        ini = os.fdopen(fd, 'w')
+        ini.write(PLUGIN_INI)
+        ini.close()
+        self.plugin = OVSQuantumPlugin(self.ini_file)
+
+    def tearDown(self):
+        db.clear_db()
+        os.unlink(self.ini_file)
+
+    def testCreateNetworkBulk(self):
+        nets = self.plugin.create_network_bulk(
+            "t1", [{'name': 'net1'}, {'name': 'net2'}])
+        self.assertEqual([net['net-name'] for net in nets],
+                         ['net1', 'net2'])
+        self.assertEqual(sorted(net_id for _vlan, net_id in
+                                ovs_db.get_vlans()),
+                         sorted(net['net-id'] for net in nets))
+
+    def testCreateNetworkBulkNoFreeVlan(self):
+        net = self.plugin.create_network("t1", "net1")
+        # Only two VLANs are left for three networks
+        self.assertRaises(ovs_db.NoFreeVLANException,
+                          self.plugin.create_network_bulk, "t1",
+                          [{'name': 'net2'}, {'name': 'net3'},
+                           {'name': 'net4'}])
+        self.assertEqual([n['net-id'] for n in
+                          self.plugin.get_all_networks("t1")],
+                         [net['net-id']])
+        self.assertEqual([net_id for _vlan, net_id in ovs_db.get_vlans()],
+                         [net['net-id']])
+        # The VLANs reserved for the batch were released
+        self.assertEqual(len(self.plugin.create_network_bulk(
+            "t1", [{'name': 'net2'}, {'name': 'net3'}])), 2)
@@ -344,6 +344,17 @@ def main():
         LOG.exception("Invalid database configuration in %s" % cfg_file)
         sys.exit(1) 
                 
+    try:
+        if (config.has_option("AGENT", "ovsdb_interface") and
+            config.get("AGENT", "ovsdb_interface") == "native"):
+            connection = "unix:/var/run/openvswitch/db.sock"
+            if config.has_option("AGENT", "ovsdb_connection"):
+                connection = config.get("AGENT", "ovsdb_connection")
+            ovs.use_ovsdb(connection)
+    except Exception as e:
+        LOG.exception("Unable to connect to ovsdb-server")
+        sys.exit(1)
+
     try:
         db = kv_api.DB(db_host, db_port)
     except Exception as e:
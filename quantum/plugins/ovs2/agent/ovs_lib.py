@@ -1,8 +1,29 @@
 import zlib
 import utils 
 
+try:
+    from quantum.plugins.openvswitch.agent import ovsdb_client
+except ImportError:
+    ovsdb_client = None
+
+# The ovsdb_client.Vsctl set by use_ovsdb, talking to ovsdb-server rather
+# than running ovs-vsctl
+vsctl = None
+
+
+def use_ovsdb(connection):
+    global vsctl
+    if ovsdb_client is None:
+        raise ImportError("quantum is not installed")
+    vsctl = ovsdb_client.Vsctl(ovsdb_client.Client(connection))
+
 
 def run_vsctl(args):
+    if vsctl is not None:
+        try:
+            return vsctl.execute(args)
+        except ovsdb_client.UnsupportedCommand:
+            pass
     full_args = ["ovs-vsctl", "--timeout=2"] + args
     return utils.execute(full_args, root_helper='sudo') #TODO
 
@@ -19,9 +40,9 @@ def get_ofport(port_name):
     return port_num.rstrip("\n")
 
 def create_patch_port(br_name, port_name, peer_name):    
-    run_vsctl(['add-port', br_name, port_name])
-    run_vsctl(['set', 'Interface', port_name, 'type=patch'] )
-    run_vsctl(['set', 'Interface', port_name, 'options:peer=%s' %(peer_name)])
+    run_vsctl(['--', 'add-port', br_name, port_name,
+               '--', 'set', 'Interface', port_name, 'type=patch',
+               'options:peer=%s' %(peer_name)])
 
 def get_gre_port_name(net_id, remote_ip):
     ''' needs to be <14 chars or tunnel won't work '''
@@ -29,13 +50,20 @@ def get_gre_port_name(net_id, remote_ip):
     return 'gre-%x' % abs(zlib.crc32(s))
      
 def create_gre_port(br_name, port_name, remote_ip, gre_key): 
-    run_vsctl(['add-port', br_name, port_name])
-    run_vsctl(['set', 'Interface', port_name, 'type=gre'] )
-    run_vsctl(['set', 'Interface', port_name, 'options:remote_ip=%s' 
-               %(remote_ip)])
-    run_vsctl(['set', 'Interface', port_name, 'options:key=0x%s' %(gre_key)])
+    run_vsctl(['--', 'add-port', br_name, port_name,
+               '--', 'set', 'Interface', port_name, 'type=gre',
+               'options:remote_ip=%s' %(remote_ip),
+               'options:key=0x%s' %(gre_key)])
         
 def get_gre_ips(net_id):
+    if vsctl is not None:
+        rows = vsctl.select('Interface',
+                            [['type', '==', 'gre'],
+                             ['options', 'includes',
+                              ['map', [['key', '0x%s' %net_id]]]]],
+                            ['options'])
+        return [ovsdb_client.map_dict(row['options'])['remote_ip']
+                for row in rows]
     ports = run_vsctl(['--bare', '--','--columns=name', 
                        'find', 'interface', 'type=gre', 
                        'options:key=0x%s' %net_id])
@@ -46,8 +74,11 @@ def get_gre_ips(net_id):
     return remote_ips     
         
 def get_attached_mac(dev_name):
-    utils.execute(["ovs-vsctl", "--timeout=10", "wait-until", 
-                   "interface", dev_name], root_helper='sudo')
+    if vsctl is not None:
+        vsctl.wait_for_row("Interface", dev_name, 10)
+    else:
+        utils.execute(["ovs-vsctl", "--timeout=10", "wait-until", 
+                       "interface", dev_name], root_helper='sudo')
     out = run_vsctl(["get", "interface", dev_name, "external_ids:attached-mac"])
     return out.strip("\"\n")   
         
\ No newline at end of file
@@ -32,18 +32,23 @@ class OVSQuantumPlugin(QuantumPluginBase):
             raise Exception("Configuration file %s does not exist" % configfile)
         LOG.debug("Using configuration file: %s" % configfile)
         config.read(configfile)
-        options = {"sql_connection": config.get("DATABASE", "sql_connection")}
+        options = dict(config.items("DATABASE"))
         LOG.debug("Using SQL DB: %s" % options)
         db.configure_db(options)
 
     def get_all_networks(self, tenant_id, **kwargs):
         nets = []
-        for x in db.network_list(tenant_id):
+        for x in db.network_list(tenant_id, **db.network_list_args(kwargs)):
             LOG.debug("Adding network: %s" % x.uuid)
             nets.append(self._make_net_dict(str(x.uuid), x.name,
                                             None, x.op_status))
         return nets
 
+    def iter_all_networks(self, tenant_id, **kwargs):
+        nets = db.network_iter(tenant_id, **db.network_list_args(kwargs))
+        return (self._make_net_dict(str(x.uuid), x.name, None, x.op_status)
+                for x in nets)
+
     def _make_net_dict(self, net_id, net_name, ports, op_status):
         res = { 'net-id': net_id,
                 'net-name': net_name,
@@ -78,12 +83,17 @@ class OVSQuantumPlugin(QuantumPluginBase):
         return self._make_net_dict(str(net.uuid), net.name, [], net.op_status)
 
     def get_network_details(self, tenant_id, net_id):
-        db.validate_network_ownership(tenant_id, net_id)
-        net = db.network_get(net_id)
+        net = db.validate_network_ownership(tenant_id, net_id)
         ports = self.get_all_ports(tenant_id, net_id)
         return self._make_net_dict(str(net.uuid), net.name, 
                                    ports, net.op_status)
 
+    def get_network_details_with_ports(self, tenant_id, net_id):
+        net = db.network_get_with_ports(tenant_id, net_id)
+        ports = [self._make_port_dict(port) for port in net.ports]
+        return self._make_net_dict(str(net.uuid), net.name,
+                                   ports, net.op_status)
+
     def update_network(self, tenant_id, net_id, **kwargs):
         db.validate_network_ownership(tenant_id, net_id)
         net = db.network_update(net_id, tenant_id, **kwargs)
@@ -103,10 +113,19 @@ class OVSQuantumPlugin(QuantumPluginBase):
 
     def get_all_ports(self, tenant_id, net_id, **kwargs):
         db.validate_network_ownership(tenant_id, net_id)
-        ports = db.port_list(net_id)
-        # This plugin does not perform filtering at the moment
+        ports = db.port_list(net_id, **db.port_list_args(kwargs))
         return [{'port-id': str(p.uuid)} for p in ports]
 
+    def iter_all_ports(self, tenant_id, net_id, **kwargs):
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_iter(net_id, **db.port_list_args(kwargs))
+        return ({'port-id': str(p.uuid)} for p in ports)
+
+    def get_all_ports_details(self, tenant_id, net_id, **kwargs):
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_list(net_id, **db.port_list_args(kwargs))
+        return [self._make_port_dict(port) for port in ports]
+
     def create_port(self, tenant_id, net_id, port_state=None, **kwargs):
         LOG.debug("Creating port with network_id: %s" % net_id)
         db.validate_network_ownership(tenant_id, net_id)
@@ -114,6 +133,14 @@ class OVSQuantumPlugin(QuantumPluginBase):
                                 op_status=OperationalStatus.DOWN)
         return self._make_port_dict(port)
 
+    def create_port_bulk(self, tenant_id, net_id, ports):
+        LOG.debug("Creating %d ports with network_id: %s"
+                  % (len(ports), net_id))
+        db.validate_network_ownership(tenant_id, net_id)
+        ports = db.port_create_bulk(net_id, [p.get('state') for p in ports],
+                                    op_status=OperationalStatus.DOWN)
+        return [self._make_port_dict(port) for port in ports]
+
     def delete_port(self, tenant_id, net_id, port_id):
         db.validate_port_ownership(tenant_id, net_id, port_id)
         port = db.port_destroy(port_id, net_id)
@@ -123,14 +150,12 @@ class OVSQuantumPlugin(QuantumPluginBase):
         """
         Updates the state of a port on the specified Virtual Network.
         """
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         db.port_update(port_id, net_id, **kwargs)
         return self._make_port_dict(port)
 
     def get_port_details(self, tenant_id, net_id, port_id):
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        port = db.port_get(port_id, net_id)
+        port = db.port_get_for_tenant(tenant_id, net_id, port_id)
         return self._make_port_dict(port)
 
     def plug_interface(self, tenant_id, net_id, port_id, remote_iface_id):
@@ -144,6 +169,5 @@ class OVSQuantumPlugin(QuantumPluginBase):
         db.port_update(port_id, net_id, op_status=OperationalStatus.DOWN)
 
     def get_interface_details(self, tenant_id, net_id, port_id):
-        db.validate_port_ownership(tenant_id, net_id, port_id)
-        res = db.port_get(port_id, net_id)
+        res = db.port_get_for_tenant(tenant_id, net_id, port_id)
         return res.interface_id
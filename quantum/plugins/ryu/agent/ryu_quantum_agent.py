@@ -20,6 +20,7 @@
 #    under the License.
 # @author: Isaku Yamahata
 import ConfigParser
+import json
 import logging as LOG
 import shlex
 import signal
@@ -32,11 +33,29 @@ from subprocess import PIPE, Popen
 from ryu.app import rest_nw_id
 from ryu.app.client import OFPClient
 
+try:
+    from quantum.plugins.openvswitch.agent import ovsdb_client
+except ImportError:
+    ovsdb_client = None
+
 
 OP_STATUS_UP = "UP"
 OP_STATUS_DOWN = "DOWN"
 
 
+def interface_columns(interface):
+    """
+    Returns the name, ofport and external_ids of an Interface row, given
+    as a dict of the JSON values ovs-vsctl or ovsdb_client returned.
+    """
+    # Columns with no value hold an empty set, ["set", []]
+    ofport = interface["ofport"]
+    if not isinstance(ofport, int):
+        ofport = "[]"
+    return (str(interface["name"]), str(ofport),
+            dict(interface["external_ids"][1]))
+
+
 class VifPort:
     """
     A class to represent a VIF (i.e., a port that has 'iface-id' and 'vif-mac'
@@ -113,6 +132,31 @@ class OVSBridge:
         res = self.run_vsctl(["list-ports", self.br_name])
         return res.split("\n")[:-1]
 
+    def get_port_interfaces(self):
+        """
+        Returns the name, ofport and external_ids of the interface of
+        every port of the bridge, read with a single ovs-vsctl call.
+        """
+        res = self.run_vsctl(["--format=json", "--",
+                              "--columns=name,external_ids,ofport",
+                              "list", "Interface", "--",
+                              "list-ports", self.br_name])
+        # The table of every interface comes on the first line, followed
+        # by the names of the ports of the bridge
+        table, _sep, names = res.partition("\n")
+        try:
+            table = json.loads(table)
+        except ValueError:
+            LOG.error("Unable to list the interfaces of %s", self.br_name)
+            return []
+        port_names = set(names.split("\n"))
+        interfaces = []
+        for row in table["data"]:
+            interface = dict(zip(table["headings"], row))
+            if interface["name"] in port_names:
+                interfaces.append(interface_columns(interface))
+        return interfaces
+
     def get_xapi_iface_id(self, xs_vif_uuid):
         return self.run_cmd(
                         ["xe",
@@ -121,30 +165,26 @@ class OVSBridge:
                         "param-key=nicira-iface-id",
                         "uuid=%s" % xs_vif_uuid]).strip()
 
-    def _vifport(self, name, external_ids):
-        ofport = self.db_get_val("Interface", name, "ofport")
+    def _vifport(self, name, ofport, external_ids):
         return VifPort(name, ofport, external_ids["iface-id"],
                        external_ids["attached-mac"], self)
 
     def _get_ports(self, get_port):
         ports = []
-        port_names = self.get_port_name_list()
-        for name in port_names:
-            port = get_port(name)
+        for name, ofport, external_ids in self.get_port_interfaces():
+            port = get_port(name, ofport, external_ids)
             if port:
                 ports.append(port)
 
         return ports
 
-    def _get_vif_port(self, name):
-        external_ids = self.db_get_map("Interface", name, "external_ids")
+    def _get_vif_port(self, name, ofport, external_ids):
         if "iface-id" in external_ids and "attached-mac" in external_ids:
-            return self._vifport(name, external_ids)
+            return self._vifport(name, ofport, external_ids)
         elif ("xs-vif-uuid" in external_ids and
               "attached-mac" in external_ids):
             # if this is a xenserver and iface-id is not automatically
             # synced to OVS from XAPI, we grab it from XAPI directly
-            ofport = self.db_get_val("Interface", name, "ofport")
             iface_id = self.get_xapi_iface_id(external_ids["xs-vif-uuid"])
             return VifPort(name, ofport, iface_id,
                            external_ids["attached-mac"], self)
@@ -153,18 +193,65 @@ class OVSBridge:
         "returns a VIF object for each VIF port"
         return self._get_ports(self._get_vif_port)
 
-    def _get_external_port(self, name):
-        external_ids = self.db_get_map("Interface", name, "external_ids")
+    def _get_external_port(self, name, ofport, external_ids):
         if external_ids:
             return
 
-        ofport = self.db_get_val("Interface", name, "ofport")
         return VifPort(name, ofport, None, None, self)
 
     def get_external_ports(self):
         return self._get_ports(self._get_external_port)
 
 
+class NativeOVSBridge(OVSBridge):
+    """
+    OVSBridge reading and changing the Open vSwitch database over a
+    connection to ovsdb-server, an ovsdb_client.Vsctl, rather than by
+    running ovs-vsctl.
+    """
+    def __init__(self, br_name, root_helper, ovsdb):
+        OVSBridge.__init__(self, br_name, root_helper)
+        self.ovsdb = ovsdb
+
+    def run_vsctl(self, args):
+        try:
+            return self.ovsdb.execute(args)
+        except ovsdb_client.UnsupportedCommand:
+            return OVSBridge.run_vsctl(self, args)
+        except ovsdb_client.OvsdbError, e:
+            # ovs-vsctl prints nothing when it fails
+            LOG.error("ovs-vsctl %s failed: %s", " ".join(args), e)
+            return ""
+
+    def get_port_interfaces(self):
+        try:
+            interfaces = self.ovsdb.port_interfaces(self.br_name)
+        except ovsdb_client.OvsdbError, e:
+            LOG.error("Unable to list the interfaces of %s: %s",
+                      self.br_name, e)
+            return []
+        return [interface_columns(interface) for interface in interfaces]
+
+
+def get_ovsdb(config):
+    """
+    Returns the ovsdb_client.Vsctl selected by the [AGENT] section of
+    config, or None if the agent runs ovs-vsctl.
+    """
+    if (not config.has_option("AGENT", "ovsdb_interface") or
+        config.get("AGENT", "ovsdb_interface") == "vsctl"):
+        return None
+    if config.get("AGENT", "ovsdb_interface") != "native":
+        raise ValueError("Unknown ovsdb_interface %s" %
+                         config.get("AGENT", "ovsdb_interface"))
+    if ovsdb_client is None:
+        raise ImportError("quantum is not installed")
+    connection = ovsdb_client.DEFAULT_CONNECTION
+    if config.has_option("AGENT", "ovsdb_connection"):
+        connection = config.get("AGENT", "ovsdb_connection")
+    return ovsdb_client.Vsctl(ovsdb_client.Client(connection))
+
+
 def check_ofp_mode(db):
     LOG.debug("checking db")
 
@@ -193,8 +280,9 @@ def check_ofp_mode(db):
 
 
 class OVSQuantumOFPRyuAgent:
-    def __init__(self, integ_br, db, root_helper):
+    def __init__(self, integ_br, db, root_helper, ovsdb=None):
         self.root_helper = root_helper
+        self.ovsdb = ovsdb
         (ofp_controller_addr, ofp_rest_api_addr) = check_ofp_mode(db)
 
         self.nw_id_external = rest_nw_id.NW_ID_EXTERNAL
@@ -202,7 +290,11 @@ class OVSQuantumOFPRyuAgent:
         self._setup_integration_br(integ_br, ofp_controller_addr)
 
     def _setup_integration_br(self, integ_br, ofp_controller_addr):
-        self.int_br = OVSBridge(integ_br, self.root_helper)
+        if self.ovsdb is not None:
+            self.int_br = NativeOVSBridge(integ_br, self.root_helper,
+                                          self.ovsdb)
+        else:
+            self.int_br = OVSBridge(integ_br, self.root_helper)
         self.int_br.find_datapath_id()
         self.int_br.set_controller(ofp_controller_addr)
         for port in self.int_br.get_external_ports():
@@ -302,13 +394,14 @@ def main():
     integ_br = config.get("OVS", "integration-bridge")
 
     root_helper = config.get("AGENT", "root_helper")
+    ovsdb = get_ovsdb(config)
 
     options = {"sql_connection": config.get("DATABASE", "sql_connection")}
     db = SqlSoup(options["sql_connection"])
 
     LOG.info("Connecting to database \"%s\" on %s",
              db.engine.url.database, db.engine.url.host)
-    plugin = OVSQuantumOFPRyuAgent(integ_br, db, root_helper)
+    plugin = OVSQuantumOFPRyuAgent(integ_br, db, root_helper, ovsdb)
     plugin.daemon_loop(db)
 
     sys.exit(0)
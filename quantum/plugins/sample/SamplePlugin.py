@@ -135,25 +135,11 @@ class FakePlugin(object):
 
     def _get_network(self, tenant_id, network_id):
 
-        db.validate_network_ownership(tenant_id, network_id)
-        try:
-            network = db.network_get(network_id)
-        except:
-            raise exc.NetworkNotFound(net_id=network_id)
-        return network
+        return db.validate_network_ownership(tenant_id, network_id)
 
     def _get_port(self, tenant_id, network_id, port_id):
 
-        db.validate_port_ownership(tenant_id, network_id, port_id)
-        net = self._get_network(tenant_id, network_id)
-        try:
-            port = db.port_get(port_id, network_id)
-        except:
-            raise exc.PortNotFound(net_id=network_id, port_id=port_id)
-        # Port must exist and belong to the appropriate network.
-        if port['network_id'] != net['uuid']:
-            raise exc.PortNotFound(net_id=network_id, port_id=port_id)
-        return port
+        return db.port_get_for_tenant(tenant_id, network_id, port_id)
 
     def _validate_port_state(self, port_state):
         if port_state.upper() not in ('ACTIVE', 'DOWN'):
@@ -215,6 +201,25 @@ class FakePlugin(object):
         # Return uuid for newly created network as net-id.
         return {'net-id': new_net.uuid}
 
+    def create_network_async(self, tenant_id, net_name, **kwargs):
+        """
+        Records a new Virtual Network, returning it along with the
+        work which brings it up.
+        """
+        LOG.debug("FakePlugin.create_network_async() called")
+        new_net = db.network_create(tenant_id, net_name,
+                                    op_status=OperationalStatus.PROVISIONING)
+
+        def work():
+            # A real plug-in would configure its devices here, setting
+            # the operational status to ERROR if they fail
+            db.network_update(new_net.uuid, tenant_id,
+                              op_status=OperationalStatus.UP)
+
+        return ({'net-id': new_net.uuid,
+                 'net-name': net_name,
+                 'net-op-status': new_net.op_status}, work)
+
     def delete_network(self, tenant_id, net_id):
         """
         Deletes the network with the specified network identifier
@@ -284,6 +289,26 @@ class FakePlugin(object):
         port_item = {'port-id': str(port.uuid)}
         return port_item
 
+    def create_port_async(self, tenant_id, net_id, port_state=None,
+                          **kwargs):
+        """
+        Records a port on the specified Virtual Network, returning it
+        along with the work which brings it up.
+        """
+        LOG.debug("FakePlugin.create_port_async() called")
+        # verify net_id
+        self._get_network(tenant_id, net_id)
+        port = db.port_create(net_id, port_state,
+                              op_status=OperationalStatus.PROVISIONING)
+
+        def work():
+            db.port_update(port.uuid, net_id,
+                           op_status=OperationalStatus.UP)
+
+        return ({'port-id': str(port.uuid),
+                 'port-state': port.state,
+                 'port-op-status': port.op_status}, work)
+
     def update_port(self, tenant_id, net_id, port_id, **kwargs):
         """
         Updates the attributes of a port on the specified Virtual Network.
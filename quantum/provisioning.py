@@ -0,0 +1,152 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Asynchronous provisioning of resources.
+
+With the provisioning_workers option set, the v1.1 API creates networks
+and ports through the create_network_async and create_port_async methods
+of the Plug-ins implementing them: these record the resource with the
+PROVISIONING operational status and return it along with the device side
+work still to be done, which a Provisioner runs in one of its workers
+while the API answers the request. The work sets the operational status
+of the resource to UP, or to ERROR before raising.
+
+Every piece of work is tracked by a Job, whose id is the one of the
+resource it provisions. Jobs are kept in memory by the server process
+which accepted the request, the last max_jobs of them once finished;
+the operational status of the resource is what every process reports.
+This is why quantum-server refuses to provision asynchronously when it
+serves the API from several workers.
+"""
+
+import logging
+import time
+
+import eventlet
+import eventlet.event
+import eventlet.queue
+
+
+LOG = logging.getLogger('quantum.provisioning')
+
+# Job states
+QUEUED = 'QUEUED'
+RUNNING = 'RUNNING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+
+class Job(object):
+    """Device side work provisioning a resource"""
+
+    def __init__(self, tenant_id, resource, resource_id, work):
+        self.id = resource_id
+        self.tenant_id = tenant_id
+        self.resource = resource
+        self.work = work
+        self.state = QUEUED
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._done = eventlet.event.Event()
+
+    def wait(self):
+        """Waits until the job has run"""
+        if self.finished is None:
+            self._done.wait()
+
+    def run(self):
+        self.state = RUNNING
+        try:
+            self.work()
+            self.state = DONE
+        except Exception as e:
+            LOG.exception("Provisioning %s %s failed", self.resource,
+                          self.id)
+            self.state = FAILED
+            self.error = str(e)
+        finally:
+            self.work = None
+            self.finished = time.time()
+            self._done.send()
+
+    def to_dict(self):
+        job = {'id': self.id,
+               'resource': self.resource,
+               'state': self.state}
+        if self.error is not None:
+            job['error'] = self.error
+        return job
+
+
+class Provisioner(object):
+    """Runs provisioning jobs in a bounded pool of green threads"""
+
+    def __init__(self, workers=4, max_jobs=1000):
+        self.max_jobs = int(max_jobs)
+        # job id -> Job
+        self.jobs = {}
+        # job ids, in submission order
+        self._order = []
+        self._queue = eventlet.queue.LightQueue()
+        for i in range(int(workers)):
+            eventlet.spawn_n(self._work)
+
+    def submit(self, tenant_id, resource, resource_id, work):
+        """Queues work, provisioning resource_id of tenant_id"""
+        job = Job(tenant_id, resource, resource_id, work)
+        if job.id not in self.jobs:
+            self._order.append(job.id)
+        self.jobs[job.id] = job
+        self._prune()
+        self._queue.put(job)
+        LOG.debug("Queued the provisioning of %s %s", resource, job.id)
+        return job
+
+    def get_job(self, tenant_id, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.tenant_id != tenant_id:
+            return None
+        return job
+
+    def get_jobs(self, tenant_id):
+        return [self.jobs[job_id] for job_id in self._order
+                if self.jobs[job_id].tenant_id == tenant_id]
+
+    def wait(self, job_id):
+        """Waits until the job provisioning resource job_id, if any, ran"""
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.wait()
+
+    def _prune(self):
+        """Forgets the oldest finished jobs beyond max_jobs"""
+        excess = len(self.jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        order = []
+        for job_id in self._order:
+            if excess and self.jobs[job_id].finished is not None:
+                del self.jobs[job_id]
+                excess -= 1
+            else:
+                order.append(job_id)
+        self._order = order
+
+    def _work(self):
+        while True:
+            self._queue.get().run()
@@ -20,6 +20,58 @@ Quantum Plug-in API specification.
 
 QuantumPluginBase provides the definition of minimum set of
 methods that needs to be implemented by a Quantum Plug-in.
+
+A Plug-in may also implement the following optional methods; the API
+layer uses them when they are present and falls back to the mandatory
+per-item methods otherwise:
+
+    create_network_bulk(tenant_id, networks)
+        networks is a list of network request bodies (each one with at
+        least a 'name'); returns a list of mappings shaped like the
+        result of create_network.
+    create_port_bulk(tenant_id, net_id, ports)
+        ports is a list of port request bodies (each one with a
+        'state'); returns a list of mappings shaped like the result of
+        create_port.
+    get_all_ports_details(tenant_id, net_id, **kwargs)
+        same as get_all_ports, including filter_opts and page_opts
+        handling, but returns mappings shaped like the result of
+        get_port_details.
+    get_network_details_with_ports(tenant_id, net_id)
+        same as get_network_details, with a 'net-ports' list of
+        mappings shaped like the result of get_port_details.
+    iter_all_networks(tenant_id, **kwargs)
+    iter_all_ports(tenant_id, net_id, **kwargs)
+        same as get_all_networks and get_all_ports, but return an
+        iterator; the API streams the items to the client as the
+        iterator yields them. Errors must be raised by the call itself,
+        as the response has already started when the iterator runs.
+    get_revision(tenant_id)
+        returns a value which changes whenever a network or port of the
+        tenant, or anything reported about them, changes (or None if it
+        is unknown); the API uses it to answer conditional GET requests
+        with 304 Not Modified. quantum.db.api.tenant_revision_get keeps
+        one for Plug-ins making every change through quantum.db.api.
+    create_network_async(tenant_id, net_name, **kwargs)
+    create_port_async(tenant_id, net_id, port_state=None, **kwargs)
+        same as create_network and create_port, but only record the
+        resource with the PROVISIONING operational status; they return
+        a tuple of the result of get_network_details (without ports) or
+        get_port_details, and of a callable doing the device side work,
+        which sets the status to UP, or to ERROR before raising. The
+        API uses them when the provisioning_workers option is set (see
+        quantum.provisioning).
+
+quantum-server may serve the API from several worker processes (the
+workers option), each with its own instance of the Plug-in. A Plug-in
+keeping state in memory, which would diverge between the processes,
+must either move it to its database or set the class attribute
+supports_workers to False, in which case the workers refuse to start.
+
+A Plug-in whose read calls are expensive may set the class attribute
+supports_caching to True, allowing quantum-server to cache their results
+for a few seconds (see quantum.plugin_cache); it should not if stale
+results could do harm, or if it implements get_revision.
 """
 
 import inspect
@@ -41,6 +93,10 @@ class QuantumPluginBase(object):
         :param **kwargs: options to be passed to the plugin. The following
             keywork based-options can be specified:
             filter_opts - options for filtering network list
+            page_opts - 'limit' and 'marker' options for paginating the
+                network list by net-id; a plugin which paginates removes
+                them from page_opts, but may only do so if it also
+                implemented every option in filter_opts
         :returns: a list of mapping sequences with the following signature:
                      [ {'net-id': uuid that uniquely identifies
                                       the particular quantum network,
@@ -135,6 +191,8 @@ class QuantumPluginBase(object):
         :param **kwargs: options to be passed to the plugin. The following
             keywork based-options can be specified:
             filter_opts - options for filtering network list
+            page_opts - 'limit' and 'marker' options for paginating the
+                port list by port-id, see get_all_networks
         :returns: a list of mapping sequences with the following signature:
                      [ {'port-id': uuid representing a particular port
                                     on the specified quantum network
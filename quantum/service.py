@@ -17,6 +17,7 @@
 
 import logging
 from quantum.common import config
+from quantum import manager
 from quantum import wsgi
 from quantum.common import exceptions as exception
 
@@ -102,14 +103,49 @@ def serve_wsgi(cls, conf=None, options=None, args=None):
 
 def _run_wsgi(app_name, paste_conf, paste_config_file):
     LOG.info(_('Using paste.deploy config at: %s'), paste_config_file)
+    workers = int(paste_conf.get('workers') or 0)
+    server = wsgi.Server("Quantum")
+    if workers > 0:
+        # Each worker process loads the application, and the plugin
+        # with it, once it has been forked
+        def load_app():
+            app = _load_paste_app(app_name, paste_config_file)
+            if not app:
+                return None
+            plugin = manager.QuantumManager.get_plugin()
+            if not getattr(plugin, 'supports_workers', True):
+                LOG.error(_('%s keeps state in memory and cannot serve '
+                            'the API from several workers.'),
+                          plugin.__class__.__name__)
+                return None
+            # The jobs are only known to the process which accepted the
+            # request, whereas the next request may go to any worker
+            if (workers > 1 and
+                manager.QuantumManager.get_provisioner() is not None):
+                LOG.error(_('Asynchronous provisioning keeps its jobs in '
+                            'memory and cannot be combined with several '
+                            'workers; unset provisioning_workers or '
+                            'workers.'))
+                return None
+            return app
+        server.start_workers(load_app, workers,
+                             int(paste_conf['bind_port']),
+                             paste_conf['bind_host'])
+        return server
+
+    app = _load_paste_app(app_name, paste_config_file)
+    if not app:
+        return
+    server.start(app,
+                 int(paste_conf['bind_port']), paste_conf['bind_host'])
+    return server
+
+
+def _load_paste_app(app_name, paste_config_file):
     conf, app = config.load_paste_app(app_name,
                                       {'config_file': paste_config_file},
                                       None)
     if not app:
         LOG.error(_('No known API applications configured in %s.'),
                       paste_config_file)
-        return
-    server = wsgi.Server("Quantum")
-    server.start(app,
-                 int(paste_conf['bind_port']), paste_conf['bind_host'])
-    return server
+    return app
@@ -22,6 +22,7 @@ import unittest
 
 import quantum.tests.unit.testlib_api as testlib
 
+from quantum import manager
 from quantum.db import api as db
 from quantum.common import utils
 from quantum.common.test_lib import test_config
@@ -130,6 +131,9 @@ class AbstractAPITest(unittest.TestCase):
         """Clear the test environment"""
         # Remove database contents
         db.clear_db()
+        # Load the plug-in again for the next test, so that it sets up
+        # the database tables it fills when it starts
+        manager.QuantumManager._instance = None
 
 
 class BaseAPIOperationsTest(AbstractAPITest):
@@ -950,6 +954,45 @@ class BaseAPIOperationsTest(AbstractAPITest):
         LOG.debug("_test_multitenancy - " \
                   "fmt:%s - END", fmt)
 
+    def _test_conditional_get(self, fmt):
+        LOG.debug("_test_conditional_get - fmt:%s - START", fmt)
+        network_id = self._create_network(fmt)
+        show_network_req = testlib.show_network_request(self.tenant_id,
+                                                        network_id,
+                                                        fmt)
+        show_network_res = show_network_req.get_response(self.api)
+        self.assertEqual(show_network_res.status_int, 200)
+        etag = show_network_res.headers.get('ETag')
+        if not hasattr(manager.QuantumManager.get_plugin(), 'get_revision'):
+            # Only plugins keeping revisions tag their responses
+            self.assertEqual(etag, None)
+            return
+        self.assertNotEqual(etag, None)
+        show_network_req.headers['If-None-Match'] = etag
+        show_network_res = show_network_req.get_response(self.api)
+        self.assertEqual(show_network_res.status_int, 304)
+        self.assertEqual(show_network_res.body, '')
+        # Neither the tag of another resource nor any tag proves that a
+        # resource exists
+        for if_none_match in (etag, '*'):
+            show_network_req = testlib.show_network_request(self.tenant_id,
+                                                            "A_BAD_ID",
+                                                            fmt)
+            show_network_req.headers['If-None-Match'] = if_none_match
+            show_network_res = show_network_req.get_response(self.api)
+            self.assertEqual(show_network_res.status_int,
+                             self._network_not_found_code)
+        show_network_req = testlib.show_network_request(self.tenant_id,
+                                                        network_id,
+                                                        fmt)
+        show_network_req.headers['If-None-Match'] = etag
+        # Any change to the tenant's networks changes the tag
+        self._create_port(network_id, "ACTIVE", fmt)
+        show_network_res = show_network_req.get_response(self.api)
+        self.assertEqual(show_network_res.status_int, 200)
+        self.assertNotEqual(show_network_res.headers['ETag'], etag)
+        LOG.debug("_test_conditional_get - fmt:%s - END", fmt)
+
     def test_list_networks_json(self):
         self._test_list_networks('json')
 
@@ -1219,3 +1262,9 @@ class BaseAPIOperationsTest(AbstractAPITest):
 
     def test_multitenancy_json(self):
         self._test_multitenancy('json')
+
+    def test_conditional_get_xml(self):
+        self._test_conditional_get('xml')
+
+    def test_conditional_get_json(self):
+        self._test_conditional_get('json')
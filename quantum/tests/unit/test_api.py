@@ -22,6 +22,8 @@ import unittest
 from lxml import etree
 from webob import exc, request
 
+from quantum import api as server
+from quantum import manager
 import quantum.api.attachments as atts
 import quantum.api.networks as nets
 import quantum.api.ports as ports
@@ -30,6 +32,8 @@ import quantum.tests.unit._test_api as test_api
 import quantum.tests.unit.testlib_api as testlib
 
 from quantum.common.test_lib import test_config
+from quantum.db import api as db
+from quantum.db import context as db_context
 
 
 LOG = logging.getLogger('quantum.tests.test_api')
@@ -119,6 +123,129 @@ class APITestV11(test_api.BaseAPIOperationsTest):
         self._port_in_use_code = exc.HTTPConflict.code
         self._already_attached_code = exc.HTTPConflict.code
 
+    def _test_create_network_bulk(self, fmt):
+        LOG.debug("_test_create_network_bulk - fmt:%s - START", fmt)
+        content_type = "application/%s" % fmt
+        body = {'networks': [{'name': 'net-a'}, {'name': 'net-b'}]}
+        network_req = testlib.new_network_request(self.tenant_id,
+                                                  format=fmt,
+                                                  custom_req_body=body)
+        network_res = network_req.get_response(self.api)
+        self.assertEqual(network_res.status_int,
+                         self._successful_create_code)
+        network_data = self._net_deserializers[content_type].\
+                            deserialize(network_res.body)['body']
+        self.assertEqual(len(network_data['networks']), 2)
+        list_req = testlib.network_list_detail_request(self.tenant_id, fmt)
+        list_res = list_req.get_response(self.api)
+        list_data = self._net_deserializers[content_type].\
+                         deserialize(list_res.body)['body']
+        self.assertEqual(sorted([net['name']
+                                 for net in list_data['networks']]),
+                         ['net-a', 'net-b'])
+        LOG.debug("_test_create_network_bulk - fmt:%s - END", fmt)
+
+    def _test_create_port_bulk(self, fmt):
+        LOG.debug("_test_create_port_bulk - fmt:%s - START", fmt)
+        content_type = "application/%s" % fmt
+        network_id = self._create_network(fmt)
+        body = {'ports': [{'state': 'ACTIVE'}, {'state': 'DOWN'},
+                          {'state': 'ACTIVE'}]}
+        port_req = testlib.new_port_request(self.tenant_id, network_id,
+                                            None, fmt, custom_req_body=body)
+        port_res = port_req.get_response(self.api)
+        self.assertEqual(port_res.status_int, self._successful_create_code)
+        port_data = self._port_deserializers[content_type].\
+                         deserialize(port_res.body)['body']
+        self.assertEqual(len(port_data['ports']), 3)
+        list_req = testlib.port_list_request(self.tenant_id, network_id,
+                                             fmt, query_string="state=DOWN")
+        list_res = list_req.get_response(self.api)
+        list_data = self._port_deserializers[content_type].\
+                         deserialize(list_res.body)['body']
+        self.assertEqual(len(list_data['ports']), 1)
+        LOG.debug("_test_create_port_bulk - fmt:%s - END", fmt)
+
+    def _test_create_port_bulk_badrequest(self, fmt):
+        network_id = self._create_network(fmt)
+        body = {'ports': [{'state': 'ACTIVE'}, {'state': 'BAD'}]}
+        self._create_port(network_id, None, fmt, custom_req_body=body,
+                          expected_res_status=exc.HTTPBadRequest.code)
+
+    def test_create_network_bulk_json(self):
+        self._test_create_network_bulk('json')
+
+    def test_create_network_bulk_xml(self):
+        self._test_create_network_bulk('xml')
+
+    def test_create_port_bulk_json(self):
+        self._test_create_port_bulk('json')
+
+    def test_create_port_bulk_xml(self):
+        self._test_create_port_bulk('xml')
+
+    def test_create_port_bulk_badrequest_json(self):
+        self._test_create_port_bulk_badrequest('json')
+
+    def _list_page(self, req, fmt, collection):
+        res = req.get_response(self.api)
+        self.assertEqual(res.status_int, 200)
+        data = self._net_deserializers["application/%s" % fmt].\
+                    deserialize(res.body)['body']
+        has_next = '%s_links' % collection in data
+        return [item['id'] for item in data[collection]], has_next
+
+    def _test_list_networks_paginated(self, fmt):
+        LOG.debug("_test_list_networks_paginated - fmt:%s - START", fmt)
+        net_ids = sorted([self._create_network(fmt) for i in range(3)])
+        req = testlib.network_list_request(self.tenant_id, fmt,
+                                           query_string="limit=2")
+        page, has_next = self._list_page(req, fmt, 'networks')
+        self.assertEqual(page, net_ids[:2])
+        self.assertTrue(has_next)
+        req = testlib.network_list_request(
+            self.tenant_id, fmt, query_string="limit=2&marker=%s" % page[-1])
+        page, has_next = self._list_page(req, fmt, 'networks')
+        self.assertEqual(page, net_ids[2:])
+        self.assertFalse(has_next)
+        LOG.debug("_test_list_networks_paginated - fmt:%s - END", fmt)
+
+    def _test_list_ports_paginated(self, fmt):
+        LOG.debug("_test_list_ports_paginated - fmt:%s - START", fmt)
+        network_id = self._create_network(fmt)
+        port_ids = sorted([self._create_port(network_id, "ACTIVE", fmt)
+                           for i in range(3)])
+        req = testlib.port_list_request(self.tenant_id, network_id, fmt,
+                                        query_string="limit=1&marker=%s"
+                                                     % port_ids[0])
+        page, has_next = self._list_page(req, fmt, 'ports')
+        self.assertEqual(page, port_ids[1:2])
+        self.assertTrue(has_next)
+        req = testlib.port_list_request(self.tenant_id, network_id, fmt,
+                                        query_string="limit=5")
+        page, has_next = self._list_page(req, fmt, 'ports')
+        self.assertEqual(page, port_ids)
+        self.assertFalse(has_next)
+        LOG.debug("_test_list_ports_paginated - fmt:%s - END", fmt)
+
+    def test_list_networks_paginated_json(self):
+        self._test_list_networks_paginated('json')
+
+    def test_list_networks_paginated_xml(self):
+        self._test_list_networks_paginated('xml')
+
+    def test_list_ports_paginated_json(self):
+        self._test_list_ports_paginated('json')
+
+    def test_list_ports_paginated_xml(self):
+        self._test_list_ports_paginated('xml')
+
+    def test_list_networks_bad_limit(self):
+        req = testlib.network_list_request(self.tenant_id, 'json',
+                                           query_string="limit=none")
+        res = req.get_response(self.api)
+        self.assertEqual(res.status_int, exc.HTTPBadRequest.code)
+
 
 class APIFiltersTest(test_api.AbstractAPITest):
     """ Test case for API filters.
@@ -289,6 +416,20 @@ class APIFiltersTest(test_api.AbstractAPITest):
         self.assertEqual(network_data['networks'][0]['id'], self.net1_id)
         LOG.debug("test_network_multiple_filters - END")
 
+    def test_network_unknown_filter(self):
+        LOG.debug("test_network_unknown_filter - START")
+        flt = "name=test-1&foo=bar"
+        network_data = self._do_filtered_network_list_request(flt)
+        # Check network count: should return 1
+        self.assertEqual(len(network_data['networks']), 1)
+        self.assertEqual(network_data['networks'][0]['id'], self.net1_id)
+
+        flt = "foo=bar"
+        network_data = self._do_filtered_network_list_request(flt)
+        # Check network count: should return 2
+        self.assertEqual(len(network_data['networks']), 2)
+        LOG.debug("test_network_unknown_filter - END")
+
     def test_port_state_filter(self):
         LOG.debug("test_port_state_filter - START")
         # First filter for 'ACTIVE' ports in 1st network
@@ -364,6 +505,64 @@ class APIFiltersTest(test_api.AbstractAPITest):
         self.assertEqual(len(port_data['ports']), 2)
         LOG.debug("test_port_multiple_filters - END")
 
+    def test_port_unknown_filter(self):
+        LOG.debug("test_port_unknown_filter - START")
+        flt = "state=DOWN&foo=bar"
+        port_data = self._do_filtered_port_list_request(flt, self.net1_id)
+        # Check port count: should return 1
+        self.assertEqual(len(port_data['ports']), 1)
+        self.assertEqual(port_data['ports'][0]['id'], self.port12_id)
+
+        flt = "foo=bar"
+        port_data = self._do_filtered_port_list_request(flt, self.net1_id)
+        # Check port count: should return 2
+        self.assertEqual(len(port_data['ports']), 2)
+        LOG.debug("test_port_unknown_filter - END")
+
+
+class APIRequestContextTest(unittest.TestCase):
+
+    def setUp(self):
+        manager.QuantumManager._instance = None
+        self.api = server.APIRouterV11(
+            {'plugin_provider': test_config['plugin_name']})
+        self.plugin = manager.QuantumManager.get_plugin()
+        self.contexts = []
+        self.plugin.iter_all_networks = self._iter_all_networks
+
+    def tearDown(self):
+        db_context._INSTRUMENTATION = False
+        db.clear_db()
+        manager.QuantumManager._instance = None
+
+    def _iter_all_networks(self, tenant_id, **kwargs):
+        # Reads one network at a time, as a plug-in fetching its rows
+        # in batches does
+        for net_id in ('net1', 'net2'):
+            context = db_context.get_current()
+            self.contexts.append(context)
+            db_context.record_statement(0.5)
+            yield {'net-id': net_id}
+
+    def test_streamed_list(self):
+        db_context.enable_instrumentation()
+        stats = db_context.get_action_statistics().get(
+            'networks.index', {'requests': 0, 'queries': 0})
+        req = testlib.network_list_request('t1', 'json')
+        res = req.get_response(self.api)
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual([net['id'] for net in
+                          json.loads(res.body)['networks']],
+                         ['net1', 'net2'])
+        # Both networks were read in the context of the request
+        self.assertEqual(len(self.contexts), 2)
+        self.assertEqual(self.contexts[0], self.contexts[1])
+        self.assertEqual(self.contexts[0].action, 'networks.index')
+        self.assertEqual(db_context.get_current(), None)
+        new_stats = db_context.get_action_statistics()['networks.index']
+        self.assertEqual(new_stats['requests'], stats['requests'] + 1)
+        self.assertEqual(new_stats['queries'], stats['queries'] + 2)
+
 
 class APIRootTest(unittest.TestCase):
     def setUp(self):
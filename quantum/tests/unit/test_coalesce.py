@@ -0,0 +1,123 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import eventlet
+import webob
+import webob.dec
+
+from quantum.api import coalesce
+
+
+class CoalescingMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.fail = False
+        self.stream = False
+
+        @webob.dec.wsgify
+        def application(req):
+            self.calls.append((req.method, req.path_info))
+            # Let the other requests arrive meanwhile
+            eventlet.sleep(0.01)
+            if self.fail:
+                raise ValueError()
+            body = 'call %d' % len(self.calls)
+            if self.stream:
+                return webob.Response(app_iter=iter(body.split()))
+            return webob.Response(body=body)
+
+        self.app = coalesce.CoalescingMiddleware(application)
+
+    def _request(self, path, method='GET', **headers):
+        req = webob.Request.blank(path, headers=headers)
+        req.method = method
+        return req.get_response(self.app)
+
+    def _spawn(self, *requests):
+        pool = eventlet.GreenPool()
+        threads = []
+        for args, headers in requests:
+            threads.append(pool.spawn(self._request, *args, **headers))
+            # Start the requests in order
+            eventlet.sleep(0)
+        return threads
+
+    def _concurrently(self, *requests):
+        return [thread.wait() for thread in self._spawn(*requests)]
+
+    def test_identical_requests(self):
+        path = '/v1.1/tenants/t1/networks/n1/ports/p1/attachment'
+        responses = self._concurrently(*[((path,), {})] * 3)
+        self.assertEqual(self.calls, [('GET', path)])
+        self.assertEqual([res.body for res in responses], ['call 1'] * 3)
+        self.assertEqual(self.app.coalesced, 2)
+        self.assertEqual(self.app.in_flight, {})
+        # Requests arriving later are served again
+        self.assertEqual(self._request(path).body, 'call 2')
+
+    def test_different_requests(self):
+        path = '/v1.1/tenants/t1/networks'
+        self._concurrently(((path,), {}),
+                           ((path + '?name=a',), {}),
+                           ((path,), {'Accept': 'application/xml'}),
+                           ((path,), {'X-Auth-Token': 'other'}),
+                           (('/v1.1/tenants/t2/networks',), {}))
+        self.assertEqual(len(self.calls), 5)
+        self.assertEqual(self.app.coalesced, 0)
+
+    def test_write_in_between(self):
+        path = '/v1.1/tenants/t1/networks'
+        responses = self._concurrently(((path,), {}),
+                                       ((path, 'POST'), {}),
+                                       ((path,), {}))
+        # The last request must see what the POST did
+        self.assertEqual(len(self.calls), 3)
+        self.assertEqual(responses[2].body, 'call 3')
+
+    def test_streamed_response(self):
+        self.stream = True
+        path = '/v1.1/tenants/t1/networks'
+        responses = self._concurrently(((path,), {}), ((path,), {}))
+        # Neither buffered nor shared
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual([res.body for res in responses],
+                         ['call1', 'call2'])
+        self.assertEqual(self.app.coalesced, 0)
+        res = self.app({'REQUEST_METHOD': 'GET', 'PATH_INFO': path},
+                       lambda status, headers, exc_info=None: None)
+        self.assertFalse(isinstance(res, list))
+
+    def test_long_response(self):
+        self.app.max_body_size = 5
+        path = '/v1.1/tenants/t1/networks'
+        responses = self._concurrently(((path,), {}), ((path,), {}))
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual([res.body for res in responses],
+                         ['call 1', 'call 2'])
+
+    def test_failure(self):
+        self.fail = True
+        path = '/v1.1/tenants/t1/networks'
+        threads = self._spawn(((path,), {}), ((path,), {}))
+        for thread in threads:
+            self.assertRaises(ValueError, thread.wait)
+        # The waiting request was served on its own
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.app.in_flight, {})
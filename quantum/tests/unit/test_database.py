@@ -20,10 +20,14 @@ test_database.py is an independent test suite
 that tests the database api method calls
 """
 import logging
+import threading
 import unittest
 
+import sqlalchemy
 
+from quantum.common import exceptions as q_exc
 from quantum.db import api as db
+from quantum.db import context as db_context
 from quantum.tests.unit import database_stubs as db_stubs
 
 
@@ -116,3 +120,207 @@ class QuantumDBTest(unittest.TestCase):
         self.dbtest.unplug_interface(net1["id"], port1["id"])
         port = self.dbtest.get_port(net1["id"], port1["id"])
         self.assertTrue(port[0]["attachment"] is None)
+
+    def testh_port_get_for_tenant(self):
+        """test to get a port validating ownership in one query"""
+        net1 = self.dbtest.create_network(self.tenant_id, "plugin_test1")
+        port1 = self.dbtest.create_port(net1["id"])
+        port = db.port_get_for_tenant(self.tenant_id, net1["id"],
+                                      port1["id"])
+        self.assertEqual(port.uuid, port1["id"])
+        self.assertRaises(q_exc.NetworkNotFound, db.port_get_for_tenant,
+                          "t2", net1["id"], port1["id"])
+        self.assertRaises(q_exc.NetworkNotFound, db.port_get_for_tenant,
+                          self.tenant_id, "bad-net", port1["id"])
+        self.assertRaises(q_exc.PortNotFound, db.port_get_for_tenant,
+                          self.tenant_id, net1["id"], "bad-port")
+
+    def testi_create_bulk(self):
+        """test to create networks and ports in bulk"""
+        nets = db.network_create_bulk(self.tenant_id, ["net1", "net2"])
+        self.assertEqual([net.name for net in nets], ["net1", "net2"])
+        self.assertEqual(len(db.network_list(self.tenant_id)), 2)
+        ports = db.port_create_bulk(nets[0].uuid, ["ACTIVE", None])
+        self.assertEqual([port.state for port in ports], ["ACTIVE", "DOWN"])
+        self.assertEqual(len(db.port_list(nets[0].uuid)), 2)
+        self.assertRaises(q_exc.StateInvalid, db.port_create_bulk,
+                          nets[1].uuid, ["ACTIVE", "BAD"])
+        self.assertEqual(len(db.port_list(nets[1].uuid)), 0)
+
+    def testj_create_missing_indexes(self):
+        """test that model indexes are added to existing tables"""
+        for index in db.models.Port.__table__.indexes:
+            index.drop(db._ENGINE)
+        db.register_models()
+        inspector = db.reflection.Inspector.from_engine(db._ENGINE)
+        names = [index['name'] for index in inspector.get_indexes('ports')]
+        self.assertTrue('ix_ports_interface_id' in names)
+        self.assertTrue('ix_ports_network_id' in names)
+
+    def testk_tpool_aware(self):
+        """test that DB calls run in the native thread pool when enabled"""
+        call_threads = []
+        record = db.tpool_aware(
+            lambda: call_threads.append(threading.currentThread()))
+        record()
+        db._USE_TPOOL = True
+        try:
+            record()
+        finally:
+            db._USE_TPOOL = False
+        self.assertEqual(call_threads[0], threading.currentThread())
+        self.assertNotEqual(call_threads[1], threading.currentThread())
+
+    def testl_read_replica(self):
+        """test that GET requests read from a replica until they write"""
+        replica = sqlalchemy.create_engine('sqlite:///:memory:')
+        db.BASE.metadata.create_all(replica)
+        db._READ_ENGINES.append(replica)
+        try:
+            db.network_create(self.tenant_id, "net1")
+            with db_context.request_context(read_only=True):
+                self.assertEqual(len(db.network_list(self.tenant_id)), 0)
+                db.network_create(self.tenant_id, "net2")
+                self.assertEqual(len(db.network_list(self.tenant_id)), 2)
+            with db_context.request_context(read_only=False):
+                self.assertEqual(len(db.network_list(self.tenant_id)), 2)
+            self.assertEqual(len(db.network_list(self.tenant_id)), 2)
+        finally:
+            del db._READ_ENGINES[:]
+            del db._READ_MAKERS[:]
+
+    def testl_read_replica_revision(self):
+        """test that a replica lagging behind a revision is not used"""
+        replica = sqlalchemy.create_engine('sqlite:///:memory:')
+        db.BASE.metadata.create_all(replica)
+        db._READ_ENGINES.append(replica)
+        try:
+            db.network_create(self.tenant_id, "net1")
+            with db_context.request_context(read_only=True) as request:
+                self.assertEqual(db.tenant_revision_get(self.tenant_id), 1)
+                self.assertFalse(request.read_only)
+                self.assertEqual(len(db.network_list(self.tenant_id)), 1)
+            with db_context.request_context(read_only=True) as request:
+                self.assertEqual(db.tenant_revision_get("other"), None)
+                self.assertTrue(request.read_only)
+        finally:
+            del db._READ_ENGINES[:]
+            del db._READ_MAKERS[:]
+
+    def testm_list_paginated(self):
+        """test keyset pagination of network and port lists"""
+        nets = db.network_create_bulk(self.tenant_id, ["a", "b", "c"])
+        net_ids = sorted([net.uuid for net in nets])
+        page = db.network_list(self.tenant_id, limit=2)
+        self.assertEqual([net.uuid for net in page], net_ids[:2])
+        page = db.network_list(self.tenant_id, limit=2, marker=page[-1].uuid)
+        self.assertEqual([net.uuid for net in page], net_ids[2:])
+        ports = db.port_create_bulk(net_ids[0], ["ACTIVE"] * 3)
+        port_ids = sorted([port.uuid for port in ports])
+        page = db.port_list(net_ids[0], marker=port_ids[0])
+        self.assertEqual([port.uuid for port in page], port_ids[1:])
+
+    def testm_list_iter(self):
+        """test iterating over network and port lists"""
+        nets = db.network_create_bulk(self.tenant_id, ["a", "b", "c"])
+        net_ids = sorted([net.uuid for net in nets])
+        networks = db.network_iter(self.tenant_id)
+        self.assertEqual(sorted([net.uuid for net in networks]), net_ids)
+        ports = db.port_create_bulk(net_ids[0], ["ACTIVE"] * 3)
+        port_ids = sorted([port.uuid for port in ports])
+        ports = db.port_iter(net_ids[0], marker=port_ids[0])
+        self.assertEqual([port.uuid for port in ports], port_ids[1:])
+        self.assertRaises(q_exc.NetworkNotFound, db.port_iter, "nonexistent")
+
+    def testm_list_iter_batches(self):
+        """test iterating over lists fetched in several batches"""
+        nets = db.network_create_bulk(self.tenant_id, ["a", "b", "c", "d"])
+        net_ids = sorted([net.uuid for net in nets])
+        db.ITER_BATCH_SIZE = 2
+        try:
+            networks = db.network_iter(self.tenant_id)
+            self.assertEqual([net.uuid for net in networks], net_ids)
+            networks = db.network_iter(self.tenant_id, limit=3)
+            self.assertEqual([net.uuid for net in networks], net_ids[:3])
+            networks = db.network_iter(self.tenant_id, marker=net_ids[0])
+            self.assertEqual([net.uuid for net in networks], net_ids[1:])
+        finally:
+            db.ITER_BATCH_SIZE = 100
+
+    def testn_list_filtered(self):
+        """test network and port list filters"""
+        net1, net2 = db.network_create_bulk(self.tenant_id, ["a", "b"])
+        port1, port2 = db.port_create_bulk(net1.uuid, ["ACTIVE", "DOWN"],
+                                           op_status="UP")
+        db.port_set_attachment(port1.uuid, net1.uuid, "vif1")
+        nets = db.network_list(self.tenant_id,
+                               filters={'attachment': 'vif1'})
+        self.assertEqual([net.uuid for net in nets], [net1.uuid])
+        nets = db.network_list(self.tenant_id,
+                               filters={'has-attachment': 'false'})
+        self.assertEqual([net.uuid for net in nets], [net2.uuid])
+        nets = db.network_list(self.tenant_id,
+                               filters={'name': 'a', 'port-state': 'DOWN'})
+        self.assertEqual([net.uuid for net in nets], [net1.uuid])
+        # ports which are not ACTIVE are reported DOWN
+        ports = db.port_list(net1.uuid, filters={'op-status': 'DOWN'})
+        self.assertEqual([port.uuid for port in ports], [port2.uuid])
+        ports = db.port_list(net1.uuid, filters={'has-attachment': 'True'})
+        self.assertEqual([port.uuid for port in ports], [port1.uuid])
+
+    def testo_network_get_with_ports(self):
+        """test loading a network along with its ports"""
+        net = db.network_create(self.tenant_id, "net1")
+        db.port_create_bulk(net.uuid, ["ACTIVE", "DOWN"])
+        net = db.network_get_with_ports(self.tenant_id, net.uuid)
+        self.assertEqual(len(net.ports), 2)
+        self.assertRaises(q_exc.NetworkNotFound, db.network_get_with_ports,
+                          "t2", net.uuid)
+
+    def testp_instrumentation(self):
+        """test per request statement counting and the slow query log"""
+        engine = sqlalchemy.create_engine('sqlite:///:memory:')
+        db._instrument_engine(engine)
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        db.LOG.addHandler(handler)
+        db._SLOW_QUERY_TIME = 0.000001
+        try:
+            with db_context.request_context() as context:
+                context.action = "networks.index"
+                engine.execute("select 1")
+                engine.execute("select 2")
+            self.assertEqual(context.queries, 2)
+            self.assertTrue(context.db_time > 0)
+            db_context.record_request(context)
+            stats = db_context.get_action_statistics()["networks.index"]
+            self.assertTrue(stats['requests'] >= 1)
+            self.assertTrue(stats['queries'] >= 2)
+            self.assertTrue("networks.index: select 1" in messages[0])
+        finally:
+            db._SLOW_QUERY_TIME = 0.0
+            db.LOG.removeHandler(handler)
+
+    def testq_tenant_revision(self):
+        """test that changes to a tenant's resources bump its revision"""
+        self.assertEqual(db.tenant_revision_get(self.tenant_id), None)
+        net = db.network_create(self.tenant_id, "net1")
+        revisions = [db.tenant_revision_get(self.tenant_id)]
+        db.network_update(net.uuid, self.tenant_id, name="net2")
+        revisions.append(db.tenant_revision_get(self.tenant_id))
+        port = db.port_create(net.uuid)
+        revisions.append(db.tenant_revision_get(self.tenant_id))
+        db.port_set_attachment(port.uuid, net.uuid, "vif1")
+        revisions.append(db.tenant_revision_get(self.tenant_id))
+        db.port_unset_attachment(port.uuid, net.uuid)
+        db.port_update(port.uuid, net.uuid, state="ACTIVE")
+        db.port_destroy(port.uuid, net.uuid)
+        db.network_destroy(net.uuid)
+        revisions.append(db.tenant_revision_get(self.tenant_id))
+        self.assertEqual(revisions, [1, 2, 3, 4, 8])
+        # Failed changes leave it alone
+        self.assertRaises(q_exc.NetworkNotFound, db.network_destroy,
+                          net.uuid)
+        self.assertEqual(db.tenant_revision_get(self.tenant_id), 8)
+        self.assertEqual(db.tenant_revision_get("t2"), None)
@@ -0,0 +1,35 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from quantum import jsonutils
+
+
+class JSONUtilsTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = {'network': {'id': 'n1', 'name': u'\u00e9', 'ports': [1, 2]}}
+        self.assertEqual(jsonutils.loads(jsonutils.dumps(data)), data)
+
+    def test_load_backend(self):
+        name, dumps, loads = jsonutils.load_backend(['json'])
+        self.assertEqual(name, 'json')
+        self.assertEqual(loads(dumps([1, 'a'])), [1, 'a'])
+
+    def test_load_backend_unavailable(self):
+        self.assertRaises(ImportError, jsonutils.load_backend, [])
@@ -0,0 +1,126 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+from quantum import plugin_cache
+
+
+class StubPlugin(object):
+    """Keeps networks in a dict and counts the reads made"""
+
+    supports_caching = True
+
+    def __init__(self):
+        self.networks = {}
+        self.reads = 0
+
+    def get_all_networks(self, tenant_id, **kwargs):
+        self.reads += 1
+        filter_opts = kwargs.get('filter_opts', {})
+        # Like the db based plug-ins, implement the name filter
+        name = filter_opts.pop('name', None)
+        return [{'net-id': net_id}
+                for net_id, net_name in sorted(self.networks.items())
+                if name in (None, net_name)]
+
+    def get_network_details(self, tenant_id, net_id):
+        self.reads += 1
+        return {'net-id': net_id, 'net-name': self.networks[net_id]}
+
+    def create_network(self, tenant_id, net_name, **kwargs):
+        net_id = 'net%d' % len(self.networks)
+        self.networks[net_id] = net_name
+        return {'net-id': net_id}
+
+
+class CachingPluginTest(unittest.TestCase):
+
+    def setUp(self):
+        self.plugin = StubPlugin()
+        self.cache = plugin_cache.CachingPlugin(self.plugin, cache_size=2)
+
+    def test_read_through(self):
+        self.cache.create_network('t1', 'net')
+        self.assertEqual(self.cache.get_all_networks('t1'),
+                         [{'net-id': 'net0'}])
+        result = self.cache.get_all_networks('t1')
+        self.assertEqual(result, [{'net-id': 'net0'}])
+        # Other tenants and arguments have their own entries
+        self.cache.get_all_networks('t2')
+        self.cache.get_network_details('t1', 'net0')
+        self.assertEqual(self.plugin.reads, 3)
+        self.assertEqual(self.cache.cache_statistics(),
+                         {'hits': 1, 'misses': 3, 'entries': 3})
+        # Callers may modify what they are given
+        result.append('junk')
+        self.assertEqual(self.cache.get_all_networks('t1'),
+                         [{'net-id': 'net0'}])
+
+    def test_invalidation(self):
+        self.cache.get_all_networks('t1')
+        self.cache.get_all_networks('t2')
+        self.cache.create_network('t1', 'net')
+        self.assertEqual(self.cache.get_all_networks('t1'),
+                         [{'net-id': 'net0'}])
+        self.cache.get_all_networks('t2')
+        self.assertEqual(self.plugin.reads, 3)
+        # Keyword arguments name the tenant too
+        self.cache.create_network(tenant_id='t1', net_name='net')
+        self.assertEqual(len(self.cache.get_all_networks('t1')), 2)
+        self.assertEqual(self.plugin.reads, 4)
+
+    def test_expiry_and_eviction(self):
+        self.plugin.networks = {'net0': 'a', 'net1': 'b'}
+        self.cache.get_all_networks('t1')
+        self.cache.get_network_details('t1', 'net0')
+        self.cache.get_all_networks('t1')
+        # The least recently used entry makes room for the new one
+        self.cache.get_network_details('t1', 'net1')
+        self.cache.get_all_networks('t1')
+        self.assertEqual(self.plugin.reads, 3)
+        self.cache.get_network_details('t1', 'net0')
+        self.assertEqual(self.plugin.reads, 4)
+
+        cache = plugin_cache.CachingPlugin(self.plugin, cache_ttl=0)
+        cache.get_all_networks('t1')
+        cache.get_all_networks('t1')
+        self.assertEqual(self.plugin.reads, 6)
+
+    def test_tenant_eviction(self):
+        cache = plugin_cache.CachingPlugin(self.plugin, cache_tenants=1)
+        cache.get_all_networks('t1')
+        cache.get_all_networks('t2')
+        cache.get_all_networks('t1')
+        self.assertEqual(self.plugin.reads, 3)
+        self.assertEqual(cache.cache_statistics()['entries'], 1)
+
+    def test_filter_options(self):
+        self.plugin.networks = {'net0': 'a', 'net1': 'b'}
+        for i in range(2):
+            filter_opts = {'name': 'b', 'op-status': 'UP'}
+            self.assertEqual(self.cache.get_all_networks(
+                    't1', filter_opts=filter_opts), [{'net-id': 'net1'}])
+            # The API still has to implement what the plug-in did not
+            self.assertEqual(filter_opts, {'op-status': 'UP'})
+        self.assertEqual(self.plugin.reads, 1)
+
+    def test_transparency(self):
+        self.assertTrue(isinstance(self.cache, StubPlugin))
+        self.assertTrue(self.cache.supports_caching)
+        self.assertFalse(hasattr(self.cache, 'get_all_ports'))
+        self.assertFalse(hasattr(self.cache, 'get_revision'))
@@ -0,0 +1,127 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import json
+import unittest
+
+import eventlet
+
+from quantum import api as server
+from quantum import manager
+from quantum import provisioning
+from quantum.db import api as db
+from quantum.tests.unit import testlib_api
+
+
+class ProvisionerTest(unittest.TestCase):
+
+    def _fail(self):
+        raise ValueError("device unreachable")
+
+    def test_jobs(self):
+        provisioner = provisioning.Provisioner(workers=1)
+        done = []
+        job = provisioner.submit('t1', 'network', 'n1',
+                                 lambda: done.append(1))
+        failed = provisioner.submit('t1', 'port', 'p1', self._fail)
+        self.assertEqual(job.state, provisioning.QUEUED)
+        provisioner.wait('n1')
+        self.assertEqual(done, [1])
+        self.assertEqual(job.to_dict(), {'id': 'n1', 'resource': 'network',
+                                         'state': provisioning.DONE})
+        failed.wait()
+        self.assertEqual(failed.to_dict(),
+                         {'id': 'p1', 'resource': 'port',
+                          'state': provisioning.FAILED,
+                          'error': 'device unreachable'})
+        self.assertEqual(provisioner.get_jobs('t1'), [job, failed])
+        # Jobs are only shown to their tenant
+        self.assertEqual(provisioner.get_job('t2', 'n1'), None)
+        self.assertEqual(provisioner.get_jobs('t2'), [])
+
+    def test_max_jobs(self):
+        provisioner = provisioning.Provisioner(workers=1, max_jobs=2)
+        for i in range(3):
+            provisioner.submit('t1', 'network', 'n%d' % i, lambda: None)
+        # The oldest finished jobs make room for the new ones
+        self.assertEqual(len(provisioner.jobs), 3)
+        provisioner.wait('n2')
+        provisioner.submit('t1', 'network', 'n3', lambda: None)
+        self.assertEqual(provisioner.jobs.keys(), ['n2', 'n3'])
+
+
+class AsyncProvisioningAPITest(unittest.TestCase):
+
+    # The configured plug-in may not provision asynchronously
+    plugin_provider = 'quantum.plugins.sample.SamplePlugin.FakePlugin'
+
+    def setUp(self):
+        manager.QuantumManager._instance = None
+        options = {'plugin_provider': self.plugin_provider,
+                   'provisioning_workers': '2'}
+        self.api = server.APIRouterV11(options)
+        self.tenant_id = 'test_tenant'
+
+    def tearDown(self):
+        db.clear_db()
+        manager.QuantumManager._instance = None
+
+    def _get(self, path):
+        req = testlib_api.create_request("/tenants/%s/%s.json" %
+                                         (self.tenant_id, path),
+                                         None, 'application/json')
+        res = req.get_response(self.api)
+        return res.status_int, res.status_int == 200 and json.loads(res.body)
+
+    def test_create_network_and_port(self):
+        req = testlib_api.new_network_request(self.tenant_id, 'net1', 'json')
+        res = req.get_response(self.api)
+        self.assertEqual(res.status_int, 202)
+        network = json.loads(res.body)['network']
+        self.assertEqual(network['op-status'], 'PROVISIONING')
+        net_id = network['id']
+        self.assertEqual(self._get('jobs/%s' % net_id),
+                         (200, {'job': {'id': net_id,
+                                        'resource': 'network',
+                                        'state': 'QUEUED'}}))
+
+        # Let the workers run
+        eventlet.sleep(0)
+        status, body = self._get('networks/%s' % net_id)
+        self.assertEqual(body['network']['op-status'], 'UP')
+        status, body = self._get('jobs/%s' % net_id)
+        self.assertEqual(body['job']['state'], 'DONE')
+
+        req = testlib_api.new_port_request(self.tenant_id, net_id,
+                                           'ACTIVE', 'json')
+        res = req.get_response(self.api)
+        self.assertEqual(res.status_int, 202)
+        port = json.loads(res.body)['port']
+        self.assertEqual(port['state'], 'ACTIVE')
+        self.assertEqual(port['op-status'], 'PROVISIONING')
+        status, body = self._get('jobs')
+        self.assertEqual([job['id'] for job in body['jobs']],
+                         [net_id, port['id']])
+        # Deleting waits for the port to be provisioned
+        req = testlib_api.port_delete_request(self.tenant_id, net_id,
+                                              port['id'], 'json')
+        self.assertEqual(req.get_response(self.api).status_int, 204)
+        self.assertEqual(self._get('jobs/%s' % port['id'])[1]['job']['state'],
+                         'DONE')
+
+    def test_job_not_found(self):
+        self.assertEqual(self._get('jobs/bogus'), (404, False))
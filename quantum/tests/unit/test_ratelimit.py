@@ -0,0 +1,87 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import webob
+import webob.dec
+
+from quantum.api import ratelimit
+
+
+@webob.dec.wsgify
+def _application(req):
+    return webob.Response(body='ok')
+
+
+class RateLimitMiddlewareTest(unittest.TestCase):
+
+    def _request(self, app, path, method='GET'):
+        req = webob.Request.blank(path)
+        req.method = method
+        res = req.get_response(app)
+        # The request is in flight until the body has been sent
+        res.body
+        return res
+
+    def test_tenant_buckets(self):
+        # Rates low enough for the buckets not to refill during the test
+        app = ratelimit.RateLimitMiddleware(_application,
+                                            read_rate='0.001',
+                                            read_burst='2',
+                                            write_rate='0.001',
+                                            write_burst='1')
+        for i in range(2):
+            res = self._request(app, '/v1.1/tenants/t1/networks')
+            self.assertEqual(res.status_int, 200)
+        res = self._request(app, '/v1.1/tenants/t1/networks/detail.json')
+        self.assertEqual(res.status_int, 413)
+        self.assertTrue(int(res.headers['Retry-After']) > 0)
+
+        # Writes and other tenants have their own budgets
+        res = self._request(app, '/v1.1/tenants/t1/networks', 'POST')
+        self.assertEqual(res.status_int, 200)
+        res = self._request(app, '/v1.1/tenants/t1/networks', 'POST')
+        self.assertEqual(res.status_int, 413)
+        res = self._request(app, '/v1.1/tenants/t2/networks')
+        self.assertEqual(res.status_int, 200)
+        # Requests for no tenant are not limited
+        res = self._request(app, '/')
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual(app.in_flight, 0)
+
+    def test_concurrency_cap(self):
+        app = ratelimit.RateLimitMiddleware(_application,
+                                            max_concurrent_requests='1')
+        req = webob.Request.blank('/v1.1/tenants/t1/networks')
+        first = req.get_response(app)
+        # The body of the first response has not been sent yet
+        res = self._request(app, '/v1.1/tenants/t1/networks')
+        self.assertEqual(res.status_int, 503)
+        self.assertEqual(res.headers['Retry-After'], '1')
+        first.app_iter.close()
+        res = self._request(app, '/v1.1/tenants/t1/networks')
+        self.assertEqual(res.status_int, 200)
+
+    def test_token_bucket(self):
+        bucket = ratelimit.TokenBucket(2.0, 2, 0.0)
+        self.assertEqual(bucket.consume(0.0), 0)
+        self.assertEqual(bucket.consume(0.0), 0)
+        self.assertEqual(bucket.consume(0.0), 0.5)
+        self.assertEqual(bucket.consume(0.5), 0)
+        self.assertFalse(bucket.is_full(0.5))
+        self.assertTrue(bucket.is_full(10.0))
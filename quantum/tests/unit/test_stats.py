@@ -0,0 +1,91 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+
+import webob
+
+from quantum import api as server
+from quantum.api import stats
+from quantum.common.test_lib import test_config
+from quantum.db import api as db
+from quantum.tests.unit import testlib_api
+
+
+class StatsMiddlewareTest(unittest.TestCase):
+
+    def setUp(self):
+        options = {'plugin_provider': test_config['plugin_name']}
+        self.app = stats.StatsMiddleware(server.APIRouterV11(options))
+
+    def tearDown(self):
+        db.clear_db()
+
+    def _get_response(self, req):
+        res = req.get_response(self.app)
+        # Statistics are recorded once the server has sent the body
+        res.body
+        return res
+
+    def _get_stats(self, remote_addr='127.0.0.1'):
+        req = webob.Request.blank('/stats')
+        req.environ['REMOTE_ADDR'] = remote_addr
+        return req.get_response(self.app)
+
+    def test_records_actions(self):
+        req = testlib_api.network_list_request('t1', 'json')
+        self.assertEqual(self._get_response(req).status_int, 200)
+        req = testlib_api.show_network_request('t1', 'bogus', 'xml')
+        self.assertEqual(self._get_response(req).status_int, 404)
+
+        self.assertEqual(self.app.in_flight, {'GET': 0})
+        histograms = self.app.histograms
+        self.assertEqual(sorted(histograms),
+                         [('networks', 'index', '200', 'application/json'),
+                          ('networks', 'show', '404', 'application/xml')])
+        for histogram in histograms.values():
+            self.assertEqual(sum(histogram.counts), 1)
+
+        res = self._get_stats()
+        self.assertEqual(res.status_int, 200)
+        self.assertEqual(res.content_type, 'text/plain')
+        lines = res.body.splitlines()
+        labels = ('action="index",content_type="application/json",'
+                  'controller="networks",status="200"')
+        self.assertTrue('quantum_api_request_duration_seconds_bucket'
+                        '{%s,le="+Inf"} 1' % labels in lines)
+        self.assertTrue('quantum_api_request_duration_seconds_count'
+                        '{%s} 1' % labels in lines)
+        self.assertTrue('quantum_api_requests_in_flight{method="GET"} 0'
+                        in lines)
+
+    def test_unrouted_request(self):
+        req = webob.Request.blank('/nowhere')
+        self.assertEqual(self._get_response(req).status_int, 404)
+        self.assertEqual([key[:3] for key in self.app.histograms],
+                         [('none', 'none', '404')])
+
+    def test_remote_host_refused(self):
+        self.assertEqual(self._get_stats('10.0.0.1').status_int, 403)
+
+    def test_histogram_buckets(self):
+        histogram = stats.Histogram()
+        for value in (0.001, 0.005, 0.2, 60):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts[0], 2)
+        self.assertEqual(histogram.counts[stats.BUCKETS.index(0.25)], 1)
+        self.assertEqual(histogram.counts[-1], 1)
@@ -0,0 +1,250 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import signal
+import time
+import unittest
+
+import eventlet
+import mox
+
+from quantum import jsonutils
+from quantum import wsgi
+
+
+METADATA = {
+    "attributes": {"network": ["id", "name"],
+                   "port": ["id", "state"],
+                   "attachment": ["id"]},
+    "plurals": {"networks": "network",
+                "ports": "port"},
+    "list_collections": {"tags": {"item_name": "tag", "item_key": "value"}},
+    "dict_collections": {"meta": {"item_name": "item", "item_key": "key"}}}
+
+
+class XMLDictSerializerTest(unittest.TestCase):
+
+    def _assert_same_xml(self, data, metadata=METADATA, xmlns=None):
+        expected = wsgi.MinidomXMLDictSerializer(metadata, xmlns)
+        serializer = wsgi.XMLDictSerializer(metadata, xmlns)
+        self.assertEqual(serializer.serialize(data),
+                         expected.serialize(data))
+
+    def test_serialize_collection(self):
+        ports = [{'id': 'p1', 'state': 'ACTIVE',
+                  'attachment': {'id': 'vif1'}},
+                 {'id': 'p2', 'state': 'DOWN', 'attachment': {}}]
+        data = {'networks': [{'id': 'n1', 'name': 'a&"<b>'},
+                             {'id': 'n2', 'name': '', 'ports': ports}]}
+        self._assert_same_xml(data, xmlns="http://example.org/ns")
+        self._assert_same_xml({'networks': []})
+
+    def test_serialize_links(self):
+        data = {'ports': [{'id': 'p1'}],
+                'ports_links': [{'rel': 'next', 'href': '/p?a=1&marker=p1'}]}
+        self._assert_same_xml(data, xmlns="http://example.org/ns")
+
+    def test_serialize_collections_metadata(self):
+        data = {'network': {'id': 'n1', 'tags': ['a', 2],
+                            'meta': {'k1': 'v1', 'k2': ''},
+                            'op-status': 'UP', 'items': [1, 'x']}}
+        self._assert_same_xml(data)
+        self._assert_same_xml(data, metadata={'xmlns': 'http://inner'})
+
+
+class JSONDictSerializerTest(unittest.TestCase):
+
+    def test_serialize_iter(self):
+        serializer = wsgi.JSONDictSerializer()
+        serializer.items_per_chunk = 2
+        networks = [{'id': 'n%d' % i} for i in range(5)]
+        data = {'networks': iter(networks), 'networks_links': []}
+        chunks = list(serializer.serialize_iter(data))
+        self.assertTrue(len(chunks) > 3)
+        self.assertEqual(jsonutils.loads(''.join(chunks)),
+                         {'networks': networks, 'networks_links': []})
+
+    def test_serialize_iter_empty(self):
+        serializer = wsgi.JSONDictSerializer()
+        chunks = serializer.serialize_iter({'ports': iter([])})
+        self.assertEqual(jsonutils.loads(''.join(chunks)), {'ports': []})
+
+
+class WorkerSocketTest(unittest.TestCase):
+
+    def test_stop_accepting(self):
+        sock = eventlet.listen(('127.0.0.1', 0))
+        try:
+            accepted = []
+
+            def _accept():
+                worker_socket = wsgi._WorkerSocket(sock)
+                while True:
+                    accepted.append(worker_socket.accept())
+
+            acceptor = eventlet.spawn(_accept)
+            eventlet.sleep(0)
+            acceptor.kill(wsgi._StopAccepting)
+            client = eventlet.connect(sock.getsockname())
+            eventlet.sleep(0.1)
+            # Neither accepted nor exited
+            self.assertEqual(accepted, [])
+            self.assertFalse(acceptor.dead)
+            acceptor.kill()
+            client.close()
+        finally:
+            sock.close()
+
+
+class FakeGreenThread(object):
+
+    def __init__(self):
+        self.killed_with = []
+
+    def wait(self):
+        # As when the worker receives SIGTERM
+        raise SystemExit(0)
+
+    def kill(self, exc):
+        self.killed_with.append(exc)
+
+
+class FakePool(object):
+
+    def __init__(self, running):
+        self._running = running
+
+    def running(self):
+        if len(self._running) > 1:
+            return self._running.pop(0)
+        return self._running[0]
+
+
+class ServerWorkersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mox = mox.Mox()
+        self.server = wsgi.Server('test')
+        self.server.running = True
+        for name in ('fork', 'wait', 'kill'):
+            self.mox.StubOutWithMock(wsgi.os, name)
+        self.mox.StubOutWithMock(wsgi.signal, 'signal')
+        self.mox.StubOutWithMock(wsgi.eventlet, 'spawn')
+
+    def tearDown(self):
+        self.mox.UnsetStubs()
+
+    def _expect_handlers(self):
+        wsgi.signal.signal(signal.SIGTERM, mox.IgnoreArg())
+        wsgi.signal.signal(signal.SIGINT, mox.IgnoreArg())
+
+    def _stop(self):
+        self.server.running = False
+
+    def test_start_workers(self):
+        self.mox.StubOutWithMock(wsgi.eventlet, 'listen')
+        wsgi.eventlet.listen(('0.0.0.0', 9696), backlog=128).AndReturn(None)
+        wsgi.os.fork().AndReturn(101)
+        wsgi.os.fork().AndReturn(102)
+        self.mox.ReplayAll()
+
+        self.server.start_workers(lambda: None, 2, 9696)
+        self.assertEqual(sorted(self.server.children.keys()), [101, 102])
+        self.mox.VerifyAll()
+
+    def test_restart_dead_worker(self):
+        self.server.children = {101: 0, 102: 0}
+        self._expect_handlers()
+        # Killed by a signal
+        wsgi.os.wait().AndReturn((101, signal.SIGKILL))
+        wsgi.os.fork().AndReturn(103)
+        wsgi.os.wait().WithSideEffects(self._stop).AndReturn((102, 0))
+        wsgi.os.wait().AndReturn((103, 0))
+        self.mox.ReplayAll()
+
+        self.server._wait_workers()
+        self.assertEqual(self.server.children, {})
+        self.mox.VerifyAll()
+
+    def test_start_failure_stops_workers(self):
+        self.server.children = {101: 0, 102: 0, 103: 0}
+        self._expect_handlers()
+        wsgi.os.wait().AndReturn((101, self.server.WORKER_START_FAILED << 8))
+        wsgi.os.kill(102, signal.SIGTERM).InAnyOrder()
+        wsgi.os.kill(103, signal.SIGTERM).InAnyOrder()
+        wsgi.os.wait().AndReturn((102, 0))
+        wsgi.os.wait().AndReturn((103, 0))
+        self.mox.ReplayAll()
+
+        self.server._wait_workers()
+        self.assertFalse(self.server.running)
+        self.assertEqual(self.server.children, {})
+        self.mox.VerifyAll()
+
+    def test_wait_interrupted(self):
+        self.server.children = {101: 0}
+        self._expect_handlers()
+        wsgi.os.wait().AndRaise(OSError(errno.EINTR, "Interrupted"))
+        wsgi.os.wait().WithSideEffects(self._stop).AndReturn((101, 0))
+        self.mox.ReplayAll()
+
+        self.server._wait_workers()
+        self.mox.VerifyAll()
+
+    def test_stop_workers(self):
+        self.server.children = {101: 0, 102: 0}
+        wsgi.os.kill(101, signal.SIGTERM).InAnyOrder().AndRaise(
+            OSError(errno.ESRCH, "No such process"))
+        wsgi.os.kill(102, signal.SIGTERM).InAnyOrder()
+        self.mox.ReplayAll()
+
+        self.server.stop_workers()
+        self.assertFalse(self.server.running)
+        self.mox.VerifyAll()
+
+    def test_stop_workers_error(self):
+        self.server.children = {101: 0}
+        wsgi.os.kill(101, signal.SIGTERM).AndRaise(
+            OSError(errno.EPERM, "Operation not permitted"))
+        self.mox.ReplayAll()
+
+        self.assertRaises(OSError, self.server.stop_workers)
+        self.mox.VerifyAll()
+
+    def _serve_until_stopped(self, running):
+        self.server._socket = None
+        self.server.pool = FakePool(running)
+        self.server.WORKER_STOP_TIMEOUT = 0.3
+        green_thread = FakeGreenThread()
+        wsgi.eventlet.spawn(self.server._run, None,
+                            mox.IsA(wsgi._WorkerSocket)).AndReturn(
+                                green_thread)
+        self.mox.ReplayAll()
+
+        started = time.time()
+        self.server._serve_until_stopped(None)
+        self.assertEqual(green_thread.killed_with, [wsgi._StopAccepting])
+        self.mox.VerifyAll()
+        return time.time() - started
+
+    def test_drain_requests(self):
+        # Returns once the requests being served are complete
+        self.assertTrue(self._serve_until_stopped([1, 1, 0]) < 0.3)
+
+    def test_drain_timeout(self):
+        self.assertTrue(self._serve_until_stopped([1]) >= 0.3)
@@ -19,8 +19,14 @@
 Utility methods for working with WSGI servers
 """
 
+import errno
 import logging
+import os
+import signal
 import sys
+import time
+import eventlet.event
+import eventlet.hubs
 import eventlet.wsgi
 eventlet.patcher.monkey_patch(all=False, socket=True)
 import routes.middleware
@@ -32,7 +38,7 @@ from xml.dom import minidom
 from xml.parsers import expat
 
 from quantum.common import exceptions as exception
-from quantum.common import utils
+from quantum import jsonutils
 
 LOG = logging.getLogger('quantum.common.wsgi')
 
@@ -57,22 +63,131 @@ def run_server(application, port):
 class Server(object):
     """Server class to manage multiple WSGI sockets and applications."""
 
+    # Exit status of a worker which could not build its application
+    WORKER_START_FAILED = 2
+    # Seconds a stopping worker waits for the requests it serves
+    WORKER_STOP_TIMEOUT = 30
+
     def __init__(self, name, threads=1000):
         self.pool = eventlet.GreenPool(threads)
         self.name = name
+        # worker pid -> time it was started, see start_workers
+        self.children = {}
+        self.running = False
 
     def start(self, application, port, host='0.0.0.0', backlog=128):
         """Run a WSGI server with the given application."""
         socket = eventlet.listen((host, port), backlog=backlog)
         self.pool.spawn_n(self._run, application, socket)
 
+    def start_workers(self, app_factory, workers, port, host='0.0.0.0',
+                      backlog=128):
+        """
+        Binds the socket, then forks workers processes serving requests
+        on it. Each worker builds its own application by calling
+        app_factory(), so that database connections and other resources
+        are not shared between processes; the worker exits with status
+        WORKER_START_FAILED if that fails.
+
+        wait() supervises the workers, restarting those which die.
+        """
+        self._socket = eventlet.listen((host, port), backlog=backlog)
+        self._app_factory = app_factory
+        self.running = True
+        for i in xrange(workers):
+            self._start_worker()
+
     def wait(self):
         """Wait until all servers have completed running."""
+        if self.children:
+            self._wait_workers()
+            return
         try:
             self.pool.waitall()
         except KeyboardInterrupt:
             pass
 
+    def stop_workers(self, *args):
+        """
+        Asks the workers to stop with SIGTERM. They exit once the
+        requests they serve are complete, or after WORKER_STOP_TIMEOUT
+        seconds.
+        """
+        self.running = False
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError, e:
+                if e.errno != errno.ESRCH:
+                    raise
+
+    def _start_worker(self):
+        pid = os.fork()
+        if pid:
+            LOG.info(_("Started %(name)s worker %(pid)d"),
+                     {'name': self.name, 'pid': pid})
+            self.children[pid] = time.time()
+            return
+
+        # Worker process
+        status = 0
+        try:
+            signal.signal(signal.SIGTERM, _raise_system_exit)
+            # The hub of the parent must not be shared
+            eventlet.hubs.use_hub()
+            try:
+                application = self._app_factory()
+            except Exception:
+                LOG.exception(_("Unable to start worker %d"), os.getpid())
+                application = None
+            if application is None:
+                status = self.WORKER_START_FAILED
+            else:
+                self._serve_until_stopped(application)
+        except Exception:
+            LOG.exception(_("Worker %d failed"), os.getpid())
+            status = 1
+        os._exit(status)
+
+    def _serve_until_stopped(self, application):
+        server = eventlet.spawn(self._run, application,
+                                _WorkerSocket(self._socket))
+        try:
+            server.wait()
+        except (KeyboardInterrupt, SystemExit):
+            LOG.info(_("Worker %d stopping"), os.getpid())
+            # Stop accepting connections, leaving them to the other
+            # workers, before waiting for the requests being served
+            server.kill(_StopAccepting)
+            deadline = time.time() + self.WORKER_STOP_TIMEOUT
+            while self.pool.running() and time.time() < deadline:
+                eventlet.sleep(0.1)
+
+    def _wait_workers(self):
+        signal.signal(signal.SIGTERM, self.stop_workers)
+        signal.signal(signal.SIGINT, self.stop_workers)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except OSError, e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            started = self.children.pop(pid, None)
+            if started is None or not self.running:
+                continue
+            if os.WIFEXITED(status) and \
+               os.WEXITSTATUS(status) == self.WORKER_START_FAILED:
+                LOG.error(_("Worker %d could not start, stopping"), pid)
+                self.stop_workers()
+                continue
+            LOG.error(_("Worker %(pid)d died with status %(status)d, "
+                        "restarting it"), {'pid': pid, 'status': status})
+            if time.time() - started < 1:
+                # do not fork in a tight loop if workers die at once
+                time.sleep(1)
+            self._start_worker()
+
     def _run(self, application, socket):
         """Start a WSGI server in a new green thread."""
         logger = logging.getLogger('eventlet.wsgi.server')
@@ -80,6 +195,37 @@ class Server(object):
                              log=WritableLogger(logger))
 
 
+def _raise_system_exit(signo, frame):
+    raise SystemExit(0)
+
+
+class _StopAccepting(Exception):
+    """Thrown into the green thread accepting the connections of a
+    stopping worker"""
+
+
+class _WorkerSocket(object):
+    """
+    Listening socket of a worker, whose accept() blocks for good once
+    _StopAccepting is thrown into it: this stops eventlet.wsgi.server
+    from accepting connections without making it exit, as it would
+    then shut down the connections of the requests still being served.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+
+    def accept(self):
+        try:
+            return self.sock.accept()
+        except _StopAccepting:
+            # Until the worker exits
+            eventlet.event.Event().wait()
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+
 class Middleware(object):
     """
     Base WSGI middleware wrapper. These classes require an application to be
@@ -88,6 +234,18 @@ class Middleware(object):
     behavior.
     """
 
+    @classmethod
+    def factory(cls, global_config, **local_config):
+        """Used for paste filter factories in paste.deploy config files.
+
+        Any local configuration (that is, values under the [filter:NAME]
+        section of the paste config) will be passed into the `__init__`
+        method as kwargs, after the wrapped application.
+        """
+        def _factory(app):
+            return cls(app, **local_config)
+        return _factory
+
     def __init__(self, application):
         self.application = application
 
@@ -115,6 +273,28 @@ class Middleware(object):
         return self.process_response(response)
 
 
+class ClosingIterator(object):
+    """
+    Wraps a WSGI response body, calling on_close once the server has sent
+    it (or given up sending it), for middleware accounting for requests
+    whose body is streamed.
+    """
+
+    def __init__(self, app_iter, on_close):
+        self.app_iter = app_iter
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            self.on_close()
+
+
 class Request(webob.Request):
 
     def best_match_content_type(self):
@@ -166,12 +346,27 @@ class ActionDispatcher(object):
         raise NotImplementedError()
 
 
+def _is_iterator(value):
+    """Collections a controller streams are returned as iterators"""
+    return hasattr(value, 'next')
+
+
 class DictSerializer(ActionDispatcher):
     """Default request body serialization"""
 
     def serialize(self, data, action='default'):
         return self.dispatch(data, action=action)
 
+    def serialize_iter(self, data, action='default'):
+        """
+        Serializes data, whose values may be iterators, in chunks.
+        Serializers which cannot stream read the iterators through and
+        return the whole body as a single chunk.
+        """
+        data = dict((key, list(value) if _is_iterator(value) else value)
+                    for key, value in data.items())
+        return [self.serialize(data, action)]
+
     def default(self, data):
         return ""
 
@@ -179,11 +374,64 @@ class DictSerializer(ActionDispatcher):
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization"""
 
+    # Number of collection items serialized into each streamed chunk
+    items_per_chunk = 100
+
     def default(self, data):
-        return utils.dumps(data)
+        return jsonutils.dumps(data)
+
+    def serialize_iter(self, data, action='default'):
+        if getattr(self, str(action), self.default) != self.default:
+            return super(JSONDictSerializer, self).serialize_iter(data,
+                                                                  action)
+        return self._iter_default(data)
+
+    def _iter_default(self, data):
+        """
+        Writes iterator values as JSON arrays, items_per_chunk items at a
+        time, so the whole collection is never held in memory.
+        """
+        separator = ''
+        yield '{'
+        for key, value in data.items():
+            if not _is_iterator(value):
+                yield '%s%s: %s' % (separator, jsonutils.dumps(key),
+                                    jsonutils.dumps(value))
+                separator = ', '
+        for key, value in data.items():
+            if not _is_iterator(value):
+                continue
+            chunk = ['%s%s: [' % (separator, jsonutils.dumps(key))]
+            separator = ', '
+            item_separator = ''
+            for item in value:
+                chunk.append(item_separator + jsonutils.dumps(item))
+                item_separator = ', '
+                if len(chunk) >= self.items_per_chunk:
+                    yield ''.join(chunk)
+                    chunk = []
+            chunk.append(']')
+            yield ''.join(chunk)
+        yield '}'
+
+
+ATOM_XMLNS = "http://www.w3.org/2005/Atom"
+
+
+def _escape_xml(data):
+    # Same escaping as xml.dom.minidom, for both text and attribute values
+    return data.replace("&", "&amp;").replace("<", "&lt;"). \
+                replace("\"", "&quot;").replace(">", "&gt;")
 
 
 class XMLDictSerializer(DictSerializer):
+    """
+    Serializes a dictionary into XML.
+
+    The markup is written out as the dictionary is walked instead of
+    building a DOM first, which keeps large collections cheap to render.
+    The output is the same as the one of MinidomXMLDictSerializer.
+    """
 
     def __init__(self, metadata=None, xmlns=None):
         """
@@ -196,11 +444,137 @@ class XMLDictSerializer(DictSerializer):
         self.xmlns = xmlns
 
     def default(self, data):
-        # We expect data to contain a single key which is the XML root.
-        root_key = data.keys()[0]
+        chunks = []
+        self.write_xml(chunks.append, data)
+        return u''.join(chunks).encode('UTF-8')
+
+    def write_xml(self, write, data):
+        """Writes the XML for data in chunks, by calling write(chunk)"""
+        # We expect data to contain a single key which is the XML root,
+        # possibly along with a '<root>_links' list of atom links.
+        root_key = [key for key in data if not key.endswith('_links')][0]
+        links = data.get('%s_links' % root_key)
+        root_attrs = {}
+        if self.xmlns is not None:
+            root_attrs['xmlns'] = self.xmlns
+        #NOTE (ameade): see MinidomXMLDictSerializer._add_xmlns
+        if links:
+            root_attrs['xmlns:atom'] = ATOM_XMLNS
+        self._write_node(write, self.metadata, root_key, data[root_key],
+                         root_attrs, links)
+
+    def _write_node(self, write, metadata, nodename, data, extra_attrs=None,
+                    links=None):
+        """Recursive method writing data members as XML nodes."""
+        attrs = {}
+        # Set the xml namespace if one is specified
+        xmlns = metadata.get('xmlns', None)
+        if xmlns:
+            attrs['xmlns'] = xmlns
+
+        children = []
+        text = None
+        #TODO(bcwaldon): accomplish this without a type-check
+        if isinstance(data, list):
+            collections = metadata.get('list_collections', {})
+            if nodename in collections:
+                item_metadata = collections[nodename]
+                item_key = item_metadata['item_key']
+                children = [(item_metadata['item_name'],
+                             {item_key: str(item)}, None)
+                            for item in data]
+                metadata = None
+            else:
+                singular = metadata.get('plurals', {}).get(nodename, None)
+                if singular is None:
+                    if nodename.endswith('s'):
+                        singular = nodename[:-1]
+                    else:
+                        singular = 'item'
+                children = [(singular, None, item) for item in data]
+        #TODO(bcwaldon): accomplish this without a type-check
+        elif isinstance(data, dict):
+            collections = metadata.get('dict_collections', {})
+            if nodename in collections:
+                item_metadata = collections[nodename]
+                item_key = item_metadata['item_key']
+                children = [(item_metadata['item_name'],
+                             {item_key: str(k)}, str(v))
+                            for k, v in data.items()]
+                metadata = None
+            else:
+                node_attrs = metadata.get('attributes', {}).get(nodename, {})
+                for k, v in data.items():
+                    if k in node_attrs:
+                        attrs[k] = str(v)
+                    else:
+                        children.append((k, None, v))
+        else:
+            # Type is atom
+            text = str(data)
+
+        if extra_attrs:
+            attrs.update(extra_attrs)
+        write(u"<%s" % nodename)
+        self._write_attrs(write, attrs)
+        if text is not None:
+            write(u">%s</%s>" % (_escape_xml(text), nodename))
+            return
+        if not (children or links):
+            write(u"/>")
+            return
+        write(u">")
+        for name, child_attrs, child in children:
+            if metadata is None:
+                # collection items are written as they are
+                write(u"<%s" % name)
+                self._write_attrs(write, child_attrs)
+                if child is None:
+                    write(u"/>")
+                else:
+                    write(u">%s</%s>" % (_escape_xml(child), name))
+            else:
+                self._write_node(write, metadata, name, child)
+        for link in links or []:
+            self._write_link(write, link)
+        write(u"</%s>" % nodename)
+
+    def _write_attrs(self, write, attrs):
+        for name in sorted(attrs):
+            write(u' %s="%s"' % (name, _escape_xml(attrs[name])))
+
+    def _write_link(self, write, link):
+        attrs = {'rel': link['rel'], 'href': link['href']}
+        if 'type' in link:
+            attrs['type'] = link['type']
+        write(u"<atom:link")
+        self._write_attrs(write, attrs)
+        write(u"/>")
+
+    def _to_xml(self, root):
+        """Convert the xml object to an xml string."""
+        # we use lxml here instead of xml.minidom for performance reasons
+        return etree.tostring(root, encoding='UTF-8', xml_declaration=True)
+
+
+class MinidomXMLDictSerializer(XMLDictSerializer):
+    """
+    Serializes a dictionary into XML by building a xml.dom.minidom
+    document. This is the reference implementation of XMLDictSerializer.
+    """
+
+    def default(self, data):
+        # We expect data to contain a single key which is the XML root,
+        # possibly along with a '<root>_links' list of atom links.
+        root_key = [key for key in data if not key.endswith('_links')][0]
         doc = minidom.Document()
         node = self._to_xml_node(doc, self.metadata, root_key, data[root_key])
 
+        links = data.get('%s_links' % root_key)
+        if links:
+            for link_node in self._create_link_nodes(doc, links):
+                node.appendChild(link_node)
+            return self.to_xml_string(node, has_atom=True)
         return self.to_xml_string(node)
 
     def to_xml_string(self, node, has_atom=False):
@@ -215,7 +589,7 @@ class XMLDictSerializer(DictSerializer):
         if self.xmlns is not None:
             node.setAttribute('xmlns', self.xmlns)
         if has_atom:
-            node.setAttribute('xmlns:atom', "http://www.w3.org/2005/Atom")
+            node.setAttribute('xmlns:atom', ATOM_XMLNS)
 
     def _to_xml_node(self, doc, metadata, nodename, data):
         """Recursive method to convert data members to XML nodes."""
@@ -282,11 +656,6 @@ class XMLDictSerializer(DictSerializer):
             link_nodes.append(link_node)
         return link_nodes
 
-    def _to_xml(self, root):
-        """Convert the xml object to an xml string."""
-        # we use lxml here instead of xml.minidom for performance reasons
-        return etree.tostring(root, encoding='UTF-8', xml_declaration=True)
-
 
 class ResponseHeaderSerializer(ActionDispatcher):
     """Default response headers serialization"""
@@ -330,7 +699,12 @@ class ResponseSerializer(object):
         response.headers['Content-Type'] = content_type
         if data is not None:
             serializer = self.get_body_serializer(content_type)
-            response.body = serializer.serialize(data, action)
+            if [value for value in data.values() if _is_iterator(value)]:
+                # The body is sent, chunked, as the collection is read
+                response.app_iter = serializer.serialize_iter(data, action)
+                response.content_length = None
+            else:
+                response.body = serializer.serialize(data, action)
 
     def get_body_serializer(self, content_type):
         try:
@@ -353,7 +727,7 @@ class JSONDeserializer(TextDeserializer):
 
     def _from_json(self, datastring):
         try:
-            return utils.loads(datastring)
+            return jsonutils.loads(datastring)
         except ValueError:
             msg = _("cannot understand JSON")
             raise exception.MalformedRequestBody(reason=msg)
@@ -376,7 +750,12 @@ class XMLDeserializer(TextDeserializer):
         plurals = set(self.metadata.get('plurals', {}))
         try:
             node = minidom.parseString(datastring).childNodes[0]
-            return {node.nodeName: self._from_xml_node(node, plurals)}
+            result = {node.nodeName: self._from_xml_node(node, plurals)}
+            links = [dict(link.attributes.items())
+                     for link in self.find_children_named(node, 'atom:link')]
+            if links:
+                result['%s_links' % node.nodeName] = links
+            return result
         except expat.ExpatError:
             msg = _("cannot understand XML")
             raise exception.MalformedRequestBody(reason=msg)
@@ -391,7 +770,8 @@ class XMLDeserializer(TextDeserializer):
         if len(node.childNodes) == 1 and node.childNodes[0].nodeType == 3:
             return node.childNodes[0].nodeValue
         elif node.nodeName in listnames:
-            return [self._from_xml_node(n, listnames) for n in node.childNodes]
+            return [self._from_xml_node(n, listnames) for n in node.childNodes
+                    if n.nodeName != 'atom:link']
         else:
             result = dict()
             for attr in node.attributes.keys():
@@ -744,6 +1124,21 @@ class Resource(Application):
             return Fault(webob.exc.HTTPBadRequest(explanation=msg),
                          self._xmlns)
 
+        # Controllers may tag the responses to GET requests, in which case
+        # a client which already has the current representation gets a
+        # 304 without the action being run. "If-None-Match: *" and weak
+        # tags do not match, as they would not prove that the resource
+        # exists.
+        etag = None
+        get_etag = getattr(self.controller, 'get_etag', None)
+        if get_etag is not None and request.method in ('GET', 'HEAD'):
+            etag = get_etag(request, accept, **args)
+            if (etag is not None and
+                etag in getattr(request.if_none_match, 'etags', ())):
+                response = webob.exc.HTTPNotModified()
+                response.etag = etag
+                return response
+
         try:
             action_result = self.dispatch(request, action, args)
         except webob.exc.HTTPException as ex:
@@ -759,6 +1154,9 @@ class Resource(Application):
         else:
             response = action_result
 
+        if etag is not None and response.status_int == 200:
+            response.etag = etag
+
         try:
             msg_dict = dict(url=request.url, status=response.status_int)
             msg = _("%(url)s returned with HTTP %(status)d") % msg_dict
@@ -949,7 +1347,7 @@ class Serializer(object):
             raise exception.InvalidContentType(content_type=content_type)
 
     def _from_json(self, datastring):
-        return utils.loads(datastring)
+        return jsonutils.loads(datastring)
 
     def _from_xml(self, datastring):
         xmldata = self.metadata.get('application/xml', {})
@@ -980,7 +1378,7 @@ class Serializer(object):
             return result
 
     def _to_json(self, data):
-        return utils.dumps(data)
+        return jsonutils.dumps(data)
 
     def _to_xml(self, data):
         metadata = self.metadata.get('application/xml', {})
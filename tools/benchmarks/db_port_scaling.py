@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measures network list, port list and attachment latency of quantum.db.api
+against a large ports table, with and without the secondary indexes
+declared in quantum.db.models.
+
+    python tools/benchmarks/db_port_scaling.py --ports 100000
+"""
+
+import gettext
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                   os.pardir, os.pardir, os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'quantum', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+gettext.install('quantum', unicode=1)
+
+from quantum.db import api as db
+from quantum.db import models
+
+
+def populate(tenants, nets_per_tenant, ports_per_net):
+    net_ids = []
+    for t in xrange(tenants):
+        tenant_id = "tenant-%d" % t
+        names = ["net-%d" % n for n in xrange(nets_per_tenant)]
+        for net in db.network_create_bulk(tenant_id, names):
+            net_ids.append((tenant_id, net.uuid))
+            db.port_create_bulk(net.uuid, ['ACTIVE'] * ports_per_net)
+    return net_ids
+
+
+def timed(func, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        func(i)
+    return (time.time() - start) / iterations * 1000.0
+
+
+def run_queries(net_ids, iterations):
+    tenant_id, net_id = net_ids[len(net_ids) / 2]
+    port_ids = [port.uuid for port in db.port_list(net_id)]
+
+    def attach(i):
+        port_id = port_ids[i % len(port_ids)]
+        db.port_set_attachment(port_id, net_id, "bench-vif-%d" % i)
+        db.port_unset_attachment(port_id, net_id)
+
+    return [("network_list", timed(lambda i: db.network_list(tenant_id),
+                                   iterations)),
+            ("port_list", timed(lambda i: db.port_list(net_id),
+                                iterations)),
+            ("attach+detach", timed(attach, iterations))]
+
+
+def drop_indexes():
+    for table in (models.Network.__table__, models.Port.__table__):
+        for index in table.indexes:
+            index.drop(db._ENGINE)
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--ports", type="int", default=100000,
+                      help="total number of ports to create")
+    parser.add_option("--ports-per-net", type="int", default=100)
+    parser.add_option("--nets-per-tenant", type="int", default=10)
+    parser.add_option("--iterations", type="int", default=200)
+    parser.add_option("--sql-connection", default=None,
+                      help="database to use (default: temporary sqlite)")
+    options, args = parser.parse_args()
+
+    path = None
+    connection = options.sql_connection
+    if not connection:
+        fd, path = tempfile.mkstemp(suffix='.sqlite')
+        os.close(fd)
+        connection = "sqlite:///%s" % path
+
+    db.configure_db({'sql_connection': connection})
+    try:
+        networks = max(options.ports / options.ports_per_net, 1)
+        tenants = max(networks / options.nets_per_tenant, 1)
+        start = time.time()
+        net_ids = populate(tenants, options.nets_per_tenant,
+                           options.ports_per_net)
+        print "Created %d ports on %d networks in %.1fs" % \
+              (len(net_ids) * options.ports_per_net, len(net_ids),
+               time.time() - start)
+
+        indexed = run_queries(net_ids, options.iterations)
+        drop_indexes()
+        unindexed = run_queries(net_ids, options.iterations)
+
+        print "%-16s %14s %14s" % ("operation", "indexed (ms)",
+                                   "no index (ms)")
+        for (name, with_idx), (_name, without_idx) in zip(indexed,
+                                                           unindexed):
+            print "%-16s %14.3f %14.3f" % (name, with_idx, without_idx)
+    finally:
+        db.unregister_models()
+        if path:
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
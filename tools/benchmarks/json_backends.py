@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compares the JSON backends quantum.jsonutils can use on API, NVP and
+fault payloads.
+
+    python tools/benchmarks/json_backends.py --ports 1000
+"""
+
+import gettext
+import optparse
+import os
+import sys
+import time
+import uuid
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                   os.pardir, os.pardir, os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'quantum', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+gettext.install('quantum', unicode=1)
+
+from quantum import jsonutils
+
+
+def payloads(ports):
+    port_listing = {'ports': [{'id': str(uuid.uuid4()),
+                               'state': 'ACTIVE',
+                               'op-status': 'UP',
+                               'attachment': {'id': str(uuid.uuid4())}}
+                              for i in xrange(ports)]}
+    lswitch_query = {'result_count': ports,
+                     'results': [{'display_name': 'net-%d' % i,
+                                  'uuid': str(uuid.uuid4()),
+                                  'tags': [{'tag': 'tenant-%d' % i,
+                                            'scope': 'os_tid'}],
+                                  '_relations': {'LogicalSwitchStatus': {
+                                      'fabric_status': True,
+                                      'lport_count': 10}}}
+                                 for i in xrange(ports)]}
+    fault = {'networkNotFound': {'message': 'Unable to find a network '
+                                            'with the specified identifier.',
+                                 'code': 420,
+                                 'detail': 'Network %s could not be found' %
+                                           uuid.uuid4()}}
+    return [('port listing', port_listing),
+            ('nvp lswitch query', lswitch_query),
+            ('fault', fault)]
+
+
+def timed(func, arg, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        func(arg)
+    return (time.time() - start) / iterations * 1000.0
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--ports", type="int", default=1000,
+                      help="number of items in the collection payloads")
+    parser.add_option("--iterations", type="int", default=100)
+    options, args = parser.parse_args()
+
+    backends = []
+    for name in ('ujson', 'simplejson', 'json'):
+        try:
+            backends.append(jsonutils.load_backend([name]))
+        except ImportError:
+            print "%s is not available" % name
+    print "quantum.jsonutils encodes with %s and decodes with %s" % (
+        jsonutils.DUMPS_BACKEND, jsonutils.LOADS_BACKEND)
+
+    print "%-20s %-12s %12s %12s" % ("payload", "backend", "dumps (ms)",
+                                     "loads (ms)")
+    for payload_name, payload in payloads(options.ports):
+        encoded = jsonutils.dumps(payload)
+        for name, dumps, loads in backends:
+            print "%-20s %-12s %12.3f %12.3f" % (
+                payload_name, name, timed(dumps, payload, options.iterations),
+                timed(loads, encoded, options.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measures the time the OVS agent takes to discover the VIF ports of the
+integration bridge, with the single ovs-vsctl call made by
+OVSBridge.get_vif_ports against the former list-ports plus two gets per
+port, as the number of ports grows. A fake ovs-vsctl, run through the
+root helper the way sudo would be, serves a bridge of tap ports.
+
+    python tools/benchmarks/vif_discovery.py --ports 1,10,50,200
+"""
+
+import optparse
+import os
+import sys
+import tempfile
+import time
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                   os.pardir, os.pardir, os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'quantum', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+from quantum.plugins.openvswitch.agent import ovs_quantum_agent
+
+
+BRIDGE = "br-int"
+
+# Run as: <python> fake-ovs-vsctl <ports> ovs-vsctl --timeout=2 <args>
+FAKE_OVS_VSCTL = '''
+import json
+import sys
+
+ports = int(sys.argv[1])
+args = sys.argv[4:]
+names = ["tap%d" % i for i in range(ports)] + ["patch-tun"]
+
+
+def external_ids(name):
+    if name == "patch-tun":
+        return []
+    i = int(name[3:])
+    return [["attached-mac", "fa:16:3e:00:%02x:%02x" % (i / 256, i % 256)],
+            ["iface-id", "vif-%d" % i]]
+
+
+def ofport(name):
+    return names.index(name) + 1
+
+
+if args[0] == "list-ports":
+    print "\\n".join(names)
+elif args[0] == "get":
+    name, column = args[2], args[3]
+    if column == "ofport":
+        print ofport(name)
+    else:
+        print "{%s}" % ", ".join('%s="%s"' % (key, value)
+                                 for key, value in external_ids(name))
+elif args[0] == "--format=json":
+    print json.dumps({"data": [[name, ["map", external_ids(name)],
+                                ofport(name)] for name in names],
+                      "headings": ["name", "external_ids", "ofport"]})
+    print "\\n".join(names)
+'''
+
+
+def legacy_get_vif_ports(br):
+    """The former OVSBridge.get_vif_ports, making 1 + 2 * ports calls"""
+    edge_ports = []
+    for name in br.get_port_name_list():
+        external_ids = br.db_get_map("Interface", name, "external_ids")
+        ofport = br.db_get_val("Interface", name, "ofport")
+        if "iface-id" in external_ids and "attached-mac" in external_ids:
+            edge_ports.append(ovs_quantum_agent.VifPort(
+                name, ofport, external_ids["iface-id"],
+                external_ids["attached-mac"], br))
+    return edge_ports
+
+
+def timed(func, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        result = func()
+    return (time.time() - start) / iterations * 1000.0, result
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--ports", default="1,10,50,200",
+                      help="comma separated numbers of VIF ports")
+    parser.add_option("--iterations", type="int", default=3)
+    options, args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.py')
+    os.write(fd, FAKE_OVS_VSCTL)
+    os.close(fd)
+    try:
+        print "%-8s %18s %18s" % ("ports", "single call (ms)",
+                                  "per port (ms)")
+        for ports in [int(p) for p in options.ports.split(",")]:
+            root_helper = "%s %s %d" % (sys.executable, path, ports)
+            br = ovs_quantum_agent.OVSBridge(BRIDGE, root_helper)
+            single, new_ports = timed(br.get_vif_ports, options.iterations)
+            legacy, old_ports = timed(lambda: legacy_get_vif_ports(br),
+                                      options.iterations)
+            assert len(new_ports) == len(old_ports) == ports
+            print "%-8d %18.1f %18.1f" % (ports, single, legacy)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
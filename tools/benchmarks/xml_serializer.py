@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2012 OpenStack LLC.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Compares the streaming XMLDictSerializer with the minidom based one on
+a detailed port listing.
+
+    python tools/benchmarks/xml_serializer.py --ports 10000
+"""
+
+import gettext
+import optparse
+import os
+import sys
+import time
+import uuid
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(__file__),
+                                   os.pardir, os.pardir, os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'quantum', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+gettext.install('quantum', unicode=1)
+
+from quantum.api import api_common as common
+from quantum.api import ports
+from quantum import wsgi
+
+
+def port_listing(count):
+    return {'ports': [{'id': str(uuid.uuid4()),
+                       'state': 'ACTIVE',
+                       'op-status': 'UP',
+                       'attachment': {'id': str(uuid.uuid4())}}
+                      for i in xrange(count)]}
+
+
+def timed(serializer, data, iterations):
+    start = time.time()
+    for i in xrange(iterations):
+        body = serializer.serialize(data)
+    return (time.time() - start) / iterations * 1000.0, body
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option("--ports", type="int", default=10000,
+                      help="number of ports in the listing")
+    parser.add_option("--iterations", type="int", default=10)
+    options, args = parser.parse_args()
+
+    metadata = ports.ControllerV11._serialization_metadata
+    data = port_listing(options.ports)
+    results = []
+    for klass in (wsgi.MinidomXMLDictSerializer, wsgi.XMLDictSerializer):
+        serializer = klass(metadata, common.XML_NS_V11)
+        results.append((klass.__name__,) + timed(serializer, data,
+                                                 options.iterations))
+
+    print "Serialized %d ports (%d bytes)" % (options.ports,
+                                              len(results[0][2]))
+    for name, elapsed, body in results:
+        print "%-26s %10.1f ms" % (name, elapsed)
+    if results[0][2] != results[1][2]:
+        print "WARNING: the serializers produced different documents"
+
+
+if __name__ == "__main__":
+    main()